@@ -12,16 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Any, Dict, Literal
+import contextlib
+import importlib.util
+from typing import Any, AsyncGenerator, Dict, Literal, Optional
 
 import httpx
-from botocore.auth import HmacV1Auth
-from botocore.awsrequest import AWSRequest
-from botocore.credentials import Credentials
 from fastapi import HTTPException, status
 from fastapi.logger import logger
 
 from backend.admin_ops.errors import error_from_response
+from backend.admin_ops.signer import get_signer
 
 
 def signed_request(
@@ -38,23 +38,18 @@ def signed_request(
     Returns a request signed with AWS HMAC v1 Auth (SHA1), which is what is
     understood by RGW's admin ops authentication.
     """
-    creds = Credentials(access, secret)
-    aws_req = AWSRequest(
-        method=method, url=url, data=data, params=params, headers=headers
-    )
     # NOTE(jecluis): it seems that query parameters are not considered for the
     # signature, unless they are provided via the URL, and always with a '/'
     # after the base URL:port address. E.g., http://foo.bar:123/?param1=baz
     # works, whereas http://foo.bar:123?param1=baz does not.
     #
-    HmacV1Auth(credentials=creds).add_auth(aws_req)
-
+    signer = get_signer(access, secret)
     return httpx.Request(
         method=method,
         url=url,
-        params=aws_req.params,
-        data=aws_req.data,
-        headers=dict(aws_req.headers),
+        params=params,
+        data=data,
+        headers=signer.sign(method, url, headers),
     )
 
 
@@ -63,8 +58,97 @@ HTTPMethodType = (
 )
 
 
+class AdminOpsTransport:
+    """
+    Keeps a long-lived `httpx.AsyncClient` around, so that the connections
+    to RGW are kept alive and reused by subsequent admin ops requests,
+    instead of being set up and torn down for every single request.
+
+    The client is created lazily, thus it is bound to the event loop of
+    the first request, and must be closed via `close()`.
+    """
+
+    _limits: httpx.Limits
+    _http2: bool
+    _client: Optional[httpx.AsyncClient]
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = 100,
+        max_keepalive_connections: Optional[int] = 20,
+        keepalive_expiry: Optional[float] = 5,
+        http2: bool = False,
+    ) -> None:
+        """
+        :param max_connections: The maximum number of concurrent
+            connections.
+        :param max_keepalive_connections: The maximum number of idle
+            connections that are kept alive.
+        :param keepalive_expiry: The number of seconds after which an
+            idle connection is closed.
+        :param http2: Enable HTTP/2 support. This requires the `h2`
+            package, otherwise HTTP/1.1 is used.
+        """
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 requires the 'h2' package -- disabling")
+            http2 = False
+        self._http2 = http2
+        self._client = None
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return self._limits
+
+    @property
+    def http2(self) -> bool:
+        return self._http2
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                verify=False, limits=self._limits, http2=self._http2
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_transport: Optional[AdminOpsTransport] = None
+
+
+def set_transport(transport: Optional[AdminOpsTransport]) -> None:
+    """
+    Sets the transport that is used to send all admin ops requests. If
+    no transport is set, a new client is created for every request.
+    """
+    global _transport
+    _transport = transport
+
+
+def get_transport() -> Optional[AdminOpsTransport]:
+    return _transport
+
+
+@contextlib.asynccontextmanager
+async def _client() -> AsyncGenerator[httpx.AsyncClient, None]:
+    if _transport is not None:
+        yield _transport.client
+    else:
+        async with httpx.AsyncClient(verify=False) as client:
+            yield client
+
+
 async def send_request(req: httpx.Request) -> httpx.Response:
-    async with httpx.AsyncClient(verify=False) as client:
+    async with _client() as client:
         try:
             res: httpx.Response = await client.send(req)
             if not res.is_success:
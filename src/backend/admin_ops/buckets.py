@@ -56,6 +56,35 @@ async def list_buckets(
     return parse_obj_as(List[Bucket], res.json())
 
 
+async def list_bucket_names(
+    url: str,
+    access_key: str,
+    secret_key: str,
+    uid: Optional[str] = None,
+) -> List[str]:
+    """
+    Obtains the names of all buckets in the system, without gathering the
+    information and statistics of each bucket. If `uid` is specified,
+    returns only the names of those buckets owned by the specified user
+    id.
+
+    See https://docs.ceph.com/en/latest/radosgw/adminops/#get-bucket-info
+    """
+    params: Dict[str, Any] = {}
+    if uid:
+        params["uid"] = uid
+
+    res = await do_request(
+        url=url,
+        access_key=access_key,
+        secret_key=secret_key,
+        endpoint="/admin/bucket",
+        method="GET",
+        params=params,
+    )
+    return parse_obj_as(List[str], res.json())
+
+
 async def get_bucket_info(
     url: str,
     access_key: str,
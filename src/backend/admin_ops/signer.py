@@ -0,0 +1,169 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import hashlib
+import hmac
+from collections import OrderedDict
+from email.utils import formatdate
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from botocore.auth import HmacV1Auth
+
+# The query string arguments that are part of the canonical resource.
+QSA_OF_INTEREST = frozenset(HmacV1Auth.QSAOfInterest)
+
+STANDARD_HEADERS = ["content-md5", "content-type", "date"]
+
+
+class HmacV1Signer:
+    """
+    Signs requests with AWS HMAC v1 Auth (SHA1), producing the very same
+    signatures as `botocore's HmacV1Auth`.
+
+    Contrary to botocore, the string to sign is computed directly from the
+    request method, URL and headers, without building `Credentials` and
+    `AWSRequest` objects first. Additionally, the HMAC object keyed with the
+    secret key is created only once and copied for every signature.
+    """
+
+    _access_key: str
+    _hmac: "hmac.HMAC"
+
+    def __init__(self, access_key: str, secret_key: str) -> None:
+        self._access_key = access_key
+        self._hmac = hmac.new(
+            secret_key.encode("utf-8"), digestmod=hashlib.sha1
+        )
+
+    @property
+    def access_key(self) -> str:
+        return self._access_key
+
+    def string_to_sign(
+        self, method: str, url: str, headers: Dict[str, Any], date: str
+    ) -> str:
+        """
+        Returns the canonical string to sign. Note that, as with botocore,
+        the `Date` header is always replaced by the given date.
+        """
+        values: Dict[str, List[str]] = {}
+        for key, value in headers.items():
+            if value is None:
+                continue
+            lk = key.lower()
+            if lk == "date":
+                continue
+            values.setdefault(lk, []).append(str(value))
+
+        hoi: List[str] = []
+        for ih in STANDARD_HEADERS:
+            if ih == "date":
+                hoi.append(date)
+            elif ih in values:
+                # botocore considers the first value of a header as many
+                # times as the header is present.
+                first = values[ih][0].strip()
+                hoi.extend(first for _ in values[ih])
+            else:
+                hoi.append("")
+        parts: List[str] = [method.upper(), "\n".join(hoi)]
+
+        custom = [
+            f"{lk}:{','.join(v.strip() for v in values[lk])}"
+            for lk in sorted(values)
+            if lk.startswith("x-amz-")
+        ]
+        if custom:
+            parts.append("\n".join(custom))
+
+        parts.append(self.canonical_resource(url))
+        return "\n".join(parts)
+
+    @staticmethod
+    def canonical_resource(url: str) -> str:
+        """
+        Returns the path of the URL, followed by the query string arguments
+        that are relevant for the signature, if any.
+        """
+        split = urlsplit(url)
+        resource = split.path
+        if split.query:
+            qsa: List[str] = []
+            for arg in split.query.split("&"):
+                name, sep, value = arg.partition("=")
+                if name in QSA_OF_INTEREST:
+                    qsa.append(f"{name}={unquote(value)}" if sep else name)
+            if qsa:
+                qsa.sort(key=lambda a: a.split("=", 1)[0])
+                resource += "?" + "&".join(qsa)
+        return resource
+
+    def signature(self, string_to_sign: str) -> str:
+        h = self._hmac.copy()
+        h.update(string_to_sign.encode("utf-8"))
+        return base64.b64encode(h.digest()).decode("utf-8")
+
+    def sign(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, Any]] = None,
+        date: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Returns a copy of the given headers, with the `Date` and
+        `Authorization` headers set.
+
+        :param date: The date to sign, formatted as described in RFC 2822.
+            Defaults to the current date.
+        """
+        headers = headers or {}
+        if date is None:
+            date = formatdate(usegmt=True)
+        sts = self.string_to_sign(method, url, headers, date)
+        res: Dict[str, Any] = {
+            k: v
+            for k, v in headers.items()
+            if k.lower() not in ["date", "authorization"]
+        }
+        res["Date"] = date
+        res["Authorization"] = f"AWS {self._access_key}:{self.signature(sts)}"
+        return res
+
+
+# The maximum number of cached signers, see `get_signer()`.
+SIGNER_CACHE_SIZE = 128
+
+_signers: "OrderedDict[Tuple[str, str], HmacV1Signer]" = OrderedDict()
+
+
+def get_signer(access_key: str, secret_key: str) -> HmacV1Signer:
+    """
+    Returns the cached signer for the given credentials. The secret is
+    hashed to not keep it in plain text as part of the cache key. The
+    least recently used signer is dropped once `SIGNER_CACHE_SIZE`
+    signers are cached.
+    """
+    key = (access_key, hashlib.sha256(secret_key.encode()).hexdigest())
+    signer = _signers.get(key)
+    if signer is not None:
+        _signers.move_to_end(key)
+        return signer
+    signer = HmacV1Signer(access_key, secret_key)
+    _signers[key] = signer
+    if len(_signers) > SIGNER_CACHE_SIZE:
+        _signers.popitem(last=False)
+    return signer
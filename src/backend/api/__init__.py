@@ -15,10 +15,20 @@
 # pyright: reportUnnecessaryCast=false
 
 import contextlib
+import hashlib
 import re
-from typing import Annotated, Any, AsyncGenerator, Dict, Literal, Tuple, cast
+from typing import (
+    Annotated,
+    Any,
+    AsyncContextManager,
+    AsyncGenerator,
+    Dict,
+    Literal,
+    Optional,
+    Tuple,
+    cast,
+)
 
-import boto3.utils
 import pydash
 from aiobotocore.session import AioSession
 from botocore.config import Config as S3Config
@@ -27,6 +37,11 @@ from fastapi import Depends, Header, HTTPException, Request, status
 from fastapi.logger import logger
 from types_aiobotocore_s3.client import S3Client
 
+from backend.api.client_pool import S3ClientPool, create_session
+from backend.api.copying import CopyOptions
+from backend.api.download import DownloadOptions
+from backend.api.job_manager import JobManager, job_owner
+from backend.api.key_index import KeyIndex
 from backend.config import Config
 
 
@@ -36,15 +51,24 @@ class S3GWClient:
 
     A connection is not opened by this class. Instead, a client is created when
     requesting a connection via the `conn()` context manager, and the connection
-    is handled by the `aiobotocore's S3Client` class that is returned.
+    is handled by the `aiobotocore's S3Client` class that is returned. If an
+    `S3ClientPool` is specified, the client is taken from that pool and kept
+    open after the request has been processed.
     """
 
     _endpoint: str
     _access_key: str
     _secret_key: str
+    _pool: Optional[S3ClientPool]
+    _key_index: Optional[KeyIndex]
 
     def __init__(
-        self, config: Config, access_key: str, secret_key: str
+        self,
+        config: Config,
+        access_key: str,
+        secret_key: str,
+        pool: Optional[S3ClientPool] = None,
+        key_index: Optional[KeyIndex] = None,
     ) -> None:
         """
         Creates a new `S3GWClient` instance.
@@ -53,10 +77,14 @@ class S3GWClient:
         * `endpoint`: the URL where the server is expected to be at.
         * `access_key`: the user's `access key`.
         * `secret_key`: the user's `secret access key`.
+        * `pool`: the optional pool used to share clients between requests.
+        * `key_index`: the optional index of the objects of the buckets.
         """
         self._config = config
         self._access_key = access_key
         self._secret_key = secret_key
+        self._pool = pool
+        self._key_index = key_index
 
     @property
     def endpoint(self) -> str:
@@ -74,6 +102,91 @@ class S3GWClient:
     def addressing_style(self) -> Literal["auto", "virtual", "path"]:
         return self._config.s3_addressing_style.value
 
+    @property
+    def max_pool_connections(self) -> int:
+        return self._config.s3_max_pool_connections
+
+    @property
+    def list_workers(self) -> int:
+        return self._config.s3_list_workers
+
+    @property
+    def delete_workers(self) -> int:
+        return self._config.s3_delete_workers
+
+    @property
+    def archive_workers(self) -> int:
+        return self._config.s3_archive_workers
+
+    @property
+    def copy_options(self) -> CopyOptions:
+        return CopyOptions(
+            multipart_threshold=self._config.s3_copy_multipart_threshold,
+            part_size=self._config.s3_copy_part_size,
+            max_workers=self._config.s3_copy_workers,
+        )
+
+    @property
+    def download_options(self) -> DownloadOptions:
+        return DownloadOptions(
+            parallel_threshold=self._config.s3_download_parallel_threshold,
+            chunk_size=self._config.s3_download_chunk_size,
+            max_workers=self._config.s3_download_workers,
+            buffer_size=self._config.s3_download_buffer_size,
+        )
+
+    @property
+    def key_index(self) -> Optional[KeyIndex]:
+        return self._key_index
+
+    @property
+    def job_owner(self) -> str:
+        """
+        The owner of the jobs submitted with this client's credentials.
+        """
+        return job_owner(self.endpoint, self.access_key)
+
+    def _create_client(
+        self, session: AioSession, attempts: int
+    ) -> AsyncContextManager[S3Client]:
+        return cast(
+            AsyncContextManager[S3Client],
+            session.create_client(  # noqa: E501 # pyright: ignore [reportUnknownMemberType]
+                "s3",
+                endpoint_url=self.endpoint,
+                aws_access_key_id=self.access_key,
+                aws_secret_access_key=self.secret_key,
+                verify=False,
+                config=S3Config(
+                    retries={
+                        "max_attempts": attempts,
+                        "mode": "standard",
+                    },
+                    s3={
+                        "addressing_style": self.addressing_style,
+                    },
+                    max_pool_connections=self.max_pool_connections,
+                ),
+            ),
+        )
+
+    def _client(self, attempts: int) -> AsyncContextManager[S3Client]:
+        if self._pool is None:
+            return self._create_client(create_session(), attempts)
+        # Clients are only shared between requests using the same
+        # credentials. The secret is hashed to not keep it in plain
+        # text as part of the key.
+        key = (
+            self.endpoint,
+            self.access_key,
+            hashlib.sha256(self.secret_key.encode()).hexdigest(),
+            self.addressing_style,
+            attempts,
+        )
+        return self._pool.lease(
+            key, lambda session: self._create_client(session, attempts)
+        )
+
     @contextlib.asynccontextmanager
     async def conn(self, attempts: int = 1) -> AsyncGenerator[S3Client, None]:
         """
@@ -81,40 +194,16 @@ class S3GWClient:
         perform operations against an S3-compatible server. In case of failure,
         by default, the operation only performs one attempt.
 
+        If a client pool is used, the client is shared with other requests
+        using the same credentials, e.g. the requests of an aggregating
+        endpoint. Otherwise, a new client is created.
+
         This context manager will catch most exceptions thrown by the
         `S3Client`'s operations, and convert them to `fastapi.HTTPException`.
         """
-        session = AioSession()
-
-        # aioboto3 behaves different from aiobotocore when it comes to the
-        # registration of default handlers. Since we are not using the session
-        # from aioboto3 here we have to do the registration ourselves. This is
-        # necessary to get the `upload_fileobj` functionality.
-        session.register(
-            "creating-client-class.s3",
-            boto3.utils.lazy_call(
-                "aioboto3.s3.inject.inject_s3_transfer_methods"
-            ),
-        )
-
-        async with session.create_client(  # noqa: E501 # pyright: ignore [reportUnknownMemberType]
-            "s3",
-            endpoint_url=self.endpoint,
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
-            verify=False,
-            config=S3Config(
-                retries={
-                    "max_attempts": attempts,
-                    "mode": "standard",
-                },
-                s3={
-                    "addressing_style": self.addressing_style,
-                },
-            ),
-        ) as client:
+        async with self._client(attempts) as client:
             try:
-                yield cast(S3Client, client)
+                yield client
             except ClientError as e:
                 (status_code, detail) = decode_client_error(e)
                 raise HTTPException(status_code=status_code, detail=detail)
@@ -171,9 +260,37 @@ def s3gw_config(request: Request) -> Config:
     return config
 
 
+def s3gw_client_pool(request: Request) -> Optional[S3ClientPool]:
+    pool: Optional[S3ClientPool] = getattr(
+        request.app.state, "s3_client_pool", None
+    )
+    return pool
+
+
+def s3gw_key_index(request: Request) -> Optional[KeyIndex]:
+    key_index: Optional[KeyIndex] = getattr(
+        request.app.state, "key_index", None
+    )
+    return key_index
+
+
+def s3gw_job_manager(request: Request) -> JobManager:
+    job_manager: Optional[JobManager] = getattr(
+        request.app.state, "job_manager", None
+    )
+    if job_manager is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Background jobs are not available",
+        )
+    return job_manager
+
+
 async def s3gw_client(
     config: Annotated[Config, Depends(s3gw_config)],
     s3gw_credentials: Annotated[str, Header()],
+    pool: Annotated[Optional[S3ClientPool], Depends(s3gw_client_pool)] = None,
+    key_index: Annotated[Optional[KeyIndex], Depends(s3gw_key_index)] = None,
 ) -> S3GWClient:
     """
     To be used for FastAPI's dependency injection, reads the request's HTTP
@@ -191,7 +308,7 @@ async def s3gw_client(
     assert len(m.groups()) == 2
     access, secret = m.group(1), m.group(2)
     assert len(access) > 0 and len(secret) > 0
-    return S3GWClient(config, access, secret)
+    return S3GWClient(config, access, secret, pool, key_index)
 
 
 def s3gw_client_responses() -> Dict[int | str, Dict[str, Any]]:
@@ -20,11 +20,21 @@ from fastapi.routing import APIRouter
 import backend.admin_ops.buckets as admin_ops_buckets
 import backend.admin_ops.types as admin_ops_types
 import backend.admin_ops.users as admin_ops_users
-from backend.api import S3GWClient, s3gw_client, s3gw_client_responses
+from backend.api import (
+    S3GWClient,
+    s3gw_client,
+    s3gw_client_responses,
+    s3gw_job_manager,
+)
+from backend.api.job_manager import JobManager, JobProgress
+from backend.api.jobs import job_responses
+from backend.api.responses import FieldsQuery, model_response, parse_fields
+from backend.api.types import Job
 
 router = APIRouter(prefix="/admin", tags=["admin ops"])
 
 S3GWClientDep = Annotated[S3GWClient, Depends(s3gw_client)]
+JobManagerDep = Annotated[JobManager, Depends(s3gw_job_manager)]
 
 
 ##############################################################################
@@ -142,23 +152,38 @@ async def delete_user(conn: S3GWClientDep, uid: str) -> str:
     return res
 
 
-@router.get(
-    "/users/",
-    response_model=Union[List[str], List[admin_ops_types.UserInfo]],
-    responses=s3gw_client_responses(),
+@model_response(
+    router.get(
+        "/users/",
+        response_model=Union[List[str], List[admin_ops_types.UserInfo]],
+        responses=s3gw_client_responses(),
+    ),
+    fields=admin_ops_types.UserInfo,
 )
 async def list_users(
-    conn: S3GWClientDep, details: bool = False, stats: bool = False
+    conn: S3GWClientDep,
+    details: bool = False,
+    stats: bool = False,
+    fields: FieldsQuery = None,
 ) -> Union[List[str], List[admin_ops_types.UserInfo]]:
     if not details:
-        res = await admin_ops_users.list_uids(
+        return await admin_ops_users.list_uids(
             conn.endpoint, conn.access_key, conn.secret_key
         )
-    else:
-        res = await admin_ops_users.list_users(
-            conn.endpoint, conn.access_key, conn.secret_key, stats
+    selected = parse_fields(fields, admin_ops_types.UserInfo)
+    if selected is not None and selected <= {"user_id"}:
+        # Only the user ids are requested, thus do not fetch the user
+        # information of every user.
+        uids = await admin_ops_users.list_uids(
+            conn.endpoint, conn.access_key, conn.secret_key
         )
-    return res
+        return [admin_ops_types.UserInfo.construct(user_id=uid) for uid in uids]
+    return await admin_ops_users.list_users(
+        conn.endpoint,
+        conn.access_key,
+        conn.secret_key,
+        stats and (selected is None or "stats" in selected),
+    )
 
 
 @router.post(
@@ -247,10 +272,12 @@ async def update_user_quota(
     )
 
 
-@router.get(
-    "/users/{uid}/buckets",
-    response_model=List[admin_ops_types.Bucket],
-    responses=s3gw_client_responses(),
+@model_response(
+    router.get(
+        "/users/{uid}/buckets",
+        response_model=List[admin_ops_types.Bucket],
+        responses=s3gw_client_responses(),
+    )
 )
 async def list_user_buckets(
     conn: S3GWClientDep, uid: str
@@ -278,14 +305,27 @@ async def get_user_usage_stats(
 ##############################################################################
 # Buckets
 ##############################################################################
-@router.get(
-    "/buckets/",
-    response_model=List[admin_ops_types.Bucket],
-    responses=s3gw_client_responses(),
+@model_response(
+    router.get(
+        "/buckets/",
+        response_model=List[admin_ops_types.Bucket],
+        responses=s3gw_client_responses(),
+    ),
+    fields=admin_ops_types.Bucket,
 )
 async def list_buckets(
-    conn: S3GWClientDep, uid: Optional[str] = None
+    conn: S3GWClientDep,
+    uid: Optional[str] = None,
+    fields: FieldsQuery = None,
 ) -> List[admin_ops_types.Bucket]:
+    selected = parse_fields(fields, admin_ops_types.Bucket)
+    if selected is not None and selected <= {"bucket"}:
+        # Only the bucket names are requested, thus do not gather the
+        # information and statistics of every bucket.
+        names = await admin_ops_buckets.list_bucket_names(
+            conn.endpoint, conn.access_key, conn.secret_key, uid
+        )
+        return [admin_ops_types.Bucket.construct(bucket=name) for name in names]
     res = await admin_ops_buckets.list_buckets(
         conn.endpoint, conn.access_key, conn.secret_key, uid
     )
@@ -335,6 +375,33 @@ async def delete_bucket(
     return res
 
 
+@router.delete(
+    "/buckets/{bucket}/job",
+    response_model=Job,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses=job_responses(),
+)
+async def delete_bucket_job(
+    conn: S3GWClientDep,
+    manager: JobManagerDep,
+    bucket: str,
+    purge_objects: bool = True,
+) -> Job:
+    """
+    Same as `delete_bucket`, but the bucket is deleted by a background
+    job, see `get_job`. Purging the objects of a large bucket may take
+    longer than a request is allowed to take.
+    """
+
+    async def run(progress: JobProgress) -> None:
+        await delete_bucket(conn, bucket, purge_objects)
+        progress.add(done=1)
+
+    return await manager.submit(
+        conn.job_owner, "delete-bucket", f"Delete {bucket}", run
+    )
+
+
 @router.put(
     "/buckets/{bucket}/link",
     responses=s3gw_client_responses(),
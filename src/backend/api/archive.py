@@ -0,0 +1,372 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import contextlib
+import os
+import tarfile
+import zipfile
+from collections import deque
+from datetime import datetime, timezone
+from typing import (
+    IO,
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    Deque,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    cast,
+)
+
+from botocore.exceptions import ClientError
+from types_aiobotocore_s3.client import S3Client
+from types_aiobotocore_s3.type_defs import (
+    GetObjectOutputTypeDef,
+    ListObjectsV2OutputTypeDef,
+)
+
+from backend.api.download import read_ahead, read_chunks
+from backend.api.listing import list_objects_pages
+from backend.api.types import ObjectIdentifier
+
+ArchiveFormat = Literal["zip", "tar"]
+
+MEDIA_TYPES: Dict[str, str] = {
+    "zip": "application/zip",
+    "tar": "application/x-tar",
+}
+
+# The earliest date that can be stored in a ZIP archive.
+_ZIP_EPOCH = datetime(1980, 1, 1, tzinfo=timezone.utc)
+
+
+class ArchiveEntry:
+    """
+    An object to add to an archive, and its name within the archive.
+    """
+
+    def __init__(self, name: str, key: str, version_id: str = "") -> None:
+        self.name = name
+        self.key = key
+        self.version_id = version_id
+
+
+def archive_base(keys: List[str]) -> str:
+    """
+    Returns the folder that the names within an archive are relative to,
+    i.e. the deepest folder that contains all the given keys or prefixes,
+    e.g. `a/` for `a/b/` and `a/c.txt`.
+    """
+    folders = [key[: key.rstrip("/").rfind("/") + 1] for key in keys]
+    common = os.path.commonprefix(folders)
+    return common[: common.rfind("/") + 1]
+
+
+async def prefix_entries(
+    s3: S3Client,
+    bucket: str,
+    prefix: str,
+    base: str,
+    max_workers: int = 1,
+) -> AsyncGenerator[ArchiveEntry, None]:
+    """
+    Yields the objects starting with the given prefix, in key order, see
+    `list_objects_pages`. Folder placeholders, i.e. keys ending with a
+    `/`, are skipped.
+
+    :param base: The folder the names within the archive are relative to,
+        see `archive_base()`.
+    """
+    async with contextlib.aclosing(
+        list_objects_pages(s3, bucket, prefix, max_workers=max_workers)
+    ) as pages:
+        page: ListObjectsV2OutputTypeDef
+        async for page in pages:
+            for content in page.get("Contents", []):
+                key = content.get("Key", "")
+                if key.endswith("/"):
+                    continue
+                yield ArchiveEntry(key[len(base) :], key)
+
+
+async def selection_entries(
+    s3: S3Client,
+    bucket: str,
+    selection: List[ObjectIdentifier],
+    base: str,
+    max_workers: int = 1,
+) -> AsyncGenerator[ArchiveEntry, None]:
+    """
+    Yields the selected objects in the given order. Keys ending with a
+    `/` are folders, whose objects are listed, see `prefix_entries()`.
+    """
+    for item in selection:
+        if not item.Key.endswith("/"):
+            yield ArchiveEntry(item.Key[len(base) :], item.Key, item.VersionId)
+            continue
+        async with contextlib.aclosing(
+            prefix_entries(s3, bucket, item.Key, base, max_workers)
+        ) as entries:
+            async for entry in entries:
+                yield entry
+
+
+class FetchedObject:
+    """
+    An object whose `get_object` request has been answered, and whose
+    first chunk may already have been read, see `fetch_objects()`.
+    """
+
+    def __init__(
+        self,
+        entry: ArchiveEntry,
+        s3_res: GetObjectOutputTypeDef,
+        chunk_size: int,
+    ) -> None:
+        self.entry = entry
+        self.size: int = s3_res.get("ContentLength", 0)
+        self.last_modified: datetime = s3_res.get(
+            "LastModified", datetime.now(timezone.utc)
+        )
+        self._chunks = read_chunks(s3_res["Body"], chunk_size)
+        self._first: Optional[bytes] = None
+
+    async def prefetch(self) -> None:
+        """
+        Reads the first chunk of the body ahead. This is the whole body
+        of an object of up to `chunk_size` bytes.
+        """
+        self._first = await anext(self._chunks, None)
+
+    async def body(self) -> AsyncGenerator[bytes, None]:
+        """
+        Yields the body in chunks, with the next chunk read ahead, see
+        `read_ahead()`.
+        """
+        if self._first is not None:
+            first, self._first = self._first, None
+            yield first
+        async with contextlib.aclosing(read_ahead(self._chunks)) as chunks:
+            async for chunk in chunks:
+                yield chunk
+
+    async def aclose(self) -> None:
+        await self._chunks.aclose()
+
+
+async def fetch_objects(
+    s3: S3Client,
+    bucket: str,
+    entries: AsyncGenerator[ArchiveEntry, None],
+    max_workers: int = 4,
+    chunk_size: int = 1024 * 1024,
+) -> AsyncGenerator[FetchedObject, None]:
+    """
+    Requests the given objects and yields them in order, while the
+    following objects are already requested and their first chunk is
+    read, see `FetchedObject.prefetch()`. At most `max_workers` objects
+    are requested or kept at the same time, including the yielded one,
+    thus the memory is bounded by about `max_workers * chunk_size`. The
+    body of a yielded object must be read before the next object is
+    requested from this generator; it is closed afterwards.
+
+    Objects that have been deleted since they were listed are skipped.
+    """
+
+    async def fetch(entry: ArchiveEntry) -> Optional[FetchedObject]:
+        kwargs: Dict[str, Any] = {}
+        if entry.version_id:
+            kwargs["VersionId"] = entry.version_id
+        try:
+            s3_res = await s3.get_object(Bucket=bucket, Key=entry.key, **kwargs)
+        except ClientError as e:
+            metadata = e.response.get("ResponseMetadata", {})
+            if metadata.get("HTTPStatusCode") == 404:
+                return None
+            raise
+        obj = FetchedObject(entry, s3_res, chunk_size)
+        try:
+            await obj.prefetch()
+        except BaseException:
+            await obj.aclose()
+            raise
+        return obj
+
+    # The requested objects in the order of the entries.
+    pending: Deque["asyncio.Task[Optional[FetchedObject]]"] = deque()
+    exhausted = False
+
+    async def request(limit: int) -> None:
+        nonlocal exhausted
+        while not exhausted and len(pending) < limit:
+            entry = await anext(entries, None)
+            if entry is None:
+                exhausted = True
+                return
+            pending.append(asyncio.ensure_future(fetch(entry)))
+
+    workers = max(max_workers, 1)
+    try:
+        while True:
+            # The following objects are requested while this one is read.
+            await request(workers)
+            if not pending:
+                break
+            obj = await pending.popleft()
+            if obj is None:
+                continue
+            try:
+                yield obj
+            finally:
+                await obj.aclose()
+    finally:
+        for task in pending:
+            task.cancel()
+        for result in await asyncio.gather(*pending, return_exceptions=True):
+            if isinstance(result, FetchedObject):
+                await result.aclose()
+        await entries.aclose()
+
+
+class _Output:
+    """
+    A write-only file that collects the bytes written by `zipfile` until
+    they are taken to be sent.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        # A single chunk is passed on without a copy.
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def zip_archive(
+    objects: AsyncIterable[FetchedObject],
+    compress: bool = True,
+    level: int = 6,
+) -> AsyncGenerator[bytes, None]:
+    """
+    Yields a ZIP archive of the given objects while their bodies are
+    read. As the output is not seekable, the CRC and the sizes of an
+    entry follow its data in a data descriptor. ZIP64 extensions are
+    used for objects of 4 GiB and more, and for large archives.
+
+    :param compress: If `False`, the objects are stored as is, e.g. if
+        they are compressed already.
+    """
+    out = _Output()
+    with zipfile.ZipFile(
+        cast(IO[bytes], out),
+        mode="w",
+        compression=zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED,
+        compresslevel=level if compress else None,
+    ) as zf:
+        async for obj in objects:
+            info = zipfile.ZipInfo(
+                obj.entry.name,
+                date_time=max(obj.last_modified, _ZIP_EPOCH).timetuple()[:6],
+            )
+            info.file_size = obj.size
+            info.compress_type = zf.compression
+            info.external_attr = 0o644 << 16
+            with zf.open(info, mode="w") as dest:
+                async for chunk in obj.body():
+                    dest.write(chunk)
+                    data = out.take()
+                    if data:
+                        yield data
+            data = out.take()
+            if data:
+                yield data
+    # The central directory.
+    yield out.take()
+
+
+async def tar_archive(
+    objects: AsyncIterable[FetchedObject],
+) -> AsyncGenerator[bytes, None]:
+    """
+    Yields a tar archive in the POSIX.1-2001 (pax) format of the given
+    objects while their bodies are read. The format has no limit on the
+    size of an object or the length of its name.
+    """
+    offset = 0
+    async for obj in objects:
+        info = tarfile.TarInfo(obj.entry.name)
+        info.size = obj.size
+        info.mtime = int(obj.last_modified.timestamp())
+        info.mode = 0o644
+        header = info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+        offset += len(header)
+        yield header
+        remaining = obj.size
+        async for chunk in obj.body():
+            # The size of the header must not be exceeded.
+            chunk = chunk[:remaining]
+            remaining -= len(chunk)
+            offset += len(chunk)
+            yield chunk
+        if remaining:
+            raise RuntimeError(f"Object {obj.entry.key} has been truncated")
+        padding = -obj.size % tarfile.BLOCKSIZE
+        offset += padding
+        yield tarfile.NUL * padding
+    # The end of the archive, padded to a whole record like `tarfile`.
+    end = 2 * tarfile.BLOCKSIZE
+    end += -(offset + end) % tarfile.RECORDSIZE
+    yield tarfile.NUL * end
+
+
+async def archive_stream(
+    s3: S3Client,
+    bucket: str,
+    entries: AsyncGenerator[ArchiveEntry, None],
+    archive_format: ArchiveFormat = "zip",
+    compress: bool = True,
+    max_workers: int = 4,
+    chunk_size: int = 1024 * 1024,
+) -> AsyncGenerator[bytes, None]:
+    """
+    Yields an archive of the given objects, which are fetched via
+    `fetch_objects()`. Neither an object nor the archive is ever kept in
+    memory as a whole.
+
+    :param compress: Whether the objects are compressed in a ZIP
+        archive. Tar archives are never compressed.
+    """
+    async with contextlib.aclosing(
+        fetch_objects(s3, bucket, entries, max_workers, chunk_size)
+    ) as objects:
+        archive = (
+            zip_archive(objects, compress)
+            if archive_format == "zip"
+            else tar_archive(objects)
+        )
+        async with contextlib.aclosing(archive) as chunks:
+            async for chunk in chunks:
+                yield chunk
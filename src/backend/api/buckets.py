@@ -31,6 +31,7 @@ from types_aiobotocore_s3.type_defs import (
 )
 
 from backend.api import S3GWClient, s3gw_client, s3gw_client_responses
+from backend.api.responses import model_response
 from backend.api.types import (
     Bucket,
     BucketAttributes,
@@ -44,10 +45,13 @@ router = APIRouter(prefix="/buckets", tags=["bucket"])
 S3GWClientDep = Annotated[S3GWClient, Depends(s3gw_client)]
 
 
-@router.get(
-    "/",
-    response_model=List[Bucket],
-    responses=s3gw_client_responses(),
+@model_response(
+    router.get(
+        "/",
+        response_model=List[Bucket],
+        responses=s3gw_client_responses(),
+    ),
+    conditional=True,
 )
 async def list_buckets(conn: S3GWClientDep) -> List[Bucket]:
     """
@@ -56,8 +60,12 @@ async def list_buckets(conn: S3GWClientDep) -> List[Bucket]:
     """
     async with conn.conn() as s3:
         s3_res: ListBucketsOutputTypeDef = await s3.list_buckets()
-        res = parse_obj_as(List[Bucket], s3_res["Buckets"])
-    return res
+    return [
+        Bucket.construct(
+            Name=b.get("Name", ""), CreationDate=b.get("CreationDate")
+        )
+        for b in s3_res.get("Buckets", [])
+    ]
 
 
 @router.put(
@@ -312,12 +320,15 @@ async def set_bucket_tagging(
     return True
 
 
-@router.get(
-    "/{bucket}/attributes",
-    name="get_bucket_attributes",
-    summary="Get aggregated bucket attributes",
-    response_model=BucketAttributes,
-    responses=s3gw_client_responses(),
+@model_response(
+    router.get(
+        "/{bucket}/attributes",
+        name="get_bucket_attributes",
+        summary="Get aggregated bucket attributes",
+        response_model=BucketAttributes,
+        responses=s3gw_client_responses(),
+    ),
+    conditional=True,
 )
 async def get_bucket_attributes(
     conn: S3GWClientDep, bucket: str
@@ -456,10 +467,13 @@ async def update_bucket(
     return res
 
 
-@router.get(
-    "/{bucket}/lifecycle-configuration",
-    response_model=BucketLifecycleConfigurationTypeDef,
-    responses=s3gw_client_responses(),
+@model_response(
+    router.get(
+        "/{bucket}/lifecycle-configuration",
+        response_model=BucketLifecycleConfigurationTypeDef,
+        responses=s3gw_client_responses(),
+    ),
+    conditional=True,
 )
 async def get_bucket_lifecycle_configuration(
     conn: S3GWClientDep, bucket: str
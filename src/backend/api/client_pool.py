@@ -0,0 +1,184 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import contextlib
+import time
+from collections import OrderedDict
+from typing import AsyncContextManager, AsyncGenerator, Callable, Hashable, List
+
+import boto3.utils
+from aiobotocore.session import AioSession
+from types_aiobotocore_s3.client import S3Client
+
+
+def create_session() -> AioSession:
+    """
+    Creates a new `AioSession` that is able to create S3 clients providing
+    the aioboto3 transfer methods, e.g. `upload_fileobj`.
+    """
+    session = AioSession()
+
+    # aioboto3 behaves different from aiobotocore when it comes to the
+    # registration of default handlers. Since we are not using the session
+    # from aioboto3 here we have to do the registration ourselves. This is
+    # necessary to get the `upload_fileobj` functionality.
+    session.register(
+        "creating-client-class.s3",
+        boto3.utils.lazy_call("aioboto3.s3.inject.inject_s3_transfer_methods"),
+    )
+    return session
+
+
+ClientFactory = Callable[[AioSession], AsyncContextManager[S3Client]]
+
+
+class _PooledClient:
+    client: S3Client
+    stack: contextlib.AsyncExitStack
+    loop: asyncio.AbstractEventLoop
+    leases: int
+    last_used: float
+
+    def __init__(
+        self,
+        client: S3Client,
+        stack: contextlib.AsyncExitStack,
+        loop: asyncio.AbstractEventLoop,
+    ) -> None:
+        self.client = client
+        self.stack = stack
+        self.loop = loop
+        self.leases = 0
+        self.last_used = time.monotonic()
+
+
+class S3ClientPool:
+    """
+    A process-wide cache of open `aiobotocore's S3Client` instances.
+
+    Creating a client is expensive: the botocore service model has to be
+    loaded, and every client maintains its own HTTP connection pool. By
+    keeping the clients open, subsequent requests using the same key (e.g.
+    the same endpoint and credentials) reuse the already established
+    keep-alive connections to the s3gw server.
+
+    Idle clients are closed once they have not been used for `idle_ttl`
+    seconds, or when more than `max_size` clients are cached, in which
+    case the least recently used ones are closed first. Clients that are
+    currently leased are never closed.
+    """
+
+    _max_size: int
+    _idle_ttl: float
+    _clients: "OrderedDict[Hashable, _PooledClient]"
+    _session: AioSession | None
+
+    def __init__(self, max_size: int = 32, idle_ttl: float = 300) -> None:
+        """
+        :param max_size: The maximum number of cached clients.
+        :param idle_ttl: The number of seconds after which an unused
+            client is closed.
+        """
+        self._max_size = max_size
+        self._idle_ttl = idle_ttl
+        self._clients = OrderedDict()
+        self._session = None
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    @property
+    def session(self) -> AioSession:
+        """
+        The session shared by all pooled clients, thus the service model
+        is only loaded once.
+        """
+        if self._session is None:
+            self._session = create_session()
+        return self._session
+
+    @contextlib.asynccontextmanager
+    async def lease(
+        self, key: Hashable, factory: ClientFactory
+    ) -> AsyncGenerator[S3Client, None]:
+        """
+        Yields the cached client for the given key. If there is none, a
+        new client is created using the specified factory.
+
+        :param key: The key identifying the client, e.g. a tuple of the
+            endpoint and credentials.
+        :param factory: A callable returning an async context manager that
+            yields a new client for the given session.
+        """
+        entry = await self._acquire(key, factory)
+        entry.leases += 1
+        try:
+            yield entry.client
+        finally:
+            entry.leases -= 1
+            entry.last_used = time.monotonic()
+            await self._evict()
+
+    async def close(self) -> None:
+        """
+        Closes all cached clients.
+        """
+        entries = list(self._clients.values())
+        self._clients.clear()
+        for entry in entries:
+            await self._close_entry(entry)
+
+    async def _acquire(
+        self, key: Hashable, factory: ClientFactory
+    ) -> _PooledClient:
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(key)
+        if entry is not None and entry.loop is not loop:
+            # The client is bound to an event loop that is not running
+            # anymore, so it can't be used nor properly closed.
+            del self._clients[key]
+            entry = None
+        if entry is None:
+            stack = contextlib.AsyncExitStack()
+            client = await stack.enter_async_context(factory(self.session))
+            # Another request might have created a client for the same key
+            # while we were waiting.
+            entry = self._clients.get(key)
+            if entry is not None and entry.loop is loop:
+                await stack.aclose()
+            else:
+                entry = _PooledClient(client, stack, loop)
+                self._clients[key] = entry
+        self._clients.move_to_end(key)
+        return entry
+
+    async def _evict(self) -> None:
+        now = time.monotonic()
+        evicted: List[_PooledClient] = []
+        for key, entry in list(self._clients.items()):
+            if entry.leases == 0 and now - entry.last_used > self._idle_ttl:
+                evicted.append(self._clients.pop(key))
+        for key, entry in list(self._clients.items()):
+            if len(self._clients) <= self._max_size:
+                break
+            if entry.leases == 0:
+                evicted.append(self._clients.pop(key))
+        for entry in evicted:
+            await self._close_entry(entry)
+
+    async def _close_entry(self, entry: _PooledClient) -> None:
+        if entry.loop is not asyncio.get_running_loop():
+            return
+        await entry.stack.aclose()
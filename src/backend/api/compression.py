@@ -0,0 +1,225 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import abc
+import zlib
+from typing import Dict, Optional
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# The supported content encodings, in the order of preference.
+ENCODINGS = ("br", "gzip")
+
+_NO_COMPRESSION = "s3gw.no_compression"
+
+
+def disable_compression(scope: Scope) -> None:
+    """
+    Excludes the response of the given request from compression, e.g.
+    because it is an object body that may already be compressed.
+    """
+    scope[_NO_COMPRESSION] = True
+
+
+def select_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Helper function to select the content encoding according to the value
+    of an `Accept-Encoding` header. Returns `None` if none of the
+    supported encodings is accepted.
+    """
+    qualities: Dict[str, float] = {}
+    for value in accept_encoding.split(","):
+        name, *params = [part.strip() for part in value.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, q = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(q)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            qualities[name.lower()] = quality
+    candidates = [
+        encoding
+        for encoding in ENCODINGS
+        if qualities.get(encoding, qualities.get("*", 0.0)) > 0
+    ]
+    if not candidates:
+        return None
+    # Pick the preferred encoding among those with the highest quality.
+    return max(
+        candidates,
+        key=lambda e: qualities.get(e, qualities.get("*", 0.0)),
+    )
+
+
+class _Encoder(abc.ABC):
+    @abc.abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        """
+        Compresses a chunk of a streamed body. The compressed data is
+        flushed, thus the client can decode the chunk right away.
+        """
+
+    @abc.abstractmethod
+    def finish(self, data: bytes) -> bytes:
+        """
+        Compresses the last chunk of the body.
+        """
+
+
+class _GzipEncoder(_Encoder):
+    def __init__(self, level: int) -> None:
+        # Use the gzip container format.
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + 15)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class _BrotliEncoder(_Encoder):
+    def __init__(self, level: int) -> None:
+        self._compressor = brotli.Compressor(
+            mode=brotli.MODE_TEXT, quality=level
+        )
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+def _encoder(encoding: str, level: int) -> _Encoder:
+    if encoding == "br":
+        return _BrotliEncoder(level)
+    return _GzipEncoder(level)
+
+
+class CompressionMiddleware:
+    """
+    Compresses the responses via brotli or gzip, depending on the
+    `Accept-Encoding` header of the request.
+
+    Responses that are smaller than `minimum_size`, that are already
+    encoded, or whose compression has been disabled via
+    `disable_compression()` are sent as is. Streamed responses are
+    compressed chunk by chunk; every chunk is flushed, thus e.g. the
+    lines of a newline-delimited JSON stream reach the client without
+    delay.
+
+    :param level: The compression level, from `1` (fastest) to `9`
+        (smallest). `0` disables the compression.
+    :param minimum_size: The minimum size in bytes of a response that is
+        not streamed to be compressed.
+    """
+
+    def __init__(
+        self, app: ASGIApp, level: int = 6, minimum_size: int = 500
+    ) -> None:
+        self.app = app
+        self.level = max(0, min(level, 9))
+        self.minimum_size = minimum_size
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http" or self.level == 0:
+            await self.app(scope, receive, send)
+            return
+        encoding = select_encoding(
+            Headers(scope=scope).get("accept-encoding", "")
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(
+            scope, send, encoding, self.level, self.minimum_size
+        )
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(
+        self,
+        scope: Scope,
+        send: Send,
+        encoding: str,
+        level: int,
+        minimum_size: int,
+    ) -> None:
+        self._scope = scope
+        self._send = send
+        self._encoding = encoding
+        self._level = level
+        self._minimum_size = minimum_size
+        self._start: Optional[Message] = None
+        self._encoder: Optional[_Encoder] = None
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Hold the message back until the first chunk of the body
+            # tells whether the response is compressed.
+            self._start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+        if self._start is not None:
+            start, self._start = self._start, None
+            if self._compress(start, body, more_body):
+                headers = MutableHeaders(raw=start["headers"])
+                headers["Content-Encoding"] = self._encoding
+                self._encoder = _encoder(self._encoding, self._level)
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    message["body"] = self._encoder.finish(body)
+                    headers["Content-Length"] = str(len(message["body"]))
+                    await self._send(start)
+                    await self._send(message)
+                    return
+            await self._send(start)
+        if self._encoder is not None:
+            message["body"] = (
+                self._encoder.compress(body)
+                if more_body
+                else self._encoder.finish(body)
+            )
+        await self._send(message)
+
+    def _compress(self, start: Message, body: bytes, more_body: bool) -> bool:
+        """
+        Checks whether the response is compressed, based on its headers
+        and the first chunk of its body.
+        """
+        headers = MutableHeaders(raw=start["headers"])
+        if (
+            self._scope.get(_NO_COMPRESSION, False)
+            or "content-encoding" in headers
+            or start["status"] in (204, 304)
+        ):
+            return False
+        headers.add_vary_header("Accept-Encoding")
+        return more_body or len(body) >= self._minimum_size
@@ -0,0 +1,198 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import urllib.parse
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, Tuple
+
+from types_aiobotocore_s3.client import S3Client
+from types_aiobotocore_s3.type_defs import (
+    CompletedPartTypeDef,
+    CopySourceTypeDef,
+    HeadObjectOutputTypeDef,
+)
+
+from backend.api.deletion import run_bounded
+
+# The maximum number of parts of a multipart upload.
+MAX_PARTS = 10000
+
+# The metadata of the source object that is passed on to the multipart
+# upload, like `copy_object` does with `MetadataDirective="COPY"`.
+METADATA_FIELDS = [
+    "CacheControl",
+    "ContentDisposition",
+    "ContentEncoding",
+    "ContentLanguage",
+    "ContentType",
+    "Expires",
+    "Metadata",
+    "WebsiteRedirectLocation",
+]
+
+
+class CopyOptions:
+    """
+    Controls how objects are copied by `copy_object`.
+
+    Arguments:
+    * `multipart_threshold`: objects larger than this number of bytes are
+      copied via a multipart upload. A single `copy_object` request is
+      limited to 5 GiB.
+    * `part_size`: the number of bytes per part. Note, S3 requires parts
+      of at least 5 MiB, except for the last one.
+    * `max_workers`: the maximum number of parts copied at the same time.
+    """
+
+    def __init__(
+        self,
+        multipart_threshold: int = 128 * 1024 * 1024,
+        part_size: int = 64 * 1024 * 1024,
+        max_workers: int = 4,
+    ) -> None:
+        self.multipart_threshold = multipart_threshold
+        self.part_size = part_size
+        self.max_workers = max_workers
+
+
+def part_ranges(size: int, part_size: int) -> List[Tuple[int, int]]:
+    """
+    Splits an object of the given size into the inclusive byte ranges of
+    its parts. The part size is increased if an object would otherwise
+    consist of more than `MAX_PARTS` parts.
+    """
+    part_size = max(part_size, -(-size // MAX_PARTS), 1)
+    return [
+        (start, min(start + part_size, size) - 1)
+        for start in range(0, size, part_size)
+    ]
+
+
+def _source_args(source: CopySourceTypeDef) -> Dict[str, Any]:
+    args: Dict[str, Any] = {"Bucket": source["Bucket"], "Key": source["Key"]}
+    if source.get("VersionId"):
+        args["VersionId"] = source.get("VersionId")
+    return args
+
+
+async def copy_object(
+    s3: S3Client,
+    bucket: str,
+    key: str,
+    source: CopySourceTypeDef,
+    size: Optional[int] = None,
+    options: Optional[CopyOptions] = None,
+) -> None:
+    """
+    Copies an object server-side, including its metadata and tags, e.g.
+    an older version onto its own key to restore it.
+
+    Objects up to the `multipart_threshold` are copied by a single
+    `copy_object` request. Larger objects are copied via a multipart
+    upload, whose byte ranges are copied concurrently via
+    `upload_part_copy`. The upload is aborted if any part fails.
+
+    :param size: The size of the source object, if known. Otherwise, or
+        if the object is too large for a single request, the object is
+        looked up via `head_object` first.
+    """
+    options = options or CopyOptions()
+    if size is not None and size <= options.multipart_threshold:
+        await _copy_single(s3, bucket, key, source)
+        return
+    head: HeadObjectOutputTypeDef = await s3.head_object(**_source_args(source))
+    if head.get("ContentLength", 0) <= options.multipart_threshold:
+        await _copy_single(s3, bucket, key, source)
+        return
+    await _copy_multipart(s3, bucket, key, source, head, options)
+
+
+async def _copy_single(
+    s3: S3Client, bucket: str, key: str, source: CopySourceTypeDef
+) -> None:
+    await s3.copy_object(
+        Bucket=bucket,
+        CopySource=source,
+        Key=key,
+        MetadataDirective="COPY",
+        TaggingDirective="COPY",
+    )
+
+
+async def _copy_multipart(
+    s3: S3Client,
+    bucket: str,
+    key: str,
+    source: CopySourceTypeDef,
+    head: HeadObjectOutputTypeDef,
+    options: CopyOptions,
+) -> None:
+    kwargs: Dict[str, Any] = {
+        field: head[field] for field in METADATA_FIELDS if field in head
+    }
+    tagging = await s3.get_object_tagging(**_source_args(source))
+    if tagging["TagSet"]:
+        kwargs["Tagging"] = urllib.parse.urlencode(
+            [(tag["Key"], tag["Value"]) for tag in tagging["TagSet"]]
+        )
+    upload = await s3.create_multipart_upload(Bucket=bucket, Key=key, **kwargs)
+    upload_id = upload["UploadId"]
+    # The parts must all be copied from the same object, even if the
+    # source is overwritten in the meantime.
+    condition: Dict[str, Any] = {}
+    if head.get("ETag"):
+        condition["CopySourceIfMatch"] = head["ETag"]
+
+    async def copy_part(
+        number: int, start: int, end: int
+    ) -> CompletedPartTypeDef:
+        res = await s3.upload_part_copy(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=number,
+            CopySource=source,
+            CopySourceRange=f"bytes={start}-{end}",
+            **condition,
+        )
+        return {
+            "PartNumber": number,
+            "ETag": res["CopyPartResult"].get("ETag", ""),
+        }
+
+    async def requests() -> AsyncIterator[Awaitable[CompletedPartTypeDef]]:
+        ranges = part_ranges(head.get("ContentLength", 0), options.part_size)
+        for number, (start, end) in enumerate(ranges, start=1):
+            yield copy_part(number, start, end)
+
+    try:
+        async with contextlib.aclosing(
+            run_bounded(requests(), options.max_workers)
+        ) as results:
+            parts = [part async for part in results]
+        parts.sort(key=lambda part: part.get("PartNumber", 0))
+        await s3.complete_multipart_upload(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+    except BaseException:
+        # Do not leave the copied parts behind, e.g. if the request has
+        # been cancelled.
+        with contextlib.suppress(Exception):
+            await s3.abort_multipart_upload(
+                Bucket=bucket, Key=key, UploadId=upload_id
+            )
+        raise
@@ -0,0 +1,298 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import codecs
+import contextlib
+import json
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Iterator,
+    List,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+from types_aiobotocore_s3.client import S3Client
+from types_aiobotocore_s3.type_defs import (
+    DeleteObjectsOutputTypeDef,
+    ListObjectVersionsOutputTypeDef,
+    ObjectIdentifierTypeDef,
+)
+
+from backend.api.types import DeletedObject, DeleteObjectError, DeleteResult
+
+T = TypeVar("T")
+
+# The maximum number of keys of a single `DeleteObjects` request.
+MAX_DELETE_KEYS = 1000
+
+
+def select_versions(
+    page: ListObjectVersionsOutputTypeDef, all_versions: bool
+) -> Iterator[ObjectIdentifierTypeDef]:
+    """
+    Yields the identifiers of the object versions of a listing page that
+    are to be deleted. These are all versions and delete markers if
+    `all_versions` is set, otherwise the latest versions of the objects,
+    which are deleted without a version ID, i.e. a delete marker is
+    created in versioned buckets.
+    """
+    for version in page.get("Versions", []):
+        if all_versions:
+            yield {
+                "Key": version.get("Key", ""),
+                "VersionId": version.get("VersionId") or "",
+            }
+        elif version.get("IsLatest", False):
+            yield {"Key": version.get("Key", ""), "VersionId": ""}
+    if not all_versions:
+        return
+    for marker in page.get("DeleteMarkers", []):
+        yield {
+            "Key": marker.get("Key", ""),
+            "VersionId": marker.get("VersionId") or "",
+        }
+
+
+async def batch_versions(
+    pages: AsyncIterable[ListObjectVersionsOutputTypeDef],
+    all_versions: bool,
+    size: int = MAX_DELETE_KEYS,
+) -> AsyncGenerator[List[ObjectIdentifierTypeDef], None]:
+    """
+    Yields the identifiers selected by `select_versions` from the pages
+    of a listing in batches of at most `size` identifiers.
+
+    A batch is held back until the page that follows it has arrived.
+    The request for a page refers to the last key of the previous page,
+    thus this key must not be deleted before the page has been listed.
+    """
+    batch: List[ObjectIdentifierTypeDef] = []
+    ready: List[List[ObjectIdentifierTypeDef]] = []
+    async for page in pages:
+        for full in ready:
+            yield full
+        ready = []
+        for identifier in select_versions(page, all_versions):
+            batch.append(identifier)
+            if len(batch) >= size:
+                ready.append(batch)
+                batch = []
+    for full in ready:
+        yield full
+    if batch:
+        yield batch
+
+
+def _scan_json_values(
+    data: str, state: List[str], final: bool
+) -> Tuple[List[Any], int]:
+    """
+    Helper function of `parse_json_values`. Returns the complete values
+    at the start of `data` and the position up to which `data` has been
+    consumed. `state` is a single element list holding `""` before the
+    first value, `"]"` after the end of the array and `"-"` in a sequence
+    of values without enclosing array. Within an array, it holds what is
+    expected next: `"["` a value or the end of the array, `"v"` a value
+    and `","` a separator or the end of the array.
+    """
+    decoder = json.JSONDecoder()
+    values: List[Any] = []
+    pos = 0
+    while True:
+        while pos < len(data) and data[pos] in " \t\r\n":
+            pos += 1
+        if pos == len(data):
+            return values, pos
+        char = data[pos]
+        if state[0] == "":
+            state[0] = "[" if char == "[" else "-"
+            pos += 1 if char == "[" else 0
+            continue
+        if state[0] == "]":
+            raise ValueError(f"Unexpected data after the array at {char!r}")
+        if state[0] in ("[", "v", ",") and char in ",]":
+            if char == "]" and state[0] != "v":
+                state[0] = "]"
+            elif char == "," and state[0] == ",":
+                state[0] = "v"
+            else:
+                raise ValueError(f"Unexpected {char!r} at position {pos}")
+            pos += 1
+            continue
+        if state[0] == ",":
+            raise ValueError(f"Expected ',' or ']' at position {pos}")
+        try:
+            value, end = decoder.raw_decode(data, pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            # The value is not complete yet.
+            return values, pos
+        if end == len(data) and not final:
+            # A number may be continued by the next chunk.
+            return values, pos
+        values.append(value)
+        pos = end
+        if state[0] in ("[", "v"):
+            state[0] = ","
+
+
+async def parse_json_values(
+    chunks: AsyncIterable[bytes],
+) -> AsyncGenerator[Any, None]:
+    """
+    Incrementally parses a JSON array, or a sequence of JSON values like
+    newline-delimited JSON, from the given chunks of UTF-8 encoded data,
+    e.g. the body of a request, and yields the values one by one. Thus a
+    large body is processed while it is received.
+
+    Raises a `ValueError` if the data is not valid.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    state = [""]
+    data = ""
+    async for chunk in chunks:
+        data += decoder.decode(chunk)
+        values, pos = _scan_json_values(data, state, final=False)
+        data = data[pos:]
+        for value in values:
+            yield value
+    data += decoder.decode(b"", final=True)
+    values, _ = _scan_json_values(data, state, final=True)
+    for value in values:
+        yield value
+    if state[0] in ("[", "v", ","):
+        raise ValueError("Unterminated array")
+
+
+def delete_objects_output_to_result(
+    batch: int, s3_res: DeleteObjectsOutputTypeDef
+) -> DeleteResult:
+    """
+    Helper function to convert a `delete_objects` response into the
+    result of a batch.
+
+    Note, the response is trusted, thus the result is constructed
+    without validation.
+    """
+    return DeleteResult.construct(
+        Batch=batch,
+        Deleted=[
+            DeletedObject.construct(
+                Key=deleted.get("Key", ""),
+                VersionId=deleted.get("VersionId"),
+                DeleteMarker=deleted.get("DeleteMarker"),
+                DeleteMarkerVersionId=deleted.get("DeleteMarkerVersionId"),
+            )
+            for deleted in s3_res.get("Deleted", [])
+        ],
+        Errors=[
+            DeleteObjectError.construct(
+                Key=error.get("Key", "n/a"),
+                VersionId=error.get("VersionId"),
+                Code=error.get("Code", "n/a"),
+                Message=error.get("Message"),
+            )
+            for error in s3_res.get("Errors", [])
+        ],
+    )
+
+
+async def run_bounded(
+    aws: AsyncIterable[Awaitable[T]], max_workers: int = 1
+) -> AsyncGenerator[T, None]:
+    """
+    Runs the given awaitables with at most `max_workers` of them at the
+    same time, and yields their results in the order in which they
+    finish. The next awaitable is only taken from `aws` once one has
+    finished, thus a lazily produced sequence of operations is run with
+    constant memory.
+
+    If an operation fails, the pending operations are cancelled and the
+    error is raised.
+    """
+    pending: Set[asyncio.Future[T]] = set()
+    try:
+        iterator = aiter(aws)
+        while True:
+            while len(pending) >= max(max_workers, 1):
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+            try:
+                aw = await anext(iterator)
+            except StopAsyncIteration:
+                break
+            pending.add(asyncio.ensure_future(aw))
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def delete_batches(
+    s3: S3Client,
+    bucket: str,
+    batches: AsyncIterable[List[ObjectIdentifierTypeDef]],
+    max_workers: int = 1,
+) -> AsyncGenerator[DeleteResult, None]:
+    """
+    Deletes the given batches of objects via `delete_objects` and yields
+    the result of every batch as soon as it is available.
+
+    At most `max_workers` requests are in flight at the same time, see
+    `run_bounded`. Thus a lazily produced sequence of batches, e.g. by
+    `batch_versions` from a listing, is deleted with constant memory.
+    The listing moves on while the batches are deleted. Note, the
+    results are yielded in the order in which the requests finish, see
+    `DeleteResult.Batch`.
+
+    If a request fails, the pending requests are cancelled and the error
+    is raised. Errors of single keys are reported in the results.
+    """
+
+    async def delete(
+        index: int, objects: List[ObjectIdentifierTypeDef]
+    ) -> DeleteResult:
+        s3_res: DeleteObjectsOutputTypeDef = await s3.delete_objects(
+            Bucket=bucket, Delete={"Objects": objects}
+        )
+        return delete_objects_output_to_result(index, s3_res)
+
+    async def requests() -> AsyncIterator[Awaitable[DeleteResult]]:
+        index = 0
+        async for objects in batches:
+            yield delete(index, objects)
+            index += 1
+
+    async with contextlib.aclosing(
+        run_bounded(requests(), max_workers)
+    ) as results:
+        async for result in results:
+            yield result
@@ -0,0 +1,91 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any, Optional
+
+import anyio
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.api.metrics import Metrics
+
+
+def _operation(scope: Scope) -> str:
+    endpoint: Any = scope.get("endpoint")
+    return getattr(endpoint, "__name__", None) or scope.get("path", "")
+
+
+class DisconnectMiddleware:
+    """
+    Cancels the handling of a request as soon as the client disconnects,
+    e.g. because the browser cancelled a download or navigated away from
+    a large listing. Thus the requests to the s3gw server that are still
+    in flight are cancelled and their connections are released, instead
+    of running to completion for nobody.
+
+    The request messages are read by the middleware and passed on to the
+    application one by one, thus the disconnect is noticed even while the
+    application is busy, without reading ahead more than one message of
+    the request body. A disconnect after the response is complete, e.g.
+    while background tasks are running, does not cancel anything.
+
+    :param metrics: If given, the cancelled requests are counted here.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: Optional[Metrics] = None) -> None:
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        messages_in, messages_out = anyio.create_memory_object_stream(1)
+        response_complete = False
+        cancelled = False
+
+        async def receive_message() -> Message:
+            message: Message = await messages_out.receive()
+            return message
+
+        async def send_message(message: Message) -> None:
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                response_complete = True
+            await send(message)
+
+        async with anyio.create_task_group() as task_group:
+
+            async def watch() -> None:
+                nonlocal cancelled
+                while True:
+                    message = await receive()
+                    if message["type"] == "http.disconnect":
+                        if not response_complete:
+                            cancelled = True
+                            task_group.cancel_scope.cancel()
+                            return
+                    await messages_in.send(message)
+                    if message["type"] == "http.disconnect":
+                        return
+
+            task_group.start_soon(watch)
+            await self.app(scope, receive_message, send_message)
+            task_group.cancel_scope.cancel()
+
+        if cancelled and self.metrics is not None:
+            self.metrics.count_cancelled(_operation(scope))
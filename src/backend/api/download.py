@@ -0,0 +1,319 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import re
+import time
+from collections import deque
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Deque,
+    Dict,
+    Iterator,
+    Optional,
+    Tuple,
+)
+
+from aiobotocore.response import StreamingBody
+from fastapi.logger import logger
+from types_aiobotocore_s3.client import S3Client
+from types_aiobotocore_s3.type_defs import GetObjectOutputTypeDef
+
+CONTENT_RANGE_RE = re.compile(r"bytes (\d+)-(\d+)/")
+
+
+class DownloadOptions:
+    """
+    Controls how object bodies are fetched from S3, see
+    `parallel_body()`.
+
+    Arguments:
+    * `parallel_threshold`: objects, or requested ranges, larger than this
+      number of bytes are fetched via concurrent ranged requests.
+    * `chunk_size`: the number of bytes fetched per ranged request.
+    * `max_workers`: the maximum number of concurrent ranged requests per
+      download. A value of `1` disables the parallel download.
+    * `buffer_size`: the number of bytes per chunk of a body that is
+      streamed via a single request, see `buffered_body()`.
+    """
+
+    def __init__(
+        self,
+        parallel_threshold: int = 64 * 1024 * 1024,
+        chunk_size: int = 8 * 1024 * 1024,
+        max_workers: int = 1,
+        buffer_size: int = 1024 * 1024,
+    ) -> None:
+        self.parallel_threshold = parallel_threshold
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.buffer_size = buffer_size
+
+    def is_parallel(self, s3_res: GetObjectOutputTypeDef) -> bool:
+        """
+        Checks whether the body of the given `get_object` response is to
+        be fetched via `parallel_body()`.
+        """
+        return (
+            self.max_workers > 1
+            and s3_res.get("ContentLength", 0) > self.parallel_threshold
+        )
+
+
+def content_span(s3_res: GetObjectOutputTypeDef) -> Tuple[int, int]:
+    """
+    Returns the inclusive byte range of the object that is contained in
+    the body of the given `get_object` response.
+    """
+    match = CONTENT_RANGE_RE.match(s3_res.get("ContentRange", ""))
+    if match is not None:
+        return int(match.group(1)), int(match.group(2))
+    return 0, s3_res.get("ContentLength", 0) - 1
+
+
+def chunk_ranges(
+    first: int, last: int, chunk_size: int
+) -> Iterator[Tuple[int, int]]:
+    """
+    Splits the inclusive byte range `first` to `last` into the inclusive
+    ranges of chunks of at most `chunk_size` bytes.
+    """
+    chunk_size = max(chunk_size, 1)
+    for start in range(first, last + 1, chunk_size):
+        yield start, min(start + chunk_size, last + 1) - 1
+
+
+async def fetch_ranges(
+    s3: S3Client,
+    bucket: str,
+    key: str,
+    first: int,
+    last: int,
+    options: DownloadOptions,
+    version_id: str = "",
+    etag: str = "",
+    body: Optional[StreamingBody] = None,
+) -> AsyncGenerator[bytes, None]:
+    """
+    Yields the bytes `first` to `last` of an object in order, fetched via
+    concurrent ranged `get_object` requests of `chunk_size` bytes.
+
+    The chunks are requested in order, but they may arrive out of order;
+    a chunk is kept until all preceding chunks have been yielded. At most
+    `max_workers` chunks are requested or kept at the same time, thus the
+    memory is bounded by `max_workers * chunk_size`.
+
+    If the `etag` is given, the requests fail if the object has been
+    changed in the meantime, instead of mixing the bytes of different
+    objects.
+
+    :param body: The body of a response that starts at `first`, e.g. of
+        the request that revealed the size of the object. If given, the
+        first chunk is streamed from this body while the following chunks
+        are requested, and the body is closed afterwards.
+    """
+
+    async def fetch(start: int, end: int) -> bytes:
+        kwargs: Dict[str, Any] = {}
+        if version_id:
+            kwargs["VersionId"] = version_id
+        if etag:
+            kwargs["IfMatch"] = etag
+        s3_res = await s3.get_object(
+            Bucket=bucket, Key=key, Range=f"bytes={start}-{end}", **kwargs
+        )
+        return await s3_res["Body"].read()
+
+    ranges = chunk_ranges(first, last, options.chunk_size)
+    # The requested chunks in the order of the object.
+    pending: Deque["asyncio.Task[bytes]"] = deque()
+
+    def request(limit: int) -> None:
+        while len(pending) < limit:
+            chunk = next(ranges, None)
+            if chunk is None:
+                return
+            pending.append(asyncio.ensure_future(fetch(*chunk)))
+
+    workers = max(options.max_workers, 1)
+    try:
+        if body is not None:
+            chunk = next(ranges, None)
+            request(workers - 1)
+            remaining = 0 if chunk is None else chunk[1] - chunk[0] + 1
+            while remaining > 0:
+                data = await body.read(remaining)
+                if not data:
+                    break
+                remaining -= len(data)
+                yield data
+            body.close()
+        request(workers)
+        while pending:
+            data = await pending.popleft()
+            yield data
+            del data
+            request(workers)
+    finally:
+        if body is not None:
+            body.close()
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def parallel_body(
+    s3: S3Client,
+    bucket: str,
+    key: str,
+    s3_res: GetObjectOutputTypeDef,
+    options: DownloadOptions,
+) -> AsyncGenerator[bytes, None]:
+    """
+    Returns the body of the given `get_object` response as a stream that
+    is fetched via `fetch_ranges()`. The first chunk is streamed from the
+    body of the response itself, the following chunks are fetched from
+    the same version of the object.
+    """
+    first, last = content_span(s3_res)
+    return fetch_ranges(
+        s3,
+        bucket,
+        key,
+        first,
+        last,
+        options,
+        version_id=s3_res.get("VersionId", ""),
+        etag=s3_res.get("ETag", ""),
+        body=s3_res["Body"],
+    )
+
+
+class TransferStats:
+    """
+    The number of bytes transferred by a download and its duration.
+    """
+
+    def __init__(self) -> None:
+        self.bytes = 0
+        self.seconds = 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds > 0 else 0.0
+
+
+async def read_chunks(
+    body: StreamingBody, chunk_size: int
+) -> AsyncGenerator[bytes, None]:
+    """
+    Yields the given body in chunks of `chunk_size` bytes, only the last
+    chunk may be smaller.
+
+    The body itself returns whatever the connection has received so far,
+    often just a few KiB. These reads are collected in a buffer that is
+    reused for all chunks, thus every byte is copied once at most. A read
+    that fills a whole chunk by itself is passed on without any copy.
+    Note, the chunks must be `bytes` for the ASGI server, thus the buffer
+    itself can not be passed on.
+    """
+    chunk_size = max(chunk_size, 1)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    filled = 0
+    try:
+        while True:
+            data = await body.read(chunk_size - filled)
+            if not data:
+                break
+            if filled == 0 and len(data) == chunk_size:
+                yield data
+                continue
+            view[filled : filled + len(data)] = data
+            filled += len(data)
+            if filled == chunk_size:
+                yield bytes(view)
+                filled = 0
+        if filled:
+            yield bytes(view[:filled])
+    finally:
+        view.release()
+        body.close()
+
+
+async def read_ahead(
+    chunks: AsyncGenerator[bytes, None]
+) -> AsyncGenerator[bytes, None]:
+    """
+    Yields the given chunks, while the next chunk is read in the
+    background. Thus, S3 is read while the previous chunk is sent to the
+    client, but never more than one chunk ahead: the next read only starts
+    once the client has accepted the previous chunk, which is how the ASGI
+    server applies backpressure.
+    """
+
+    async def next_chunk() -> Optional[bytes]:
+        return await anext(chunks, None)
+
+    pending: Optional["asyncio.Task[Optional[bytes]]"] = None
+    try:
+        pending = asyncio.ensure_future(next_chunk())
+        while True:
+            chunk = await pending
+            pending = None
+            if chunk is None:
+                return
+            pending = asyncio.ensure_future(next_chunk())
+            yield chunk
+            del chunk
+    finally:
+        if pending is not None:
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        await chunks.aclose()
+
+
+async def measure(
+    chunks: AsyncIterator[bytes], stats: TransferStats, name: str = ""
+) -> AsyncGenerator[bytes, None]:
+    """
+    Yields the given chunks and counts them in `stats`. The duration
+    includes the time the client needs to accept the chunks. The
+    throughput is logged at the debug level once the stream is closed.
+    """
+    started = time.perf_counter()
+    try:
+        async for chunk in chunks:
+            stats.bytes += len(chunk)
+            yield chunk
+    finally:
+        stats.seconds = time.perf_counter() - started
+        logger.debug(
+            f"Downloaded {stats.bytes} bytes of {name} in "
+            f"{stats.seconds:.3f}s ({stats.bytes_per_second:.0f} bytes/s)"
+        )
+
+
+def buffered_body(
+    s3_res: GetObjectOutputTypeDef, options: DownloadOptions
+) -> AsyncGenerator[bytes, None]:
+    """
+    Returns the body of the given `get_object` response as a stream of
+    chunks of `buffer_size` bytes, see `read_chunks()`, with the next
+    chunk read ahead, see `read_ahead()`. Thus, at most two chunks per
+    download are kept in memory.
+    """
+    return read_ahead(read_chunks(s3_res["Body"], options.buffer_size))
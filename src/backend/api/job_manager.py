@@ -0,0 +1,345 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from fastapi.logger import logger
+
+from backend.api.types import Job, JobStatus
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    owner TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (owner, id)
+) WITHOUT ROWID;
+"""
+
+# The maximum number of reasons why items failed that are kept per job.
+MAX_JOB_ERRORS = 100
+
+FINAL_STATES = frozenset(["SUCCEEDED", "FAILED", "CANCELLED"])
+
+INTERRUPTED_BY_SHUTDOWN = "Interrupted by a shutdown of the backend."
+
+
+def job_owner(endpoint: str, access_key: str) -> str:
+    """
+    Returns the identifier of the owner of a job. A job is only visible
+    to the user who submitted it.
+    """
+    return hashlib.sha256(
+        "\0".join([endpoint, access_key]).encode()
+    ).hexdigest()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobProgress:
+    """
+    Passed to the function of a job to report its progress.
+    """
+
+    def __init__(self, job: Job, changed: Callable[[], None]) -> None:
+        self._job = job
+        self._changed = changed
+
+    def add(
+        self, done: int = 0, failed: int = 0, errors: Sequence[str] = ()
+    ) -> None:
+        """
+        Adds the number of processed and failed items, and the reasons
+        why items failed.
+        """
+        job = self._job
+        job.Done += done
+        job.Failed += failed
+        job.Errors.extend(errors[: max(MAX_JOB_ERRORS - len(job.Errors), 0)])
+        self._changed()
+
+
+JobFunction = Callable[[JobProgress], Awaitable[None]]
+
+
+class JobManager:
+    """
+    Runs long-running operations, e.g. bulk deletions, in the background
+    independent of the request that submitted them. At most
+    `max_running` jobs are running at the same time, further jobs are
+    pending until a running job has finished.
+
+    If `path` is given, the jobs are stored in an SQLite database, thus
+    their state is kept across restarts. Note, the operations themselves
+    are not stored, e.g. the credentials of the user, thus jobs that
+    were interrupted by a restart are marked as failed. Finished jobs
+    are dropped after `ttl` seconds.
+    """
+
+    _max_running: int
+    _path: str
+    _ttl: float
+    _jobs: Dict[str, Tuple[str, Job]]
+    _tasks: Dict[str, "asyncio.Task[None]"]
+    _semaphore: Optional[asyncio.Semaphore]
+    _lock: threading.Lock
+    _db: Optional[sqlite3.Connection]
+    _loaded: bool
+    _saved: Dict[str, float]
+    _closing: bool
+
+    def __init__(
+        self, max_running: int = 4, path: str = "", ttl: float = 3600
+    ) -> None:
+        self._max_running = max(max_running, 1)
+        self._path = path
+        self._ttl = ttl
+        self._jobs = {}
+        self._tasks = {}
+        self._semaphore = None
+        self._lock = threading.Lock()
+        self._db = None
+        self._loaded = False
+        self._saved = {}
+        self._closing = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self._path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            self._db = db
+        return self._db
+
+    async def _run_db(self, fn: Callable[[sqlite3.Connection], None]) -> None:
+        if not self._path:
+            return
+
+        def run() -> None:
+            with self._lock:
+                db = self._connect()
+                with db:
+                    fn(db)
+
+        await asyncio.to_thread(run)
+
+    async def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        rows: List[Tuple[str, str]] = []
+
+        def load(db: sqlite3.Connection) -> None:
+            rows.extend(db.execute("SELECT owner, data FROM jobs"))
+
+        await self._run_db(load)
+        interrupted: List[Tuple[str, Job]] = []
+        for owner, data in rows:
+            job = Job.parse_raw(data)
+            if job.Status not in FINAL_STATES:
+                job.Status = "FAILED"
+                job.Error = "Interrupted by a restart of the backend."
+                job.FinishedAt = _now()
+                interrupted.append((owner, job))
+            self._jobs.setdefault(job.Id, (owner, job))
+        for owner, job in interrupted:
+            await self._save(owner, job)
+
+    async def _save(self, owner: str, job: Job) -> None:
+        self._saved[job.Id] = time.monotonic()
+        data = job.json()
+        created = job.CreatedAt.timestamp()
+
+        def save(db: sqlite3.Connection) -> None:
+            db.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?)",
+                (owner, job.Id, data, created),
+            )
+
+        await self._run_db(save)
+
+    async def _prune(self) -> None:
+        now = _now()
+        expired = [
+            job_id
+            for job_id, (_, job) in self._jobs.items()
+            if job.FinishedAt is not None
+            and (now - job.FinishedAt).total_seconds() > self._ttl
+        ]
+        if not expired:
+            return
+        for job_id in expired:
+            del self._jobs[job_id]
+            self._saved.pop(job_id, None)
+
+        def prune(db: sqlite3.Connection) -> None:
+            db.executemany(
+                "DELETE FROM jobs WHERE id = ?", [(i,) for i in expired]
+            )
+
+        await self._run_db(prune)
+
+    async def submit(
+        self, owner: str, type_: str, description: str, fn: JobFunction
+    ) -> Job:
+        """
+        Submits a job and returns its initial state. The job is started as
+        soon as less than `max_running` jobs are running.
+
+        :param owner: The owner of the job, see `job_owner()`.
+        :param type_: The type of the operation, e.g. `delete-by-prefix`.
+        :param description: A human readable description of the job.
+        :param fn: The operation. It reports its progress via the given
+            `JobProgress`, and fails by raising an exception.
+        """
+        await self._load()
+        await self._prune()
+        job = Job(
+            Id=str(uuid.uuid4()),
+            Type=type_,
+            Description=description,
+            CreatedAt=_now(),
+        )
+        self._jobs[job.Id] = (owner, job)
+        await self._save(owner, job)
+        self._tasks[job.Id] = asyncio.create_task(self._run(owner, job, fn))
+        return job.copy(deep=True)
+
+    async def _run(self, owner: str, job: Job, fn: JobFunction) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_running)
+        pending_saves: List["asyncio.Task[None]"] = []
+
+        def changed() -> None:
+            # The progress is stored at most once per second.
+            if time.monotonic() - self._saved.get(job.Id, 0) >= 1:
+                pending_saves.append(
+                    asyncio.create_task(self._save(owner, job))
+                )
+
+        try:
+            async with self._semaphore:
+                job.Status = "RUNNING"
+                job.StartedAt = _now()
+                await self._save(owner, job)
+                await fn(JobProgress(job, changed))
+            # A job fails if any of its items failed.
+            if job.Failed:
+                job.Status = "FAILED"
+                job.Error = f"{job.Failed} item(s) failed"
+            else:
+                job.Status = "SUCCEEDED"
+        except asyncio.CancelledError:
+            if self._closing:
+                job.Status = "FAILED"
+                job.Error = INTERRUPTED_BY_SHUTDOWN
+            else:
+                job.Status = "CANCELLED"
+        except HTTPException as e:
+            job.Status = "FAILED"
+            job.Error = str(e.detail)
+        except Exception as e:
+            logger.error(f"Job {job.Id} failed: {e}")
+            job.Status = "FAILED"
+            job.Error = str(e) or type(e).__name__
+        finally:
+            job.FinishedAt = _now()
+            self._tasks.pop(job.Id, None)
+            await asyncio.gather(*pending_saves, return_exceptions=True)
+            await self._save(owner, job)
+
+    async def get(self, owner: str, job_id: str) -> Optional[Job]:
+        """
+        Returns the current state of the given job, or `None` if there is
+        no such job of the given owner.
+        """
+        await self._load()
+        await self._prune()
+        entry = self._jobs.get(job_id)
+        if entry is None or entry[0] != owner:
+            return None
+        return entry[1].copy(deep=True)
+
+    async def list(self, owner: str) -> List[Job]:
+        """
+        Returns the jobs of the given owner, the most recent job first.
+        """
+        await self._load()
+        await self._prune()
+        jobs = [job for o, job in self._jobs.values() if o == owner]
+        jobs.sort(key=lambda job: job.CreatedAt, reverse=True)
+        return [job.copy(deep=True) for job in jobs]
+
+    async def cancel(self, owner: str, job_id: str) -> Optional[Job]:
+        """
+        Cancels the given job, if it is still pending or running, and
+        returns its state. Returns `None` if there is no such job of the
+        given owner.
+        """
+        if await self.get(owner, job_id) is None:
+            return None
+        task = self._tasks.pop(job_id, None)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await self._cancelled(job_id, "CANCELLED")
+        return await self.get(owner, job_id)
+
+    async def _cancelled(
+        self, job_id: str, job_status: JobStatus, error: Optional[str] = None
+    ) -> None:
+        # A task that is cancelled before it has been started does not
+        # update the state of its job.
+        owner, job = self._jobs[job_id]
+        if job.Status in FINAL_STATES:
+            return
+        job.Status = job_status
+        job.Error = error
+        job.FinishedAt = _now()
+        await self._save(owner, job)
+
+    async def wait(self, job_id: str) -> None:
+        """
+        Waits until the given job has finished.
+        """
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def close(self) -> None:
+        """
+        Interrupts the pending and running jobs, e.g. on shutdown.
+        """
+        self._closing = True
+        tasks = dict(self._tasks)
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        for job_id in tasks:
+            await self._cancelled(job_id, "FAILED", INTERRUPTED_BY_SHUTDOWN)
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,97 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Annotated, Any, Dict, List
+
+from fastapi import Depends, HTTPException, status
+from fastapi.routing import APIRouter
+
+from backend.api import (
+    S3GWClient,
+    s3gw_client,
+    s3gw_client_responses,
+    s3gw_job_manager,
+)
+from backend.api.job_manager import JobManager
+from backend.api.types import Job
+
+router = APIRouter(prefix="/jobs")
+
+S3GWClientDep = Annotated[S3GWClient, Depends(s3gw_client)]
+JobManagerDep = Annotated[JobManager, Depends(s3gw_job_manager)]
+
+
+def job_responses() -> Dict[int | str, Dict[str, Any]]:
+    """
+    Used to populate FastAPI's OpenAPI's method documentation of the
+    endpoints that submit a job.
+    """
+    return {
+        **s3gw_client_responses(),
+        status.HTTP_503_SERVICE_UNAVAILABLE: {
+            "description": "Background jobs are not available",
+        },
+    }
+
+
+@router.get(
+    "/",
+    response_model=List[Job],
+    responses=s3gw_client_responses(),
+)
+async def list_jobs(conn: S3GWClientDep, manager: JobManagerDep) -> List[Job]:
+    """
+    Lists the jobs submitted by the user, the most recent job first.
+    """
+    return await manager.list(conn.job_owner)
+
+
+@router.get(
+    "/{job_id}",
+    response_model=Job,
+    responses=s3gw_client_responses(),
+)
+async def get_job(
+    conn: S3GWClientDep, manager: JobManagerDep, job_id: str
+) -> Job:
+    """
+    Returns the status, progress and errors of a job.
+    """
+    res = await manager.get(conn.job_owner, job_id)
+    if res is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+        )
+    return res
+
+
+@router.delete(
+    "/{job_id}",
+    response_model=Job,
+    responses=s3gw_client_responses(),
+)
+async def cancel_job(
+    conn: S3GWClientDep, manager: JobManagerDep, job_id: str
+) -> Job:
+    """
+    Cancels a pending or running job. The work that has already been
+    done, e.g. the objects that have already been deleted, is not
+    reverted.
+    """
+    res = await manager.cancel(conn.job_owner, job_id)
+    if res is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+        )
+    return res
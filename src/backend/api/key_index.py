@@ -0,0 +1,306 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import hashlib
+import itertools
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable, List, Optional, Tuple, TypeVar
+
+from backend.api.types import Object
+
+T = TypeVar("T")
+
+# The maximum number of values bound to a single statement. Older SQLite
+# versions limit the number of variables to 999.
+MAX_SQL_VARIABLES = 900
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    scope TEXT NOT NULL,
+    delimiter TEXT NOT NULL,
+    prefix TEXT NOT NULL,
+    refreshed REAL NOT NULL,
+    PRIMARY KEY (scope, delimiter, prefix)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS entries (
+    scope TEXT NOT NULL,
+    delimiter TEXT NOT NULL,
+    parent TEXT NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    key TEXT NOT NULL,
+    size INTEGER,
+    etag TEXT,
+    last_modified TEXT,
+    PRIMARY KEY (scope, delimiter, parent, name, type)
+) WITHOUT ROWID;
+"""
+
+
+def index_scope(endpoint: str, access_key: str, bucket: str) -> str:
+    """
+    Returns the identifier of the index of a bucket. The index is kept
+    per user, because the listing of a bucket depends on the permissions
+    of the user.
+    """
+    return hashlib.sha256(
+        "\0".join([endpoint, access_key, bucket]).encode()
+    ).hexdigest()
+
+
+class KeyIndex:
+    """
+    A persistent index of the objects and folders of buckets, backed by
+    an SQLite database. The index is refreshed per folder from listings,
+    and a folder is served from the index until it is older than
+    `max_age` seconds.
+
+    The entries of a folder are stored by their parent prefix, thus the
+    children of a folder are looked up via the primary key in O(log n).
+    """
+
+    _path: str
+    _max_age: float
+    _lock: threading.Lock
+    _db: Optional[sqlite3.Connection]
+
+    def __init__(self, path: str, max_age: float = 60) -> None:
+        self._path = path
+        self._max_age = max_age
+        self._lock = threading.Lock()
+        self._db = None
+
+    @property
+    def max_age(self) -> float:
+        return self._max_age
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self._path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(SCHEMA)
+            self._db = db
+        return self._db
+
+    async def _run(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        def run() -> T:
+            with self._lock:
+                db = self._connect()
+                with db:
+                    return fn(db)
+
+        return await asyncio.to_thread(run)
+
+    async def get_folder(
+        self, scope: str, delimiter: str, prefix: str
+    ) -> Optional[List[Object]]:
+        """
+        Returns the objects and folders in the given folder, or `None` if
+        the folder is not indexed or the index is out of date.
+        """
+
+        def get(db: sqlite3.Connection) -> Optional[List[Object]]:
+            row = db.execute(
+                "SELECT refreshed FROM folders "
+                "WHERE scope = ? AND delimiter = ? AND prefix = ?",
+                (scope, delimiter, prefix),
+            ).fetchone()
+            if row is None or time.time() - row[0] > self._max_age:
+                return None
+            rows = db.execute(
+                "SELECT key, name, type, size, etag, last_modified "
+                "FROM entries WHERE scope = ? AND delimiter = ? "
+                "AND parent = ? ORDER BY name",
+                (scope, delimiter, prefix),
+            ).fetchall()
+            return [_row_to_object(row) for row in rows]
+
+        return await self._run(get)
+
+    async def put_folder(
+        self, scope: str, delimiter: str, prefix: str, objects: List[Object]
+    ) -> None:
+        """
+        Replaces the objects and folders of the given folder with the
+        result of a listing.
+        """
+
+        def put(db: sqlite3.Connection) -> None:
+            db.execute(
+                "DELETE FROM entries "
+                "WHERE scope = ? AND delimiter = ? AND parent = ?",
+                (scope, delimiter, prefix),
+            )
+            db.executemany(
+                "INSERT OR REPLACE INTO entries "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (scope, delimiter, prefix, *_object_to_row(obj))
+                    for obj in objects
+                ],
+            )
+            db.execute(
+                "INSERT OR REPLACE INTO folders VALUES (?, ?, ?, ?)",
+                (scope, delimiter, prefix, time.time()),
+            )
+
+        await self._run(put)
+
+    async def put_object(
+        self,
+        scope: str,
+        key: str,
+        size: Optional[int] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[datetime] = None,
+    ) -> None:
+        """
+        Adds or updates an object in the indexed folders, e.g. after it
+        has been uploaded. Missing parent folders are added as well.
+        """
+        obj = Object(
+            Key=key,
+            Name=key,
+            Size=size,
+            ETag=etag,
+            LastModified=last_modified or datetime.now(timezone.utc),
+        )
+
+        def put(db: sqlite3.Connection) -> None:
+            delimiters: List[str] = [
+                row[0]
+                for row in db.execute(
+                    "SELECT DISTINCT delimiter FROM folders WHERE scope = ?",
+                    (scope,),
+                )
+            ]
+            for delimiter in delimiters:
+                entries: List[Tuple[str, Object]] = []
+                parts = key.split(delimiter) if delimiter else [key]
+                parent = ""
+                for i, name in enumerate(parts[:-1]):
+                    folder_key = delimiter.join(parts[: i + 1])
+                    if name:
+                        entries.append(
+                            (
+                                parent,
+                                Object(
+                                    Key=folder_key, Name=name, Type="FOLDER"
+                                ),
+                            )
+                        )
+                    parent = folder_key + delimiter
+                entries.append((parent, obj.copy(update={"Name": parts[-1]})))
+                for parent, entry in entries:
+                    # Existing folders are kept, objects are replaced.
+                    conflict = "REPLACE" if entry.Type == "OBJECT" else "IGNORE"
+                    db.execute(
+                        f"INSERT OR {conflict} INTO entries "
+                        "SELECT ?, ?, ?, ?, ?, ?, ?, ?, ? WHERE EXISTS ("
+                        "SELECT 1 FROM folders WHERE scope = ? "
+                        "AND delimiter = ? AND prefix = ?)",
+                        (
+                            scope,
+                            delimiter,
+                            parent,
+                            *_object_to_row(entry),
+                            scope,
+                            delimiter,
+                            parent,
+                        ),
+                    )
+
+        await self._run(put)
+
+    async def invalidate(self, scope: str, key: str) -> None:
+        """
+        Drops the folders that contain the given key or prefix, as well as
+        the folders below it, from the index, e.g. after objects have been
+        deleted.
+        """
+        await self.invalidate_keys(scope, [key])
+
+    async def invalidate_keys(self, scope: str, keys: Iterable[str]) -> None:
+        """
+        Same as `invalidate`, for any number of keys in a single
+        transaction.
+
+        The folders that contain a key are looked up by the prefixes of
+        the key, and the folders below it by a range of prefixes, thus
+        both are primary key lookups instead of scans of the index.
+        """
+        keys = list(keys)
+
+        def drop(db: sqlite3.Connection) -> None:
+            delimiters: List[str] = [
+                row[0]
+                for row in db.execute(
+                    "SELECT DISTINCT delimiter FROM folders WHERE scope = ?",
+                    (scope,),
+                )
+            ]
+            for table, column in [("folders", "prefix"), ("entries", "parent")]:
+                where = f"DELETE FROM {table} WHERE scope = ? AND delimiter = ?"
+                for delimiter, key in itertools.product(delimiters, keys):
+                    ancestors = [key[:i] for i in range(len(key) + 1)]
+                    for i in range(0, len(ancestors), MAX_SQL_VARIABLES):
+                        chunk = ancestors[i : i + MAX_SQL_VARIABLES]
+                        db.execute(
+                            f"{where} AND {column} IN "
+                            f"({', '.join('?' * len(chunk))})",
+                            (scope, delimiter, *chunk),
+                        )
+                    db.execute(
+                        f"{where} AND {column} >= ? "
+                        f"AND {column} < ? || char(1114111)",
+                        (scope, delimiter, key, key),
+                    )
+
+        await self._run(drop)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def _object_to_row(obj: Object) -> Tuple[Any, ...]:
+    return (
+        obj.Name,
+        obj.Type,
+        obj.Key,
+        obj.Size,
+        obj.ETag,
+        obj.LastModified.isoformat() if obj.LastModified else None,
+    )
+
+
+def _row_to_object(row: Tuple[Any, ...]) -> Object:
+    key, name, type_, size, etag, last_modified = row
+    return Object.construct(
+        Key=key,
+        Name=name,
+        Type=type_,
+        Size=size,
+        ETag=etag,
+        LastModified=datetime.fromisoformat(last_modified)
+        if last_modified
+        else None,
+    )
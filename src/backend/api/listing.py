@@ -0,0 +1,448 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import abc
+import asyncio
+import contextlib
+import itertools
+import os
+from collections import deque
+from typing import (
+    Any,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    cast,
+)
+
+from types_aiobotocore_s3.client import S3Client
+from types_aiobotocore_s3.type_defs import (
+    ListObjectsV2OutputTypeDef,
+    ListObjectVersionsOutputTypeDef,
+)
+
+PageT = TypeVar("PageT")
+
+# The characters used to split the keyspace into ranges, sorted in the
+# order in which S3 returns the keys (UTF-8 binary order).
+SPLIT_CHARS: str = "".join(chr(c) for c in range(0x21, 0x7F))
+
+# The maximum number of pages of a key range that are listed ahead of the
+# consumer, see `_list_parallel()`.
+RANGE_BUFFER_PAGES: int = 2
+
+
+async def prefetch_pages(
+    fetch: Callable[[Dict[str, Any]], Awaitable[PageT]],
+    next_page: Callable[[PageT], Optional[Dict[str, Any]]],
+) -> AsyncGenerator[PageT, None]:
+    """
+    Helper function to iterate over the pages of a paginated S3 API
+    operation. The request for the next page is already in flight while
+    the current page is processed by the caller.
+
+    :param fetch: Requests a page. The function is called with the
+        additional arguments returned by `next_page`, e.g. the
+        continuation token. The first page is requested without any
+        additional arguments.
+    :param next_page: Returns the arguments to request the page that
+        follows the given one, or `None` if it is the last page.
+    """
+    task: Optional[asyncio.Future[PageT]] = asyncio.ensure_future(fetch({}))
+    try:
+        while task is not None:
+            page: PageT = await task
+            kwargs = next_page(page)
+            task = (
+                asyncio.ensure_future(fetch(kwargs))
+                if kwargs is not None
+                else None
+            )
+            yield page
+    finally:
+        # The consumer stopped early, e.g. the client has disconnected,
+        # so drop the pending request.
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await task
+
+
+class _ListOperation(abc.ABC):
+    """
+    Describes how to page through and split a listing operation.
+    """
+
+    # The names of the lists in the response that contain entries with
+    # a `Key`.
+    entries: Tuple[str, ...]
+
+    @abc.abstractmethod
+    async def fetch(
+        self,
+        s3: S3Client,
+        bucket: str,
+        prefix: str,
+        delimiter: str,
+        kwargs: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """
+        Requests a page of the listing, see `prefetch_pages()`.
+        """
+
+    @abc.abstractmethod
+    def next_page(self, page: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Returns the arguments to request the page that follows the given
+        one, or `None` if it is the last page.
+        """
+
+    @abc.abstractmethod
+    def start_after(self, key: str) -> Dict[str, Any]:
+        """
+        Returns the arguments to list the keys after the given key.
+        """
+
+
+class _ListObjectsV2(_ListOperation):
+    entries = ("Contents",)
+
+    async def fetch(
+        self,
+        s3: S3Client,
+        bucket: str,
+        prefix: str,
+        delimiter: str,
+        kwargs: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        res = await s3.list_objects_v2(
+            Bucket=bucket, Prefix=prefix, Delimiter=delimiter, **kwargs
+        )
+        return cast(Dict[str, Any], res)
+
+    def next_page(self, page: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not page.get("IsTruncated", False):
+            return None
+        return {"ContinuationToken": page["NextContinuationToken"]}
+
+    def start_after(self, key: str) -> Dict[str, Any]:
+        return {"StartAfter": key}
+
+
+class _ListObjectVersions(_ListOperation):
+    entries = ("Versions", "DeleteMarkers")
+
+    async def fetch(
+        self,
+        s3: S3Client,
+        bucket: str,
+        prefix: str,
+        delimiter: str,
+        kwargs: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        res = await s3.list_object_versions(
+            Bucket=bucket, Prefix=prefix, Delimiter=delimiter, **kwargs
+        )
+        return cast(Dict[str, Any], res)
+
+    def next_page(self, page: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not page.get("IsTruncated", False):
+            return None
+        # The versions of a key may be split across pages, thus both
+        # markers are needed to continue where the page ends.
+        res: Dict[str, Any] = {"KeyMarker": page["NextKeyMarker"]}
+        if page.get("NextVersionIdMarker"):
+            res["VersionIdMarker"] = page["NextVersionIdMarker"]
+        return res
+
+    def start_after(self, key: str) -> Dict[str, Any]:
+        return {"KeyMarker": key}
+
+
+def _keys(op: _ListOperation, page: Dict[str, Any]) -> List[str]:
+    keys: List[str] = [
+        entry["Key"] for name in op.entries for entry in page.get(name, [])
+    ]
+    keys.extend(cp["Prefix"] for cp in page.get("CommonPrefixes", []))
+    return keys
+
+
+def _last_key(op: _ListOperation, page: Dict[str, Any]) -> str:
+    return max(_keys(op, page), default="")
+
+
+def _split_bounds(
+    prefix: str, delimiter: str, keys: List[str], split_chars: str
+) -> List[str]:
+    """
+    Returns the sorted bounds at which the keyspace following the given
+    keys of the first page is split into ranges.
+
+    The keyspace is split at the prefix followed by every character in
+    `split_chars`. As the keys of the first page usually share a longer
+    common prefix, e.g. `logs/2023-01-01/`, the remainder is split at
+    every character of that common prefix as well, using the characters
+    of `split_chars` that occur in the keys, e.g. at `logs/2023-01-02`
+    and `logs/2024`. Bounds within a folder are of no use if a delimiter
+    is given, thus the common prefix ends at the first delimiter.
+    """
+    last_key = max(keys, default="")
+    base = os.path.commonprefix(keys) if keys else prefix
+    if not base.startswith(prefix):
+        base = prefix
+    rest = base[len(prefix) :]
+    if delimiter and delimiter in rest:
+        base = prefix + rest[: rest.index(delimiter)]
+    seen = {c for key in keys for c in key[len(prefix) :]}
+    chars = [c for c in split_chars if c in seen]
+    bounds: Set[str] = {prefix + c for c in split_chars}
+    for i in range(len(prefix) + 1, len(base) + 1):
+        bounds.update(base[:i] + c for c in chars)
+    return sorted(b for b in bounds if b > last_key)
+
+
+def _clip(
+    op: _ListOperation, page: Dict[str, Any], upper: Optional[str]
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Removes the entries that are beyond the upper bound of a key range.
+    Returns the clipped page and whether the page exceeded the range.
+    """
+    if upper is None:
+        return page, False
+    exceeded = _last_key(op, page) > upper
+    if not exceeded:
+        return page, False
+    res = dict(page)
+    for name in op.entries:
+        res[name] = [e for e in page.get(name, []) if e["Key"] <= upper]
+    res["CommonPrefixes"] = [
+        cp for cp in page.get("CommonPrefixes", []) if cp["Prefix"] <= upper
+    ]
+    return res, True
+
+
+async def _list_parallel(
+    op: _ListOperation,
+    s3: S3Client,
+    bucket: str,
+    prefix: str,
+    delimiter: str,
+    max_workers: int,
+    split_chars: str,
+) -> AsyncGenerator[Dict[str, Any], None]:
+    async def fetch(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        return await op.fetch(s3, bucket, prefix, delimiter, kwargs)
+
+    first: Dict[str, Any] = await fetch({})
+    cursor = op.next_page(first)
+    if cursor is None:
+        yield first
+        return
+
+    if max_workers <= 1:
+        # Continue after the first page. The request for the second page
+        # is sent before the first page is yielded.
+        start: Dict[str, Any] = cursor
+        pages = prefetch_pages(
+            lambda kwargs: fetch(kwargs or start), op.next_page
+        )
+        second = asyncio.ensure_future(pages.__anext__())
+        try:
+            yield first
+            yield await second
+            async for page in pages:
+                yield page
+        finally:
+            second.cancel()
+            await asyncio.gather(second, return_exceptions=True)
+            await pages.aclose()
+        return
+
+    # The listing does not fit into a single page. Split the remaining
+    # keyspace into the ranges `(lower, upper]`, where the first range
+    # continues after the first page, see `_split_bounds()`.
+    bounds = _split_bounds(prefix, delimiter, _keys(op, first), split_chars)
+    ranges: List[Tuple[Dict[str, Any], Optional[str]]] = [
+        (cursor, bounds[0] if bounds else None)
+    ]
+    ranges.extend(
+        (op.start_after(lower), upper)
+        for lower, upper in zip(bounds, [*bounds[1:], None])
+    )
+
+    async def list_range(
+        kwargs: Optional[Dict[str, Any]],
+        upper: Optional[str],
+        pages: "asyncio.Queue[Optional[Dict[str, Any]]]",
+    ) -> None:
+        # The pages are passed on via a bounded queue, thus the listing
+        # of a range pauses until the consumer catches up. `None` marks
+        # the end of the range.
+        try:
+            while kwargs is not None:
+                page, exceeded = _clip(op, await fetch(kwargs), upper)
+                await pages.put(page)
+                kwargs = None if exceeded else op.next_page(page)
+        except Exception:
+            # The error is raised once the consumer reaches this range.
+            await pages.put(None)
+            raise
+        await pages.put(None)
+
+    # The ranges that are listed, in key order. At most `max_workers`
+    # ranges are listed at the same time, thus at most about
+    # `max_workers * RANGE_BUFFER_PAGES` pages are kept in memory.
+    pending: Deque[
+        Tuple["asyncio.Task[None]", "asyncio.Queue[Optional[Dict[str, Any]]]"]
+    ] = deque()
+    remaining = iter(ranges)
+
+    def start_ranges() -> None:
+        for kwargs, upper in itertools.islice(
+            remaining, max_workers - len(pending)
+        ):
+            pages: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(
+                RANGE_BUFFER_PAGES
+            )
+            task = asyncio.ensure_future(list_range(kwargs, upper, pages))
+            pending.append((task, pages))
+
+    start_ranges()
+    try:
+        yield first
+        # A folder may be reported by neighboring ranges, e.g. if a range
+        # bound is located within the folder.
+        folders: Set[str] = {
+            cp["Prefix"] for cp in first.get("CommonPrefixes", [])
+        }
+        while pending:
+            task, pages = pending[0]
+            while (page := await pages.get()) is not None:
+                cps = [
+                    cp
+                    for cp in page.get("CommonPrefixes", [])
+                    if cp["Prefix"] not in folders
+                ]
+                folders.update(cp["Prefix"] for cp in cps)
+                yield {**page, "CommonPrefixes": cps}
+            await task
+            pending.popleft()
+            start_ranges()
+    finally:
+        for task, _ in pending:
+            task.cancel()
+        await asyncio.gather(
+            *(task for task, _ in pending), return_exceptions=True
+        )
+
+
+def list_objects_pages(
+    s3: S3Client,
+    bucket: str,
+    prefix: str = "",
+    delimiter: str = "",
+    max_workers: int = 1,
+    split_chars: str = SPLIT_CHARS,
+) -> AsyncGenerator[ListObjectsV2OutputTypeDef, None]:
+    """
+    Yields the pages of a `list_objects_v2` listing in key order.
+
+    If the listing does not fit into a single page and `max_workers` is
+    greater than one, the remaining keyspace is split into ranges at
+    `prefix + c` for every character `c` in `split_chars`, and at the
+    characters following the common prefix of the keys of the first
+    page, see `_split_bounds()`. These ranges are listed concurrently by
+    at most `max_workers` workers, using `StartAfter`, and yielded in key
+    order. A worker lists at most `RANGE_BUFFER_PAGES` pages ahead of the
+    consumer, thus the memory is bounded. Otherwise, the pages are
+    listed sequentially, while the next page is already requested when
+    the current one is yielded.
+
+    Note, the pages of a parallel listing only contain the `Contents`
+    and `CommonPrefixes` of the original responses reliably, e.g. the
+    continuation tokens are of no use for the caller.
+    """
+    return cast(
+        AsyncGenerator[ListObjectsV2OutputTypeDef, None],
+        _list_parallel(
+            _ListObjectsV2(),
+            s3,
+            bucket,
+            prefix,
+            delimiter,
+            max_workers,
+            split_chars,
+        ),
+    )
+
+
+def list_object_versions_pages(
+    s3: S3Client,
+    bucket: str,
+    prefix: str = "",
+    delimiter: str = "",
+    max_workers: int = 1,
+    split_chars: str = SPLIT_CHARS,
+) -> AsyncGenerator[ListObjectVersionsOutputTypeDef, None]:
+    """
+    Yields the pages of a `list_object_versions` listing in key order.
+    See `list_objects_pages` for details; the ranges are listed via
+    `KeyMarker` instead of `StartAfter`.
+
+    Note, the pages of a parallel listing only contain the `Versions`,
+    `DeleteMarkers` and `CommonPrefixes` of the original responses
+    reliably.
+    """
+    return cast(
+        AsyncGenerator[ListObjectVersionsOutputTypeDef, None],
+        _list_parallel(
+            _ListObjectVersions(),
+            s3,
+            bucket,
+            prefix,
+            delimiter,
+            max_workers,
+            split_chars,
+        ),
+    )
+
+
+async def list_key_versions_pages(
+    s3: S3Client, bucket: str, key: str, delimiter: str = "/"
+) -> AsyncGenerator[ListObjectVersionsOutputTypeDef, None]:
+    """
+    Yields the pages of a `list_object_versions` listing that contain
+    the versions and delete markers of exactly the given key.
+
+    The listing uses the key as prefix, thus its versions are returned
+    first, and stops as soon as it moves past the key. The delimiter
+    makes sure that the children of the key, e.g. `a/b` for the key
+    `a`, are rolled up into a single folder instead of being listed.
+    """
+    op = _ListObjectVersions()
+    kwargs: Optional[Dict[str, Any]] = {}
+    while kwargs is not None:
+        page, exceeded = _clip(
+            op, await op.fetch(s3, bucket, key, delimiter, kwargs), key
+        )
+        yield cast(ListObjectVersionsOutputTypeDef, page)
+        kwargs = None if exceeded else op.next_page(page)
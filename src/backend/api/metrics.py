@@ -0,0 +1,64 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Dict
+
+from fastapi import Request
+from fastapi.routing import APIRouter
+from pydantic import BaseModel, Field
+
+
+class Metrics:
+    """
+    Counts the events of the API since the backend has been started.
+    """
+
+    def __init__(self) -> None:
+        self.cancelled_requests: Dict[str, int] = {}
+
+    def count_cancelled(self, operation: str) -> None:
+        """
+        Counts a request that has been cancelled because the client
+        disconnected before the response was complete.
+
+        :param operation: The name of the endpoint, e.g. `list_objects`.
+        """
+        self.cancelled_requests[operation] = (
+            self.cancelled_requests.get(operation, 0) + 1
+        )
+
+
+class MetricsResponse(BaseModel):
+    CancelledRequests: int = Field(
+        description="The number of requests that have been cancelled "
+        "because the client disconnected."
+    )
+    CancelledRequestsByOperation: Dict[str, int] = Field(
+        description="The number of cancelled requests per endpoint."
+    )
+
+
+router = APIRouter(prefix="/metrics", tags=["config"])
+
+
+@router.get(
+    "/",
+    response_model=MetricsResponse,
+)
+async def get_metrics(req: Request) -> MetricsResponse:
+    metrics: Metrics = req.app.state.metrics
+    return MetricsResponse(
+        CancelledRequests=sum(metrics.cancelled_requests.values()),
+        CancelledRequestsByOperation=dict(metrics.cancelled_requests),
+    )
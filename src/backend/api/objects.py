@@ -12,28 +12,45 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import asyncio
+import contextlib
+import email.utils
+import time
 from collections import deque
-from typing import Annotated, Any, Deque, List, Optional
+from datetime import datetime, timezone
+from typing import (
+    Annotated,
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    cast,
+)
 
+from botocore.exceptions import ClientError
 from fastapi import (
     Depends,
     File,
     Form,
+    Header,
     HTTPException,
+    Request,
     Response,
     UploadFile,
     status,
 )
 from fastapi.logger import logger
-from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRouter
-from pydantic import parse_obj_as
-from starlette.types import Send
+from pydantic import BaseModel, ValidationError, parse_obj_as
+from starlette.types import Receive, Scope, Send
+from types_aiobotocore_s3.client import S3Client
 from types_aiobotocore_s3.type_defs import (
     CommonPrefixTypeDef,
     CopySourceTypeDef,
     DeleteMarkerEntryTypeDef,
-    DeleteObjectsOutputTypeDef,
     GetObjectOutputTypeDef,
     HeadObjectOutputTypeDef,
     ListObjectsV2OutputTypeDef,
@@ -45,19 +62,73 @@ from types_aiobotocore_s3.type_defs import (
     ObjectVersionTypeDef,
 )
 
-from backend.api import S3GWClient, s3gw_client, s3gw_client_responses
+from backend.api import (
+    S3GWClient,
+    s3gw_client,
+    s3gw_client_responses,
+    s3gw_job_manager,
+)
+from backend.api.archive import (
+    MEDIA_TYPES,
+    archive_base,
+    archive_stream,
+    prefix_entries,
+    selection_entries,
+)
+from backend.api.compression import disable_compression
+from backend.api.copying import copy_object
+from backend.api.deletion import (
+    MAX_DELETE_KEYS,
+    batch_versions,
+    delete_batches,
+    parse_json_values,
+)
+from backend.api.download import (
+    TransferStats,
+    buffered_body,
+    measure,
+    parallel_body,
+)
+from backend.api.job_manager import JobManager, JobProgress
+from backend.api.jobs import job_responses
+from backend.api.key_index import index_scope
+from backend.api.listing import (
+    list_key_versions_pages,
+    list_object_versions_pages,
+    list_objects_pages,
+)
+from backend.api.query import ObjectQuery
+from backend.api.responses import (
+    ClosingStreamingResponse,
+    columns_responses,
+    dumps,
+    model_response,
+)
+from backend.api.restore import add_restore_result, restore_versions
 from backend.api.types import (
     DeletedObject,
     DeleteObjectByPrefixRequest,
+    DeleteObjectError,
     DeleteObjectRequest,
+    DeleteObjectsResult,
+    DeleteResult,
+    DownloadArchiveRequest,
+    Job,
+    ListObjectsPage,
+    ListObjectsPageRequest,
     ListObjectsRequest,
+    ListObjectVersionsPage,
+    ListObjectVersionsPageRequest,
     ListObjectVersionsRequest,
     Object,
     ObjectAttributes,
+    ObjectIdentifier,
     ObjectLockLegalHold,
     ObjectRequest,
     ObjectVersion,
+    RestoreObjectByPrefixRequest,
     RestoreObjectRequest,
+    RestoreResult,
     SetObjectLockLegalHoldRequest,
     SetObjectTaggingRequest,
     Tag,
@@ -66,6 +137,9 @@ from backend.api.types import (
 router = APIRouter(prefix="/objects")
 
 S3GWClientDep = Annotated[S3GWClient, Depends(s3gw_client)]
+JobManagerDep = Annotated[JobManager, Depends(s3gw_job_manager)]
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
 
 def split_key(key: str, delimiter: str = "/") -> List[str]:
@@ -87,13 +161,187 @@ def build_key(
     return delimiter.join(parts)
 
 
-class ObjectBodyStreamingResponse(StreamingResponse):
+def key_name(key: str, delimiter: str = "/") -> str:
+    """
+    Helper function to get the last part of a key, e.g. the file name.
+    Same as `split_key(key, delimiter).pop()`, but cheaper.
+    """
+    return key.rstrip(delimiter).rpartition(delimiter)[2]
+
+
+def _folder_key(prefix: str) -> str:
+    key = prefix.strip("/")
+    return build_key(key) if "//" in key else key
+
+
+def list_objects_output_to_objects(
+    s3_res: ListObjectsV2OutputTypeDef,
+) -> List[Object]:
+    """
+    Helper function to convert a `list_objects_v2` response into a list
+    of objects and "virtual folders".
+
+    Note, the response is trusted, thus the objects are constructed
+    without validation.
+    """
+    res: List[Object] = []
+    content: ObjectTypeDef
+    for content in s3_res.get("Contents", []):
+        key = content.get("Key", "")
+        res.append(
+            Object.construct(
+                Key=key,
+                Name=key_name(key),
+                LastModified=content.get("LastModified"),
+                ETag=content.get("ETag"),
+                Size=content.get("Size"),
+                Owner=content.get("Owner"),
+            )
+        )
+    cp: CommonPrefixTypeDef
+    for cp in s3_res.get("CommonPrefixes", []):
+        prefix = cp.get("Prefix", "")
+        res.append(
+            Object.construct(
+                Key=_folder_key(prefix),
+                Name=key_name(prefix),
+                Type="FOLDER",
+            )
+        )
+    return res
+
+
+def list_object_versions_output_to_objects(
+    s3_res: ListObjectVersionsOutputTypeDef,
+) -> List[ObjectVersion]:
+    """
+    Helper function to convert a `list_object_versions` response into a
+    list of object versions, delete markers and "virtual folders".
+
+    Note, the response is trusted, thus the object versions are
+    constructed without validation.
+    """
+    res: List[ObjectVersion] = []
+    version: ObjectVersionTypeDef
+    for version in s3_res.get("Versions", []):
+        key = version.get("Key", "")
+        res.append(
+            ObjectVersion.construct(
+                Key=key,
+                Name=key_name(key),
+                VersionId=version.get("VersionId"),
+                LastModified=version.get("LastModified"),
+                ETag=version.get("ETag"),
+                Size=version.get("Size"),
+                Owner=version.get("Owner"),
+                IsDeleted=False,
+                IsLatest=version.get("IsLatest", False),
+            )
+        )
+    cp: CommonPrefixTypeDef
+    for cp in s3_res.get("CommonPrefixes", []):
+        prefix = cp.get("Prefix", "")
+        res.append(
+            ObjectVersion.construct(
+                Key=_folder_key(prefix),
+                Name=key_name(prefix),
+                Type="FOLDER",
+                IsDeleted=False,
+                IsLatest=True,
+            )
+        )
+    dm: DeleteMarkerEntryTypeDef
+    for dm in s3_res.get("DeleteMarkers", []):
+        key = dm.get("Key", "")
+        res.append(
+            ObjectVersion.construct(
+                Key=key,
+                Name=key_name(key),
+                VersionId=dm.get("VersionId"),
+                LastModified=dm.get("LastModified"),
+                Size=0,
+                Owner=dm.get("Owner"),
+                IsDeleted=True,
+                IsLatest=dm.get("IsLatest", False),
+            )
+        )
+    return res
+
+
+def key_index_scope(conn: S3GWClient, bucket: str) -> str:
+    """
+    Helper function to get the identifier of the index of the bucket.
+    """
+    return index_scope(conn.endpoint, conn.access_key, bucket)
+
+
+def to_ndjson(items: Sequence[BaseModel]) -> bytes:
+    """
+    Helper function to serialize the given models as newline-delimited
+    JSON.
+    """
+    return b"".join(dumps(item) + b"\n" for item in items)
+
+
+def parse_range(value: Optional[str]) -> Optional[str]:
+    """
+    Helper function to validate the value of a `Range` header. Only a
+    single byte range is supported, e.g. `bytes=0-99`, `bytes=100-` or
+    the suffix range `bytes=-100`. Returns `None` for other values, in
+    which case the header is ignored and the whole object is returned.
+    """
+    if value is None:
+        return None
+    unit, _, spec = value.strip().partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    first, last = first.strip(), last.strip()
+    if not sep or not (first or last):
+        return None
+    if not all(part.isdigit() for part in [first, last] if part):
+        return None
+    if first and last and int(last) < int(first):
+        return None
+    return f"bytes={first}-{last}"
+
+
+def _parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        return email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def _empty_body() -> AsyncIterator[bytes]:
+    return
+    yield
+
+
+class ObjectBodyStreamingResponse(ClosingStreamingResponse):
     """
     Helper class to stream the object body.
+
+    A single byte range of the object is streamed with `206 Partial
+    Content` if a `Range` is given, e.g. to resume a download. The
+    conditional headers are passed on to S3, thus `304 Not Modified` is
+    returned without fetching the body if the object has not changed.
+
+    Large objects are fetched via concurrent ranged requests if enabled,
+    see `DownloadOptions`. Otherwise, the body is sent in large chunks of
+    `buffer_size` bytes, instead of the small chunks of the S3 response.
+    The throughput of the download is recorded in `stats`.
     """
 
     def __init__(
-        self, conn: S3GWClientDep, bucket: str, params: ObjectRequest
+        self,
+        conn: S3GWClientDep,
+        bucket: str,
+        params: ObjectRequest,
+        range_: Optional[str] = None,
+        if_range: Optional[str] = None,
+        if_none_match: Optional[str] = None,
+        if_modified_since: Optional[str] = None,
     ):  # noqa
         # Note, do not call the parent class constructor which does some
         # initializations that we don't want at the moment. These are
@@ -101,34 +349,120 @@ class ObjectBodyStreamingResponse(StreamingResponse):
         self._conn = conn
         self._bucket = bucket
         self._params = params
+        self._range = parse_range(range_)
+        self._if_range = if_range
+        self._if_none_match = if_none_match
+        self._if_modified_since = (
+            None
+            if if_modified_since is None
+            else _parse_http_date(if_modified_since)
+        )
         self.status_code = 200
         self.background = None
+        self.stats = TransferStats()
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        # The object body is sent as is, it may already be compressed.
+        disable_compression(scope)
+        await super().__call__(scope, receive, send)
+
+    async def _get_object(self, s3: S3Client) -> GetObjectOutputTypeDef:
+        kwargs: Dict[str, Any] = {
+            "Bucket": self._bucket,
+            "Key": self._params.Key,
+        }
+        if self._params.VersionId:
+            kwargs["VersionId"] = self._params.VersionId
+        if self._if_none_match is not None:
+            kwargs["IfNoneMatch"] = self._if_none_match
+        if self._if_modified_since is not None:
+            kwargs["IfModifiedSince"] = self._if_modified_since
+        if self._range is None:
+            return await s3.get_object(**kwargs)
+        if self._if_range is None:
+            return await s3.get_object(Range=self._range, **kwargs)
+        # The range is only returned if the object has not changed since
+        # the client obtained the other parts, otherwise the whole object.
+        # Note, `If-Range` requires the strong comparison of entity tags.
+        condition: Dict[str, Any] = {}
+        if self._if_range.startswith('"'):
+            condition["IfMatch"] = self._if_range
+        elif not self._if_range.startswith("W/"):
+            date = _parse_http_date(self._if_range)
+            if date is not None:
+                condition["IfUnmodifiedSince"] = date
+        if not condition:
+            return await s3.get_object(**kwargs)
+        try:
+            return await s3.get_object(Range=self._range, **condition, **kwargs)
+        except ClientError as e:
+            if _client_error_status(e) != status.HTTP_412_PRECONDITION_FAILED:
+                raise
+        return await s3.get_object(**kwargs)
 
     async def stream_response(self, send: Send) -> None:
         # We need to fetch the object to be able to stream it later and
         # to populate the response header with information of the object,
         # e.g. content type, size or ETag.
         async with self._conn.conn() as s3:
-            s3_res: GetObjectOutputTypeDef = await s3.get_object(
-                Bucket=self._bucket,
-                Key=self._params.Key,
-                VersionId=self._params.VersionId,
-            )
+            try:
+                s3_res: GetObjectOutputTypeDef = await self._get_object(s3)
+            except ClientError as e:
+                if _client_error_status(e) != status.HTTP_304_NOT_MODIFIED:
+                    raise
+                # The object has not changed, its body is not sent.
+                http_headers: Dict[str, str] = e.response.get(
+                    "ResponseMetadata", {}
+                ).get("HTTPHeaders", {})
+                self.status_code = status.HTTP_304_NOT_MODIFIED
+                self.body_iterator = _empty_body()
+                self.media_type = None
+                headers = {
+                    name: value
+                    for name, value in http_headers.items()
+                    if name in ["etag", "last-modified"]
+                }
+                # A single entity tag is the one that matched.
+                tag = self._if_none_match
+                if "etag" not in headers and tag and "," not in tag:
+                    if tag.strip() != "*":
+                        headers["etag"] = tag.strip()
+                self.init_headers(headers)
+                await super().stream_response(send)
+                return
 
             filename: str = split_key(self._params.Key).pop()
             headers = {
                 "content-length": str(s3_res["ContentLength"]),
                 "content-disposition": f"attachment; filename={filename}",
+                "accept-ranges": "bytes",
             }
             if "ETag" in s3_res:
                 headers["etag"] = s3_res["ETag"]
+            if "LastModified" in s3_res:
+                headers["last-modified"] = email.utils.format_datetime(
+                    s3_res["LastModified"].astimezone(timezone.utc),
+                    usegmt=True,
+                )
+            if "ContentRange" in s3_res:
+                self.status_code = status.HTTP_206_PARTIAL_CONTENT
+                headers["content-range"] = s3_res["ContentRange"]
 
             # Set the properties of the class and initialize the headers.
             # This is usually all done in the `StreamingResponse` class
             # constructor, but the necessary information is only available
             # after the object has been fetched via S3 API. So we need to
             # do the necessary work right here afterward.
-            self.body_iterator = s3_res["Body"]
+            options = self._conn.download_options
+            if options.is_parallel(s3_res):
+                body = parallel_body(
+                    s3, self._bucket, self._params.Key, s3_res, options
+                )
+            else:
+                body = buffered_body(s3_res, options)
+            self.body_iterator = measure(body, self.stats, self._params.Key)
             self.media_type = s3_res["ContentType"]
             self.init_headers(headers)
 
@@ -136,10 +470,22 @@ class ObjectBodyStreamingResponse(StreamingResponse):
             await super().stream_response(send)
 
 
-@router.post(
-    "/{bucket}",
-    response_model=List[Object],
-    responses=s3gw_client_responses(),
+def _client_error_status(e: ClientError) -> int:
+    return e.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+
+
+@model_response(
+    router.post(
+        "/{bucket}",
+        response_model=List[Object],
+        responses={
+            **s3gw_client_responses(),
+            **columns_responses(),
+        },
+    ),
+    columns=True,
+    conditional=True,
+    fields=Object,
 )
 async def list_objects(
     conn: S3GWClientDep,
@@ -159,47 +505,173 @@ async def list_objects(
     See
     https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/s3/client/list_objects_v2.html
     """
-    async with conn.conn() as s3:
-        res: List[Object] = []
-        continuation_token: str = ""
-        while True:
-            s3_res: ListObjectsV2OutputTypeDef = await s3.list_objects_v2(
-                Bucket=bucket,
-                Prefix=params.Prefix,
-                Delimiter=params.Delimiter,
-                ContinuationToken=continuation_token,
-            )
-            content: ObjectTypeDef
-            for content in s3_res.get("Contents", []):
-                res.append(
-                    parse_obj_as(
-                        Object,
-                        {
-                            "Name": split_key(content["Key"]).pop(),
-                            "Type": "OBJECT",
-                            **content,
-                        },
-                    )
-                )
-            cp: CommonPrefixTypeDef
-            for cp in s3_res.get("CommonPrefixes", []):
-                res.append(
-                    Object(
-                        Key=build_key(cp["Prefix"]),
-                        Name=split_key(cp["Prefix"]).pop(),
-                        Type="FOLDER",
-                    )
-                )
-            if not s3_res.get("IsTruncated", False):
+    query: ObjectQuery[Object] = ObjectQuery(params)
+    res: List[Object] = []
+
+    # Folders are served from the index, if available.
+    key_index = conn.key_index
+    use_index: bool = (
+        key_index is not None
+        and params.Delimiter != ""
+        and (params.Prefix == "" or params.Prefix.endswith(params.Delimiter))
+    )
+    if key_index is not None and use_index:
+        indexed = await key_index.get_folder(
+            key_index_scope(conn, bucket), params.Delimiter, params.Prefix
+        )
+        if indexed is not None:
+            res.extend(query.add(indexed))
+            res.extend(query.flush())
+            return res
+
+    async with conn.conn() as s3, contextlib.aclosing(
+        list_objects_pages(
+            s3, bucket, params.Prefix, params.Delimiter, conn.list_workers
+        )
+    ) as pages:
+        listed: List[Object] = []
+        s3_res: ListObjectsV2OutputTypeDef
+        async for s3_res in pages:
+            page = list_objects_output_to_objects(s3_res)
+            if use_index:
+                listed.extend(page)
+            res.extend(query.add(page))
+            if query.done:
                 break
-            continuation_token = s3_res["NextContinuationToken"]
+        else:
+            if key_index is not None and use_index:
+                await key_index.put_folder(
+                    key_index_scope(conn, bucket),
+                    params.Delimiter,
+                    params.Prefix,
+                    listed,
+                )
+    res.extend(query.flush())
     return res
 
 
+@model_response(
+    router.post(
+        "/{bucket}/page",
+        response_model=ListObjectsPage,
+        responses={
+            **s3gw_client_responses(),
+            **columns_responses(),
+        },
+    ),
+    columns=True,
+    conditional=True,
+    fields=Object,
+)
+async def list_objects_page(
+    conn: S3GWClientDep,
+    bucket: str,
+    params: ListObjectsPageRequest = ListObjectsPageRequest(),
+) -> ListObjectsPage:
+    """
+    Returns a single page of objects and folders, thus large buckets can
+    be browsed incrementally. Use `StartAfter` to jump to a specific key,
+    and pass the returned `NextContinuationToken` as `ContinuationToken`
+    to obtain the next page.
+
+    Note that this is a POST request instead of a usual GET request
+    because the parameters specified in `ListObjectsPageRequest` need to
+    be in the request `body` as these may exceed the maximum allowed
+    length of a URL.
+
+    See
+    https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/s3/client/list_objects_v2.html
+    """
+    # Note, an empty continuation token is taken as the marker by RGW,
+    # thus `StartAfter` would be ignored.
+    kwargs: Dict[str, Any] = {}
+    if params.StartAfter:
+        kwargs["StartAfter"] = params.StartAfter
+    if params.ContinuationToken:
+        kwargs["ContinuationToken"] = params.ContinuationToken
+    async with conn.conn() as s3:
+        s3_res: ListObjectsV2OutputTypeDef = await s3.list_objects_v2(
+            Bucket=bucket,
+            Prefix=params.Prefix,
+            Delimiter=params.Delimiter,
+            MaxKeys=params.MaxKeys,
+            **kwargs,
+        )
+    query: ObjectQuery[Object] = ObjectQuery(params)
+    res = query.add(list_objects_output_to_objects(s3_res))
+    res.extend(query.flush())
+    is_truncated: bool = s3_res.get("IsTruncated", False)
+    return ListObjectsPage.construct(
+        Objects=res,
+        IsTruncated=is_truncated,
+        NextContinuationToken=s3_res.get("NextContinuationToken")
+        if is_truncated
+        else None,
+    )
+
+
 @router.post(
-    "/{bucket}/versions",
-    response_model=List[ObjectVersion],
-    responses=s3gw_client_responses(),
+    "/{bucket}/stream",
+    response_class=ClosingStreamingResponse,
+    responses={
+        **s3gw_client_responses(),
+        200: {
+            "content": {NDJSON_MEDIA_TYPE: {}},
+            "description": "One `Object` per line.",
+        },
+    },
+)
+async def list_objects_stream(
+    conn: S3GWClientDep,
+    bucket: str,
+    params: ListObjectsRequest = ListObjectsRequest(),
+) -> ClosingStreamingResponse:
+    """
+    Same as `list_objects`, but the objects and folders are streamed as
+    newline-delimited JSON while the pages of the listing arrive, instead
+    of collecting the whole listing first.
+
+    Note, errors that occur after the first page has been sent can not
+    be reported via the HTTP status code anymore; the stream is aborted
+    in that case.
+
+    See
+    https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/s3/client/list_objects_v2.html
+    """
+
+    async def generate() -> AsyncIterator[bytes]:
+        query: ObjectQuery[Object] = ObjectQuery(params)
+        async with conn.conn() as s3, contextlib.aclosing(
+            list_objects_pages(
+                s3, bucket, params.Prefix, params.Delimiter, conn.list_workers
+            )
+        ) as pages:
+            s3_res: ListObjectsV2OutputTypeDef
+            async for s3_res in pages:
+                res = query.add(list_objects_output_to_objects(s3_res))
+                if res:
+                    yield to_ndjson(res)
+                if query.done:
+                    break
+        res = query.flush()
+        if res:
+            yield to_ndjson(res)
+
+    return ClosingStreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
+
+
+@model_response(
+    router.post(
+        "/{bucket}/versions",
+        response_model=List[ObjectVersion],
+        responses={
+            **s3gw_client_responses(),
+            **columns_responses(),
+        },
+    ),
+    columns=True,
+    conditional=True,
+    fields=ObjectVersion,
 )
 async def list_object_versions(
     conn: S3GWClientDep,
@@ -215,58 +687,23 @@ async def list_object_versions(
     See
     https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/s3/client/list_object_versions.html
     """
-    async with conn.conn() as s3:
+    query: ObjectQuery[ObjectVersion] = ObjectQuery(params)
+    async with conn.conn() as s3, contextlib.aclosing(
+        list_key_versions_pages(s3, bucket, params.Prefix, params.Delimiter)
+        if params.Strict
+        else list_object_versions_pages(
+            s3, bucket, params.Prefix, params.Delimiter, conn.list_workers
+        )
+    ) as pages:
         res: List[ObjectVersion] = []
-        key_marker: str = ""
-        while True:
-            s3_res: ListObjectVersionsOutputTypeDef = (
-                await s3.list_object_versions(
-                    Bucket=bucket,
-                    Prefix=params.Prefix,
-                    Delimiter=params.Delimiter,
-                    KeyMarker=key_marker,
-                )
+        s3_res: ListObjectVersionsOutputTypeDef
+        async for s3_res in pages:
+            res.extend(
+                query.add(list_object_versions_output_to_objects(s3_res))
             )
-            version: ObjectVersionTypeDef
-            for version in s3_res.get("Versions", []):
-                res.append(
-                    parse_obj_as(
-                        ObjectVersion,
-                        {
-                            "Name": split_key(version["Key"]).pop(),
-                            "Type": "OBJECT",
-                            "IsDeleted": False,
-                            **version,
-                        },
-                    )
-                )
-            cp: CommonPrefixTypeDef
-            for cp in s3_res.get("CommonPrefixes", []):
-                res.append(
-                    ObjectVersion(
-                        Key=build_key(cp["Prefix"]),
-                        Name=split_key(cp["Prefix"]).pop(),
-                        Type="FOLDER",
-                        IsDeleted=False,
-                        IsLatest=True,
-                    )
-                )
-                dm: DeleteMarkerEntryTypeDef
-            for dm in s3_res.get("DeleteMarkers", []):
-                res.append(
-                    ObjectVersion.parse_obj(
-                        {
-                            "Name": split_key(dm["Key"]).pop(),
-                            "Type": "OBJECT",
-                            "Size": 0,
-                            "IsDeleted": True,
-                            **dm,
-                        }
-                    )
-                )
-            if not s3_res.get("IsTruncated", False):
+            if query.done:
                 break
-            key_marker = s3_res["NextKeyMarker"]
+    res.extend(query.flush())
 
     if params.Strict:
         # Return only that object versions that exactly match the given
@@ -276,6 +713,126 @@ async def list_object_versions(
     return res
 
 
+@model_response(
+    router.post(
+        "/{bucket}/versions/page",
+        response_model=ListObjectVersionsPage,
+        responses={
+            **s3gw_client_responses(),
+            **columns_responses(),
+        },
+    ),
+    columns=True,
+    conditional=True,
+    fields=ObjectVersion,
+)
+async def list_object_versions_page(
+    conn: S3GWClientDep,
+    bucket: str,
+    params: ListObjectVersionsPageRequest = ListObjectVersionsPageRequest(),
+) -> ListObjectVersionsPage:
+    """
+    Returns a single page of object versions, delete markers and folders,
+    thus keys with many versions can be browsed incrementally. Pass the
+    returned `NextKeyMarker` and `NextVersionIdMarker` as `KeyMarker` and
+    `VersionIdMarker` to obtain the next page.
+
+    Note that with `Strict`, a page may contain less than `MaxKeys`
+    entries, or none at all, while `IsTruncated` is still `True`.
+
+    Note that this is a POST request instead of a usual GET request
+    because the parameters specified in `ListObjectVersionsPageRequest`
+    need to be in the request `body` as these may exceed the maximum
+    allowed length of a URL.
+
+    See
+    https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/s3/client/list_object_versions.html
+    """
+    kwargs: Dict[str, Any] = {}
+    if params.KeyMarker:
+        kwargs["KeyMarker"] = params.KeyMarker
+        if params.VersionIdMarker:
+            kwargs["VersionIdMarker"] = params.VersionIdMarker
+    async with conn.conn() as s3:
+        s3_res: ListObjectVersionsOutputTypeDef = await s3.list_object_versions(
+            Bucket=bucket,
+            Prefix=params.Prefix,
+            Delimiter=params.Delimiter,
+            MaxKeys=params.MaxKeys,
+            **kwargs,
+        )
+    res = list_object_versions_output_to_objects(s3_res)
+    if params.Strict:
+        res = [obj for obj in res if obj.Key == params.Prefix]
+    query: ObjectQuery[ObjectVersion] = ObjectQuery(params)
+    res = query.add(res)
+    res.extend(query.flush())
+    is_truncated: bool = s3_res.get("IsTruncated", False)
+    return ListObjectVersionsPage.construct(
+        Objects=res,
+        IsTruncated=is_truncated,
+        NextKeyMarker=s3_res.get("NextKeyMarker") if is_truncated else None,
+        NextVersionIdMarker=s3_res.get("NextVersionIdMarker")
+        if is_truncated
+        else None,
+    )
+
+
+@router.post(
+    "/{bucket}/versions/stream",
+    response_class=ClosingStreamingResponse,
+    responses={
+        **s3gw_client_responses(),
+        200: {
+            "content": {NDJSON_MEDIA_TYPE: {}},
+            "description": "One `ObjectVersion` per line.",
+        },
+    },
+)
+async def list_object_versions_stream(
+    conn: S3GWClientDep,
+    bucket: str,
+    params: ListObjectVersionsRequest = ListObjectVersionsRequest(),
+) -> ClosingStreamingResponse:
+    """
+    Same as `list_object_versions`, but the object versions are streamed
+    as newline-delimited JSON while the pages of the listing arrive,
+    instead of collecting the whole listing first.
+
+    Note, errors that occur after the first page has been sent can not
+    be reported via the HTTP status code anymore; the stream is aborted
+    in that case.
+
+    See
+    https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/s3/client/list_object_versions.html
+    """
+
+    async def generate() -> AsyncIterator[bytes]:
+        query: ObjectQuery[ObjectVersion] = ObjectQuery(params)
+        async with conn.conn() as s3, contextlib.aclosing(
+            list_key_versions_pages(s3, bucket, params.Prefix, params.Delimiter)
+            if params.Strict
+            else list_object_versions_pages(
+                s3, bucket, params.Prefix, params.Delimiter, conn.list_workers
+            )
+        ) as pages:
+            s3_res: ListObjectVersionsOutputTypeDef
+            async for s3_res in pages:
+                res = list_object_versions_output_to_objects(s3_res)
+                if params.Strict:
+                    res = [obj for obj in res if obj.Key == params.Prefix]
+                res = query.add(res)
+                if res:
+                    yield to_ndjson(res)
+                if query.done:
+                    break
+        res = query.flush()
+        if res:
+            yield to_ndjson(res)
+
+    return ClosingStreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
+
+
 @router.post(
     "/{bucket}/exists",
     responses=s3gw_client_responses(),
@@ -545,6 +1102,9 @@ async def restore_object(
     conn: S3GWClientDep, bucket: str, params: RestoreObjectRequest
 ) -> None:
     """
+    Objects larger than `S3GW_S3_COPY_MULTIPART_THRESHOLD` are copied via
+    a multipart upload, see `copy_object`.
+
     See
     https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/s3/client/copy_object.html
     https://docs.aws.amazon.com/AmazonS3/latest/userguide/RestoringPreviousVersions.html
@@ -565,7 +1125,18 @@ async def restore_object(
     if del_objects:
         await delete_objects(conn, bucket, del_objects)
 
-    # Make a copy of the object to restore.
+    # Make a copy of the object to restore. Large objects are copied
+    # part by part.
+    size: Optional[int] = None
+    if params.VersionId:
+        size = next(
+            (
+                obj.Size
+                for obj in api_res
+                if obj.VersionId == params.VersionId and not obj.IsDeleted
+            ),
+            None,
+        )
     async with conn.conn() as s3:
         copy_source: CopySourceTypeDef = {
             "Bucket": bucket,
@@ -573,15 +1144,128 @@ async def restore_object(
         }
         if params.VersionId:
             copy_source["VersionId"] = params.VersionId
-        await s3.copy_object(
-            Bucket=bucket,
-            CopySource=copy_source,
-            Key=params.Key,
-            MetadataDirective="COPY",
-            TaggingDirective="COPY",
+        await copy_object(
+            s3, bucket, params.Key, copy_source, size, conn.copy_options
+        )
+
+    if conn.key_index is not None:
+        await conn.key_index.invalidate(
+            key_index_scope(conn, bucket), params.Key
         )
 
 
+@router.put(
+    "/{bucket}/restore-by-prefix",
+    response_model=RestoreResult,
+    responses=s3gw_client_responses(),
+)
+async def restore_object_by_prefix(
+    conn: S3GWClientDep, bucket: str, params: RestoreObjectByPrefixRequest
+) -> RestoreResult:
+    """
+    Restore the objects of a prefix, e.g. of a "virtual folder" after it
+    has been deleted accidentally. The versions are listed once, without
+    delimiter. The delete markers that hide the versions to restore are
+    removed in batches of 1000 markers, and versions that are hidden by
+    newer versions are copied, see `RestoreObjectByPrefixRequest`. The
+    requests run concurrently while the listing continues.
+
+    Objects that could not be restored are returned in `Errors`, along
+    with the number of restored objects per second. Use
+    `restore_object_by_prefix_job` to track the progress of large
+    restores.
+
+    See
+    https://docs.aws.amazon.com/AmazonS3/latest/userguide/RestoringPreviousVersions.html
+    """
+    res = RestoreResult()
+    started = time.monotonic()
+    try:
+        async with _restore_by_prefix(conn, bucket, params) as results:
+            async for result in results:
+                add_restore_result(res, result)
+    finally:
+        if conn.key_index is not None:
+            await conn.key_index.invalidate(
+                key_index_scope(conn, bucket), params.Prefix
+            )
+    res.Seconds = time.monotonic() - started
+    if res.Seconds > 0:
+        res.ObjectsPerSecond = res.Restored / res.Seconds
+    return res
+
+
+@router.put(
+    "/{bucket}/restore-by-prefix/job",
+    response_model=Job,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses=job_responses(),
+)
+async def restore_object_by_prefix_job(
+    conn: S3GWClientDep,
+    manager: JobManagerDep,
+    bucket: str,
+    params: RestoreObjectByPrefixRequest,
+) -> Job:
+    """
+    Same as `restore_object_by_prefix`, but the objects are restored by
+    a background job, see `get_job`. The job reports the number of
+    restored objects and the objects that could not be restored while it
+    runs.
+    """
+
+    async def run(progress: JobProgress) -> None:
+        try:
+            async with _restore_by_prefix(conn, bucket, params) as results:
+                async for result in results:
+                    progress.add(
+                        done=result.Restored,
+                        failed=len(result.Errors),
+                        errors=[
+                            f"{error.Key} ({error.Code})"
+                            for error in result.Errors
+                        ],
+                    )
+        finally:
+            if conn.key_index is not None:
+                await conn.key_index.invalidate(
+                    key_index_scope(conn, bucket), params.Prefix
+                )
+
+    return await manager.submit(
+        conn.job_owner,
+        "restore-by-prefix",
+        f"Restore {bucket}/{params.Prefix}*",
+        run,
+    )
+
+
+@contextlib.asynccontextmanager
+async def _restore_by_prefix(
+    conn: S3GWClient, bucket: str, params: RestoreObjectByPrefixRequest
+) -> AsyncGenerator[AsyncGenerator[RestoreResult, None], None]:
+    """
+    Helper function to restore the objects of a prefix, see
+    `restore_versions`. The copies and the removal of the delete markers
+    share the `delete_workers` concurrent requests.
+    """
+    async with conn.conn() as s3, contextlib.aclosing(
+        list_object_versions_pages(
+            s3, bucket, params.Prefix, max_workers=conn.list_workers
+        )
+    ) as pages, contextlib.aclosing(
+        restore_versions(
+            s3,
+            bucket,
+            pages,
+            params.Timestamp,
+            conn.delete_workers,
+            conn.copy_options,
+        )
+    ) as results:
+        yield results
+
+
 @router.delete(
     "/{bucket}/delete",
     response_model=List[DeletedObject],
@@ -595,26 +1279,165 @@ async def delete_object(
     https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/s3/client/delete_object.html
     https://www.middlewareinventory.com/blog/recover-s3/
     """
+    objects = await _object_identifiers(conn, bucket, params)
+    try:
+        res = await delete_objects(conn, bucket, objects)
+    finally:
+        if conn.key_index is not None:
+            await conn.key_index.invalidate(
+                key_index_scope(conn, bucket), params.Key
+            )
+    return res
+
+
+@router.delete(
+    "/{bucket}/delete/job",
+    response_model=Job,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses=job_responses(),
+)
+async def delete_object_job(
+    conn: S3GWClientDep,
+    manager: JobManagerDep,
+    bucket: str,
+    params: DeleteObjectRequest,
+) -> Job:
+    """
+    Same as `delete_object`, but the object is deleted by a background
+    job, see `get_job`.
+    """
+
+    async def run(progress: JobProgress) -> None:
+        objects = await _object_identifiers(conn, bucket, params)
+        try:
+            async with _delete_objects_batches(conn, bucket, objects) as res:
+                async for result in res:
+                    _add_delete_progress(progress, result)
+        finally:
+            if conn.key_index is not None:
+                await conn.key_index.invalidate(
+                    key_index_scope(conn, bucket), params.Key
+                )
+
+    return await manager.submit(
+        conn.job_owner, "delete", f"Delete {bucket}/{params.Key}", run
+    )
 
-    async def collect_objects() -> List[ObjectIdentifierTypeDef]:
-        api_res: List[ObjectVersion] = await list_object_versions(
-            conn,
-            bucket,
-            ListObjectVersionsRequest(Prefix=params.Key, Strict=True),
-        )
-        return [
-            parse_obj_as(ObjectIdentifierTypeDef, obj)
-            for obj in api_res
-            if obj.Type == "OBJECT"
-        ]
 
-    objects: List[ObjectIdentifierTypeDef]
-    if params.AllVersions:
-        objects = await collect_objects()
-    else:
-        objects = [{"Key": params.Key, "VersionId": params.VersionId}]
+async def _object_identifiers(
+    conn: S3GWClient, bucket: str, params: DeleteObjectRequest
+) -> List[ObjectIdentifierTypeDef]:
+    """
+    Helper function to get the identifiers of the object versions that
+    are deleted by `delete_object`.
+    """
+    if not params.AllVersions:
+        return [{"Key": params.Key, "VersionId": params.VersionId}]
+    api_res: List[ObjectVersion] = await list_object_versions(
+        conn,
+        bucket,
+        ListObjectVersionsRequest(Prefix=params.Key, Strict=True),
+    )
+    return [
+        parse_obj_as(ObjectIdentifierTypeDef, obj)
+        for obj in api_res
+        if obj.Type == "OBJECT"
+    ]
 
-    return await delete_objects(conn, bucket, objects)
+
+@model_response(
+    router.delete(
+        "/{bucket}/delete-objects",
+        response_model=DeleteObjectsResult,
+        responses=s3gw_client_responses(),
+        openapi_extra={
+            "requestBody": {
+                "required": True,
+                "content": {
+                    media_type: {
+                        "schema": {
+                            "type": "array",
+                            "items": ObjectIdentifier.schema(),
+                        }
+                    }
+                    for media_type in ["application/json", NDJSON_MEDIA_TYPE]
+                },
+            }
+        },
+    )
+)
+async def delete_objects_bulk(
+    conn: S3GWClientDep, bucket: str, request: Request
+) -> DeleteObjectsResult:
+    """
+    Delete any number of objects specified by a JSON array of
+    `ObjectIdentifier`, or by newline-delimited JSON with one
+    `ObjectIdentifier` per line.
+
+    The body is parsed while it is received and split into batches of
+    1000 objects, which are deleted concurrently. Unlike `delete_object`,
+    the request does not fail if some objects could not be deleted;
+    these are returned in `Errors`, including invalid identifiers with
+    the code `InvalidArgument`.
+
+    Note, if the body turns out to be malformed, the batches that have
+    been sent until then have already been deleted.
+
+    See
+    https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/s3/client/delete_objects.html
+    """
+    res = DeleteObjectsResult.construct(Deleted=[], Errors=[])
+    # One key per folder containing deleted objects, to invalidate the
+    # cached listings of these folders.
+    folder_keys: Dict[str, str] = {}
+
+    async def batches() -> AsyncIterator[List[ObjectIdentifierTypeDef]]:
+        batch: List[ObjectIdentifierTypeDef] = []
+        try:
+            async for value in parse_json_values(request.stream()):
+                try:
+                    identifier = ObjectIdentifier.parse_obj(value)
+                except ValidationError:
+                    invalid = cast(
+                        Dict[str, Any], value if isinstance(value, dict) else {}
+                    )
+                    res.Errors.append(
+                        DeleteObjectError.construct(
+                            Key=str(invalid.get("Key") or ""),
+                            Code="InvalidArgument",
+                            Message="Invalid object identifier",
+                        )
+                    )
+                    continue
+                folder = identifier.Key[: identifier.Key.rfind("/") + 1]
+                folder_keys.setdefault(folder, identifier.Key)
+                batch.append(
+                    {"Key": identifier.Key, "VersionId": identifier.VersionId}
+                )
+                if len(batch) >= MAX_DELETE_KEYS:
+                    yield batch
+                    batch = []
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Invalid request body: {e}",
+            )
+        if batch:
+            yield batch
+
+    try:
+        async with conn.conn() as s3, contextlib.aclosing(
+            delete_batches(s3, bucket, batches(), conn.delete_workers)
+        ) as results:
+            async for result in results:
+                res.Deleted.extend(result.Deleted)
+                res.Errors.extend(result.Errors)
+    finally:
+        if conn.key_index is not None:
+            await conn.key_index.invalidate_keys(
+                key_index_scope(conn, bucket), folder_keys.values()
+            )
+    return res
 
 
 @router.delete(
@@ -630,86 +1453,205 @@ async def delete_object_by_prefix(
     a "virtual folder", e.g. `a/b/`, then all objects with that prefix
     (e.g. a/b/file1.txt, a/b/c/d/foo.md) are deleted as well.
 
+    The objects are listed without delimiter and deleted in batches of
+    1000 objects while the listing continues. Use
+    `delete_object_by_prefix_stream` to report the progress of large
+    deletions.
+
     See
     https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/s3/client/delete_objects.html
     """
+    res: List[DeletedObject] = []
+    errors: List[DeleteObjectError] = []
+    try:
+        async with _delete_by_prefix(conn, bucket, params) as results:
+            async for result in results:
+                res.extend(result.Deleted)
+                errors.extend(result.Errors)
+    finally:
+        # Some objects may have been deleted even if the request failed.
+        if conn.key_index is not None:
+            await conn.key_index.invalidate(
+                key_index_scope(conn, bucket), params.Prefix
+            )
+    _raise_delete_errors(errors)
+    return res
 
-    async def collect_objects(prefix: str) -> List[ObjectIdentifierTypeDef]:
-        api_res: List[ObjectVersion] = await list_object_versions(
-            conn,
-            bucket,
-            ListObjectVersionsRequest(
-                Prefix=prefix, Delimiter=params.Delimiter
-            ),
-        )
-        obj: ObjectVersion
-        res_objects: List[ObjectIdentifierTypeDef] = []
-        for obj in api_res:
-            if not (params.AllVersions or (obj.IsLatest and not obj.IsDeleted)):
-                continue
-            if obj.Type == "OBJECT":
-                # This is a regular object.
-                version_id: str = (
-                    obj.VersionId
-                    if params.AllVersions and obj.VersionId
-                    else ""
+
+@router.delete(
+    "/{bucket}/delete-by-prefix/stream",
+    response_class=ClosingStreamingResponse,
+    responses={
+        **s3gw_client_responses(),
+        200: {
+            "content": {NDJSON_MEDIA_TYPE: {}},
+            "description": "One `DeleteResult` per batch.",
+        },
+    },
+)
+async def delete_object_by_prefix_stream(
+    conn: S3GWClientDep, bucket: str, params: DeleteObjectByPrefixRequest
+) -> ClosingStreamingResponse:
+    """
+    Same as `delete_object_by_prefix`, but the result of every batch of
+    up to 1000 objects is streamed as newline-delimited JSON as soon as
+    it is available, including the objects that could not be deleted.
+    Nothing is collected, thus prefixes with any number of objects are
+    deleted with constant memory.
+
+    Note, errors that occur after the first batch has been sent can not
+    be reported via the HTTP status code anymore; the stream is aborted
+    in that case.
+    """
+
+    async def generate() -> AsyncIterator[bytes]:
+        try:
+            async with _delete_by_prefix(conn, bucket, params) as results:
+                async for result in results:
+                    yield dumps(result) + b"\n"
+        finally:
+            if conn.key_index is not None:
+                await conn.key_index.invalidate(
+                    key_index_scope(conn, bucket), params.Prefix
                 )
-                res_objects.append({"Key": obj.Key, "VersionId": version_id})
-            else:
-                # This is a "virtual folder".
-                res_objects.extend(
-                    await collect_objects(f"{obj.Key}{params.Delimiter}")
+
+    return ClosingStreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
+
+
+@router.delete(
+    "/{bucket}/delete-by-prefix/job",
+    response_model=Job,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses=job_responses(),
+)
+async def delete_object_by_prefix_job(
+    conn: S3GWClientDep,
+    manager: JobManagerDep,
+    bucket: str,
+    params: DeleteObjectByPrefixRequest,
+) -> Job:
+    """
+    Same as `delete_object_by_prefix`, but the objects are deleted by a
+    background job, see `get_job`. The job reports the number of deleted
+    objects and the objects that could not be deleted while it runs.
+    """
+
+    async def run(progress: JobProgress) -> None:
+        try:
+            async with _delete_by_prefix(conn, bucket, params) as results:
+                async for result in results:
+                    _add_delete_progress(progress, result)
+        finally:
+            if conn.key_index is not None:
+                await conn.key_index.invalidate(
+                    key_index_scope(conn, bucket), params.Prefix
                 )
-        return res_objects
 
-    # Collect all objects that are going to be deleted.
-    objects: List[ObjectIdentifierTypeDef] = await collect_objects(
-        params.Prefix
+    return await manager.submit(
+        conn.job_owner,
+        "delete-by-prefix",
+        f"Delete {bucket}/{params.Prefix}*",
+        run,
     )
 
-    return await delete_objects(conn, bucket, objects)
 
+def _add_delete_progress(progress: JobProgress, result: DeleteResult) -> None:
+    progress.add(
+        done=len(result.Deleted),
+        failed=len(result.Errors),
+        errors=[f"{error.Key} ({error.Code})" for error in result.Errors],
+    )
 
-async def delete_objects(
-    conn: S3GWClientDep, bucket: str, objects: List[ObjectIdentifierTypeDef]
-) -> List[DeletedObject]:
+
+@contextlib.asynccontextmanager
+async def _delete_by_prefix(
+    conn: S3GWClient, bucket: str, params: DeleteObjectByPrefixRequest
+) -> AsyncGenerator[AsyncGenerator[DeleteResult, None], None]:
     """
-    Helper function to delete the specified objects.
+    Helper function to delete the objects of a prefix. The listing feeds
+    the batches of the objects to delete into concurrent `delete_objects`
+    requests, see `delete_batches`. The listing is flat, i.e. it does not
+    descend into "virtual folders" one by one.
     """
-    async with conn.conn() as s3:
-        s3_res: DeleteObjectsOutputTypeDef = await s3.delete_objects(
-            Bucket=bucket, Delete={"Objects": objects}
+    async with conn.conn() as s3, contextlib.aclosing(
+        list_object_versions_pages(
+            s3, bucket, params.Prefix, max_workers=conn.list_workers
         )
-
-    # Handle errors.
-    if "Errors" in s3_res and s3_res["Errors"]:
-        reasons = [
-            f"{obj.get('Key', 'n/a')} ({obj.get('Code', 'n/a')})"
-            for obj in s3_res["Errors"]
-        ]
-        detail = f"Could not delete object(s) {', '.join(reasons)}"
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=detail
+    ) as pages, contextlib.aclosing(
+        delete_batches(
+            s3,
+            bucket,
+            batch_versions(pages, params.AllVersions),
+            conn.delete_workers,
         )
+    ) as results:
+        yield results
 
-    res = []
 
-    if "Deleted" in s3_res and s3_res["Deleted"]:
-        res = [
-            DeletedObject.parse_obj(deleted) for deleted in s3_res["Deleted"]
-        ]
+async def delete_objects(
+    conn: S3GWClientDep,
+    bucket: str,
+    objects: Sequence[ObjectIdentifierTypeDef],
+) -> List[DeletedObject]:
+    """
+    Helper function to delete the specified objects, in batches of at
+    most 1000 objects.
+    """
 
+    res: List[DeletedObject] = []
+    errors: List[DeleteObjectError] = []
+    async with _delete_objects_batches(conn, bucket, objects) as results:
+        async for result in results:
+            res.extend(result.Deleted)
+            errors.extend(result.Errors)
+    _raise_delete_errors(errors)
     return res
 
 
+@contextlib.asynccontextmanager
+async def _delete_objects_batches(
+    conn: S3GWClient,
+    bucket: str,
+    objects: Sequence[ObjectIdentifierTypeDef],
+) -> AsyncGenerator[AsyncGenerator[DeleteResult, None], None]:
+    async def batches() -> AsyncIterator[List[ObjectIdentifierTypeDef]]:
+        for i in range(0, len(objects), MAX_DELETE_KEYS):
+            yield list(objects[i : i + MAX_DELETE_KEYS])
+
+    async with conn.conn() as s3, contextlib.aclosing(
+        delete_batches(s3, bucket, batches(), conn.delete_workers)
+    ) as results:
+        yield results
+
+
+def _raise_delete_errors(errors: List[DeleteObjectError]) -> None:
+    if not errors:
+        return
+    reasons = [f"{error.Key} ({error.Code})" for error in errors]
+    detail = f"Could not delete object(s) {', '.join(reasons)}"
+    raise HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=detail
+    )
+
+
 @router.post(
     "/{bucket}/download",
     summary="Download an object",
     response_class=ObjectBodyStreamingResponse,
-    responses=s3gw_client_responses(),
+    responses={
+        **s3gw_client_responses(),
+        206: {"description": "The requested range of the object"},
+        304: {"description": "The object has not been modified"},
+    },
 )
 async def download_object(
-    conn: S3GWClientDep, bucket: str, params: ObjectRequest
+    conn: S3GWClientDep,
+    bucket: str,
+    params: ObjectRequest,
+    range_: Annotated[Optional[str], Header(alias="range")] = None,
+    if_range: Annotated[Optional[str], Header()] = None,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+    if_modified_since: Annotated[Optional[str], Header()] = None,
 ) -> ObjectBodyStreamingResponse:
     """
     Note that this is a POST request instead of a usual GET request
@@ -717,10 +1659,119 @@ async def download_object(
     the request `body` as these may exceed the maximum allowed length
     of a URL.
 
+    A single byte range, e.g. `bytes=1000-` to resume an interrupted
+    download, is returned with `206 Partial Content`. If `If-Range` is
+    given, the range is only returned if the object has not changed,
+    otherwise the whole object. `304 Not Modified` is returned if the
+    object matches `If-None-Match` or has not been modified since
+    `If-Modified-Since`.
+
     See
     https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/s3/client/get_object.html
     """
-    return ObjectBodyStreamingResponse(conn, bucket, params)
+    return ObjectBodyStreamingResponse(
+        conn,
+        bucket,
+        params,
+        range_=range_,
+        if_range=if_range,
+        if_none_match=if_none_match,
+        if_modified_since=if_modified_since,
+    )
+
+
+class ArchiveStreamingResponse(ClosingStreamingResponse):
+    """
+    Helper class to stream an archive of objects. Like an object body,
+    the archive is sent as is, see `download_archive`.
+    """
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        disable_compression(scope)
+        await super().__call__(scope, receive, send)
+
+
+@router.post(
+    "/{bucket}/download-archive",
+    summary="Download multiple objects as an archive",
+    response_class=ArchiveStreamingResponse,
+    responses={
+        **s3gw_client_responses(),
+        200: {
+            "content": {media_type: {} for media_type in MEDIA_TYPES.values()},
+            "description": "The archive of the objects.",
+        },
+        422: {"description": "Neither or both `Prefix` and `Keys` given"},
+    },
+)
+async def download_archive(
+    conn: S3GWClientDep,
+    bucket: str,
+    params: DownloadArchiveRequest,
+) -> ArchiveStreamingResponse:
+    """
+    Downloads a folder, or a selection of objects and folders, as a
+    single ZIP or tar archive, instead of downloading the objects one by
+    one. The archive is built while it is streamed: the objects are
+    requested concurrently, each object is streamed in chunks, see
+    `fetch_objects`, and neither an object nor the archive is ever kept
+    in memory as a whole.
+
+    Note, errors that occur after the archive has been started can not
+    be reported via the HTTP status code anymore; the stream is aborted
+    in that case. Objects that have been deleted in the meantime are
+    skipped.
+    """
+    if (params.Prefix is None) == (not params.Keys):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Either `Prefix` or `Keys` must be given",
+        )
+    items = (
+        [params.Prefix]
+        if params.Prefix is not None
+        else [item.Key for item in params.Keys]
+    )
+    base = archive_base(items)
+    folder = items[0] if len(items) == 1 and items[0].endswith("/") else base
+    filename = folder.rstrip("/").rsplit("/", 1)[-1] or bucket
+
+    async def generate() -> AsyncIterator[bytes]:
+        async with conn.conn() as s3:
+            entries = (
+                prefix_entries(
+                    s3, bucket, params.Prefix, base, conn.list_workers
+                )
+                if params.Prefix is not None
+                else selection_entries(
+                    s3, bucket, params.Keys, base, conn.list_workers
+                )
+            )
+            async with contextlib.aclosing(
+                archive_stream(
+                    s3,
+                    bucket,
+                    entries,
+                    params.Format,
+                    params.Compression == "deflate",
+                    conn.archive_workers,
+                    conn.download_options.buffer_size,
+                )
+            ) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+
+    return ArchiveStreamingResponse(
+        generate(),
+        media_type=MEDIA_TYPES[params.Format],
+        headers={
+            "content-disposition": (
+                f"attachment; filename={filename}.{params.Format}"
+            )
+        },
+    )
 
 
 @router.post(
@@ -741,3 +1792,8 @@ async def upload_object(
     """
     async with conn.conn() as s3:
         await s3.upload_fileobj(Fileobj=file.file, Bucket=bucket, Key=key)
+
+    if conn.key_index is not None:
+        await conn.key_index.put_object(
+            key_index_scope(conn, bucket), key, size=file.size
+        )
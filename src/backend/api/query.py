@@ -0,0 +1,182 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import fnmatch
+import heapq
+import itertools
+import mimetypes
+from datetime import datetime, timezone
+from typing import Any, Callable, Generic, Iterable, List, Optional, TypeVar
+
+from backend.api.types import ListObjectsRequest, Object, ObjectFilter
+
+ObjectT = TypeVar("ObjectT", bound=Object)
+
+
+def _utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class ObjectMatcher:
+    """
+    Checks whether an object or folder matches the criteria of an
+    `ObjectFilter`.
+    """
+
+    def __init__(self, flt: ObjectFilter) -> None:
+        self._filter = flt
+        self._name: Optional[str] = None
+        if flt.Name:
+            name = flt.Name.lower()
+            self._name = name if any(c in name for c in "*?[") else f"*{name}*"
+        self._modified_after = (
+            _utc(flt.ModifiedAfter) if flt.ModifiedAfter else None
+        )
+        self._modified_before = (
+            _utc(flt.ModifiedBefore) if flt.ModifiedBefore else None
+        )
+        self._objects_only = any(
+            value is not None
+            for value in [
+                flt.MinSize,
+                flt.MaxSize,
+                flt.ModifiedAfter,
+                flt.ModifiedBefore,
+                flt.ContentType,
+            ]
+        )
+
+    def __call__(self, obj: Object) -> bool:
+        flt = self._filter
+        if self._name is not None and not fnmatch.fnmatchcase(
+            obj.Name.lower(), self._name
+        ):
+            return False
+        if obj.Type == "FOLDER":
+            return not self._objects_only
+        size = obj.Size or 0
+        if flt.MinSize is not None and size < flt.MinSize:
+            return False
+        if flt.MaxSize is not None and size > flt.MaxSize:
+            return False
+        if self._modified_after or self._modified_before:
+            if obj.LastModified is None:
+                return False
+            modified = _utc(obj.LastModified)
+            if self._modified_after and modified < self._modified_after:
+                return False
+            if self._modified_before and modified >= self._modified_before:
+                return False
+        if flt.ContentType is not None:
+            content_type = (
+                obj.ContentType
+                or mimetypes.guess_type(obj.Name, strict=False)[0]
+                or "application/octet-stream"
+            )
+            if not fnmatch.fnmatchcase(
+                content_type.lower(), flt.ContentType.lower()
+            ):
+                return False
+        return True
+
+
+class ObjectQuery(Generic[ObjectT]):
+    """
+    Applies the filter, sort order and limit of a `ListObjectsRequest`
+    to a listing that is processed page by page.
+
+    Unsorted results are returned by `add()` as soon as the page has been
+    filtered, and `done` becomes `True` once the limit has been reached.
+    Sorted results are returned by `flush()` after all pages have been
+    added; if a limit is given, only the top `Limit` objects are kept in
+    memory.
+    """
+
+    def __init__(self, params: ListObjectsRequest) -> None:
+        self._params = params
+        self._matcher: Optional[Callable[[Object], bool]] = (
+            ObjectMatcher(params.Filter) if params.Filter else None
+        )
+        self._count = 0
+        self._sorted: List[ObjectT] = []
+
+    @property
+    def done(self) -> bool:
+        """
+        Whether the listing does not need to be continued.
+        """
+        return (
+            self._params.SortBy is None
+            and self._params.Limit is not None
+            and self._count >= self._params.Limit
+        )
+
+    def _sort_key(self, obj: ObjectT) -> Any:
+        folder = obj.Type == "FOLDER"
+        if self._params.SortOrder == "desc":
+            # Folders first, even though the order is reversed.
+            folder = not folder
+        if obj.Type == "FOLDER" or self._params.SortBy == "Name":
+            return (not folder, obj.Name, obj.Key)
+        value = getattr(obj, str(self._params.SortBy))
+        if isinstance(value, datetime):
+            value = _utc(value)
+        return (not folder, value is None, value, obj.Key)
+
+    def add(self, objects: Iterable[ObjectT]) -> List[ObjectT]:
+        """
+        Adds the objects of a page and returns the objects that can be
+        returned right away.
+        """
+        if self._matcher is not None:
+            objects = filter(self._matcher, objects)
+        if self._params.SortBy is None:
+            res = list(itertools.islice(objects, self._remaining()))
+            self._count += len(res)
+            return res
+        limit = self._params.Limit
+        if limit is None:
+            self._sorted.extend(objects)
+        elif self._params.SortOrder == "desc":
+            self._sorted = heapq.nlargest(
+                limit,
+                itertools.chain(self._sorted, objects),
+                key=self._sort_key,
+            )
+        else:
+            self._sorted = heapq.nsmallest(
+                limit,
+                itertools.chain(self._sorted, objects),
+                key=self._sort_key,
+            )
+        return []
+
+    def flush(self) -> List[ObjectT]:
+        """
+        Returns the sorted objects, once all pages have been added.
+        """
+        if self._params.SortBy is None:
+            return []
+        res = sorted(
+            self._sorted,
+            key=self._sort_key,
+            reverse=self._params.SortOrder == "desc",
+        )
+        self._sorted = []
+        return res
+
+    def _remaining(self) -> Optional[int]:
+        if self._params.Limit is None:
+            return None
+        return max(self._params.Limit - self._count, 0)
@@ -0,0 +1,495 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import functools
+import hashlib
+import inspect
+from datetime import datetime, timezone
+from typing import (
+    AbstractSet,
+    Annotated,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    FrozenSet,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    ParamSpec,
+    Sequence,
+    Type,
+    TypeVar,
+    cast,
+)
+
+import anyio
+import orjson
+from fastapi import Header, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
+from starlette.types import Send
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+COLUMNS_MEDIA_TYPE = "application/vnd.s3gw.columns+json"
+
+# Responses with a validator may be stored by the browser only, and must
+# be revalidated before they are used.
+CONDITIONAL_CACHE_CONTROL = "private, no-cache"
+
+# The `fields` query parameter of an endpoint, see `model_response()`.
+FieldsQuery = Annotated[
+    Optional[str],
+    Query(
+        description="A comma-separated list of the fields to return, "
+        "e.g. `Key,Size`. All fields are returned by default."
+    ),
+]
+
+# The fields whose values are encoded as index into a list of distinct
+# values, because only a few distinct values are to be expected.
+DICTIONARY_FIELDS = frozenset(
+    [
+        "Type",
+        "ETag",
+        "Owner",
+        "ContentType",
+        "ObjectLockMode",
+        "ObjectLockLegalHoldStatus",
+    ]
+)
+
+# The fields that are not part of the columnar representation, because
+# they can be derived from other fields; the name of an object is the
+# last part of its key.
+DERIVED_FIELDS = frozenset(["Name"])
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        # Nested models are passed to this function again by orjson.
+        return dict(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(cast(Iterable[Any], obj))
+    raise TypeError
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serializes the given content, which may contain pydantic models, to
+    JSON. Note, field aliases of the models are not applied.
+    """
+    return orjson.dumps(content, default=_default)
+
+
+def _epoch_ms(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return round(value.timestamp() * 1000)
+
+
+def _hashable(value: Any) -> Hashable:
+    return dumps(value) if isinstance(value, (dict, list)) else value
+
+
+def to_columns(
+    models: Sequence[BaseModel], fields: Optional[AbstractSet[str]] = None
+) -> Dict[str, Any]:
+    """
+    Converts a list of models of the same type into a columnar
+    representation, e.g.
+
+        {
+            "Count": 2,
+            "Columns": {
+                "Key": ["a/b.txt", "a/c"],
+                "LastModified": [1691412570000, null],
+                "ETag": [0, null],
+                "Type": [0, 1]
+            },
+            "Dictionaries": {
+                "ETag": ["\\"d41d8cd98f00b204e9800998ecf8427e\\""],
+                "Type": ["OBJECT", "FOLDER"]
+            }
+        }
+
+    Columns that only contain `null` values are omitted. Dates are
+    milliseconds since the epoch. The values of the fields listed in
+    `DICTIONARY_FIELDS` are indices into the list of distinct values in
+    `Dictionaries`, or `null`. The fields listed in `DERIVED_FIELDS` are
+    omitted, as well as the fields that are not listed in `fields`, if
+    given.
+    """
+    columns: Dict[str, List[Any]] = {}
+    dictionaries: Dict[str, List[Any]] = {}
+    names: List[str] = [
+        n for n in _field_names(models, fields) if n not in DERIVED_FIELDS
+    ]
+    for name in names:
+        values: List[Any] = [model.__dict__.get(name) for model in models]
+        if all(value is None for value in values):
+            continue
+        if name in DICTIONARY_FIELDS:
+            indices: Dict[Hashable, int] = {}
+            distinct: List[Any] = []
+            column: List[Optional[int]] = []
+            for value in values:
+                if value is None:
+                    column.append(None)
+                    continue
+                index = indices.setdefault(_hashable(value), len(distinct))
+                if index == len(distinct):
+                    distinct.append(value)
+                column.append(index)
+            columns[name] = column
+            dictionaries[name] = distinct
+            continue
+        columns[name] = [
+            _epoch_ms(value) if isinstance(value, datetime) else value
+            for value in values
+        ]
+    return {
+        "Count": len(models),
+        "Columns": columns,
+        "Dictionaries": dictionaries,
+    }
+
+
+def project(
+    models: Sequence[BaseModel], fields: AbstractSet[str]
+) -> List[Dict[str, Any]]:
+    """
+    Returns the given fields of the given models of the same type.
+    """
+    names = _field_names(models, fields)
+    return [
+        {name: model.__dict__.get(name) for name in names} for model in models
+    ]
+
+
+def _field_names(
+    models: Sequence[BaseModel], fields: Optional[AbstractSet[str]]
+) -> List[str]:
+    if not models:
+        return []
+    return [n for n in models[0].__fields__ if fields is None or n in fields]
+
+
+def _map_lists(content: Any, fn: Callable[[Sequence[BaseModel]], Any]) -> Any:
+    """
+    Applies the given function to the content if it is a list of models,
+    or to the lists of models of the content if it is a model, e.g. a
+    page of a listing.
+    """
+
+    def apply(value: Any) -> Any:
+        if not isinstance(value, list):
+            return value
+        items = cast(List[Any], value)
+        if items and not isinstance(items[0], BaseModel):
+            return items
+        return fn(cast(List[BaseModel], items))
+
+    if isinstance(content, BaseModel):
+        return {name: apply(value) for name, value in content}
+    return apply(content)
+
+
+def parse_fields(
+    fields: Optional[str], model: Type[BaseModel]
+) -> Optional[FrozenSet[str]]:
+    """
+    Helper function to parse the value of a `fields` parameter, i.e. a
+    comma-separated list of field names of the given model. Returns
+    `None` if all fields are requested.
+    """
+    if fields is None:
+        return None
+    res = frozenset(name.strip() for name in fields.split(",") if name.strip())
+    unknown = res.difference(model.__fields__)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+        )
+    return res
+
+
+class ModelResponse(JSONResponse):
+    """
+    A JSON response that serializes pydantic models via orjson, without
+    converting them via `jsonable_encoder` first.
+
+    If `fields` is given, only these fields of the models in the content
+    are returned, e.g. of the objects of a listing.
+    """
+
+    def __init__(
+        self,
+        content: Any,
+        fields: Optional[AbstractSet[str]] = None,
+        **kwargs: Any,
+    ) -> None:
+        self._fields = fields
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        fields = self._fields
+        if fields is None:
+            return dumps(content)
+        return dumps(_map_lists(content, lambda m: project(m, fields)))
+
+
+class ColumnsResponse(ModelResponse):
+    """
+    A JSON response that serializes lists of pydantic models in the
+    columnar representation of `to_columns()`.
+    """
+
+    media_type = COLUMNS_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        fields = self._fields
+        return dumps(_map_lists(content, lambda m: to_columns(m, fields)))
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    A streaming response that closes its body as soon as the stream ends,
+    also if it is cancelled, e.g. because the client has disconnected.
+    Otherwise an async generator is only closed once it is garbage
+    collected, and the S3 requests it has started keep running until
+    then.
+    """
+
+    async def stream_response(self, send: Send) -> None:
+        try:
+            await super().stream_response(send)
+        finally:
+            aclose: Optional[Callable[[], Awaitable[None]]] = getattr(
+                self.body_iterator, "aclose", None
+            )
+            if aclose is not None:
+                # The stream may have been cancelled, thus shield the
+                # cleanup from the cancellation.
+                with anyio.CancelScope(shield=True):
+                    await aclose()
+
+
+def accepts(accept: Optional[str], media_type: str) -> bool:
+    """
+    Helper function to check whether the given media type is explicitly
+    accepted according to the value of an `Accept` header.
+    """
+    for value in (accept or "").split(","):
+        name, *params = [part.strip() for part in value.split(";")]
+        if name.lower() != media_type:
+            continue
+        for param in params:
+            key, _, quality = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    return float(quality) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def etag(body: bytes) -> str:
+    """
+    Returns a weak entity tag of the given response body. The tag is
+    weak, because the body may still be compressed differently, e.g. by
+    the `CompressionMiddleware`.
+    """
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    """
+    Helper function to check whether the value of an `If-None-Match`
+    header matches the given entity tag, using the weak comparison.
+    """
+    if if_none_match is None:
+        return False
+    opaque = tag.removeprefix("W/")
+    for value in if_none_match.split(","):
+        value = value.strip()
+        if value == "*" or value.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def conditional_response(
+    response: Response, if_none_match: Optional[str], method: str = "GET"
+) -> Response:
+    """
+    Adds an `ETag` computed from the body to the given response. If the
+    entity tag matches the `If-None-Match` header of a GET or HEAD
+    request, a `304 Not Modified` response without body is returned
+    instead, and the responses get a `Cache-Control` header, thus the
+    browser revalidates its cached response.
+
+    Other requests, e.g. the POST requests of the object listings, must
+    be answered with `412 Precondition Failed` if the entity tag
+    matches, see RFC 9110, section 13.1.2. Their responses are not
+    cached by the browser, thus the client keeps the last response and
+    its entity tag itself, and reuses the response on a `412`.
+    """
+    tag = etag(response.body)
+    response.headers["etag"] = tag
+    headers = {"etag": tag}
+    if method in ("GET", "HEAD"):
+        headers["cache-control"] = CONDITIONAL_CACHE_CONTROL
+        response.headers["cache-control"] = CONDITIONAL_CACHE_CONTROL
+        status_code = status.HTTP_304_NOT_MODIFIED
+    else:
+        status_code = status.HTTP_412_PRECONDITION_FAILED
+    if not etag_matches(if_none_match, tag):
+        return response
+    if "vary" in response.headers:
+        headers["vary"] = response.headers["vary"]
+    return Response(status_code=status_code, headers=headers)
+
+
+def columns_responses() -> Dict[int | str, Dict[str, Any]]:
+    """
+    Helper function to document the columnar representation of an
+    endpoint registered via `model_response(..., columns=True)`.
+    """
+    return {
+        200: {
+            "content": {COLUMNS_MEDIA_TYPE: {}},
+            "description": "Lists of objects are returned in a columnar "
+            f"representation if `{COLUMNS_MEDIA_TYPE}` is accepted.",
+        }
+    }
+
+
+def model_response(
+    route: Callable[[Callable[..., Any]], Callable[..., Any]],
+    columns: bool = False,
+    fields: Optional[Type[BaseModel]] = None,
+    conditional: bool = False,
+) -> Callable[[Callable[P, Awaitable[T]]], Callable[P, Awaitable[T]]]:
+    """
+    Registers an endpoint whose result is returned as a `ModelResponse`.
+
+    FastAPI validates the result of an endpoint against its
+    `response_model` and converts it via `jsonable_encoder` before it is
+    serialized, unless a `Response` is returned. For large listings that
+    are built from trusted data, this doubles the cost of the request.
+    The decorated function itself is kept unchanged, thus it can still
+    be called directly, e.g. by other endpoints or tests.
+
+    Example:
+
+        @model_response(router.get("/foo", response_model=List[Foo]))
+        async def list_foo() -> List[Foo]:
+            ...
+
+    :param route: The decorator that registers the endpoint, e.g.
+        `router.get(...)`. The `response_model` is still used for the
+        API documentation.
+    :param columns: If `True`, the result is returned as a
+        `ColumnsResponse` if the client accepts `COLUMNS_MEDIA_TYPE`.
+    :param fields: If given, the endpoint gets a `fields` query
+        parameter to select the fields of this model that are returned,
+        see `parse_fields()`. If the decorated function has a `fields`
+        parameter itself, e.g. to skip unneeded work, the value is passed
+        on to it.
+    :param conditional: If `True`, the response gets an `ETag`, and
+        `304 Not Modified`, or `412 Precondition Failed` for other than
+        GET requests, is returned if it matches the `If-None-Match`
+        header of the request, see `conditional_response()`.
+    """
+
+    def decorator(fn: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+        sig = inspect.signature(fn)
+        pass_fields = "fields" in sig.parameters
+
+        @functools.wraps(fn)
+        async def endpoint(*args: Any, **kwargs: Any) -> Any:
+            accept: Optional[str] = kwargs.pop("accept", None)
+            if_none_match: Optional[str] = kwargs.pop("if_none_match", None)
+            request: Optional[Request] = kwargs.pop("request", None)
+            selected: Optional[AbstractSet[str]] = None
+            if fields is not None:
+                value = (
+                    kwargs["fields"] if pass_fields else kwargs.pop("fields")
+                )
+                selected = parse_fields(value, fields)
+            res = await fn(*args, **kwargs)
+            response: Response
+            if not columns:
+                response = ModelResponse(res, fields=selected)
+            elif accepts(accept, COLUMNS_MEDIA_TYPE):
+                response = ColumnsResponse(
+                    res, fields=selected, headers={"vary": "Accept"}
+                )
+            else:
+                response = ModelResponse(
+                    res, fields=selected, headers={"vary": "Accept"}
+                )
+            if conditional:
+                assert request is not None
+                response = conditional_response(
+                    response, if_none_match, request.method
+                )
+            return response
+
+        # Let FastAPI pass the `Accept` and `If-None-Match` headers, the
+        # request and the `fields` parameter to the endpoint.
+        params = list(sig.parameters.values())
+        for name, enabled in [
+            ("accept", columns),
+            ("if_none_match", conditional),
+        ]:
+            if not enabled:
+                continue
+            assert name not in sig.parameters
+            params.append(
+                inspect.Parameter(
+                    name,
+                    inspect.Parameter.KEYWORD_ONLY,
+                    default=Header(default=None, include_in_schema=False),
+                    annotation=Optional[str],
+                )
+            )
+        if conditional:
+            assert "request" not in sig.parameters
+            params.append(
+                inspect.Parameter(
+                    "request",
+                    inspect.Parameter.KEYWORD_ONLY,
+                    annotation=Request,
+                )
+            )
+        if fields is not None and not pass_fields:
+            params.append(
+                inspect.Parameter(
+                    "fields",
+                    inspect.Parameter.KEYWORD_ONLY,
+                    default=None,
+                    annotation=FieldsQuery,
+                )
+            )
+        setattr(endpoint, "__signature__", sig.replace(parameters=params))
+        route(endpoint)
+        return fn
+
+    return decorator
@@ -0,0 +1,265 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+from datetime import datetime, timezone
+from typing import (
+    AsyncGenerator,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    cast,
+)
+
+from botocore.exceptions import ClientError
+from types_aiobotocore_s3.client import S3Client
+from types_aiobotocore_s3.type_defs import (
+    DeleteMarkerEntryTypeDef,
+    DeleteObjectsOutputTypeDef,
+    ListObjectVersionsOutputTypeDef,
+    ObjectIdentifierTypeDef,
+    ObjectVersionTypeDef,
+)
+
+from backend.api.copying import CopyOptions, copy_object
+from backend.api.deletion import (
+    MAX_DELETE_KEYS,
+    delete_objects_output_to_result,
+    run_bounded,
+)
+from backend.api.types import DeleteObjectError, RestoreResult
+
+
+class KeyVersion:
+    """
+    A version or delete marker of a key.
+    """
+
+    def __init__(
+        self,
+        entry: ObjectVersionTypeDef | DeleteMarkerEntryTypeDef,
+        is_delete_marker: bool,
+    ) -> None:
+        self.key = entry.get("Key", "")
+        self.version_id = entry.get("VersionId") or ""
+        self.last_modified = entry.get("LastModified")
+        self.is_latest = entry.get("IsLatest", False)
+        self.is_delete_marker = is_delete_marker
+        self.size: Optional[int] = (
+            None
+            if is_delete_marker
+            else cast(ObjectVersionTypeDef, entry).get("Size")
+        )
+
+
+def _newest_first(versions: List[KeyVersion]) -> List[KeyVersion]:
+    # The listing returns the versions and the delete markers of a key
+    # separately, each of them newest first. A delete marker is taken to
+    # be newer than a version with the same modification time.
+    return sorted(
+        versions,
+        key=lambda v: (
+            not v.is_latest,
+            -v.last_modified.timestamp() if v.last_modified else 0,
+            not v.is_delete_marker,
+        ),
+    )
+
+
+async def group_versions(
+    pages: AsyncIterable[ListObjectVersionsOutputTypeDef],
+) -> AsyncGenerator[List[KeyVersion], None]:
+    """
+    Yields the versions and delete markers of the keys of a listing key
+    by key, the latest first.
+
+    A key is only yielded once the listing has moved past it, thus its
+    versions are complete even if they span multiple pages. Also, the
+    request for a page refers to the last key of the previous page,
+    thus this key must not be changed before the page has been listed.
+    """
+    current: List[KeyVersion] = []
+    async for page in pages:
+        entries = [KeyVersion(v, False) for v in page.get("Versions", [])]
+        entries.extend(
+            KeyVersion(m, True) for m in page.get("DeleteMarkers", [])
+        )
+        # The sort is stable, thus the order of the versions is kept.
+        entries.sort(key=lambda v: v.key)
+        for entry in entries:
+            if current and current[0].key != entry.key:
+                yield _newest_first(current)
+                current = []
+            current.append(entry)
+    if current:
+        yield _newest_first(current)
+
+
+def plan_restore(
+    versions: List[KeyVersion], timestamp: Optional[datetime] = None
+) -> Tuple[List[ObjectIdentifierTypeDef], Optional[KeyVersion]]:
+    """
+    Decides how to restore a key, given its versions and delete markers
+    the latest first, see `group_versions`.
+
+    By default, a key whose latest version is a delete marker is
+    restored to its latest version that is not a delete marker, by
+    removing all its delete markers. If a timestamp is given, the key
+    is restored to the version that was the latest at that time. If
+    only delete markers are newer than this version, these are removed,
+    which is cheap. Otherwise the version must be promoted by copying
+    it.
+
+    :return: The delete markers to remove, and the version to copy.
+        Both are empty if the key needs not or can not be restored.
+    """
+    if timestamp is None:
+        if not versions or not versions[0].is_delete_marker:
+            return [], None
+        if all(v.is_delete_marker for v in versions):
+            # There is nothing to restore.
+            return [], None
+        return [
+            {"Key": v.key, "VersionId": v.version_id}
+            for v in versions
+            if v.is_delete_marker
+        ], None
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    index = next(
+        (
+            i
+            for i, v in enumerate(versions)
+            if v.last_modified is not None and v.last_modified <= timestamp
+        ),
+        None,
+    )
+    if not index or versions[index].is_delete_marker:
+        # The object did not exist at that time, or the version is the
+        # latest one already.
+        return [], None
+    newer = versions[:index]
+    if all(v.is_delete_marker for v in newer):
+        return [{"Key": v.key, "VersionId": v.version_id} for v in newer], None
+    return [], versions[index]
+
+
+async def restore_versions(
+    s3: S3Client,
+    bucket: str,
+    pages: AsyncIterable[ListObjectVersionsOutputTypeDef],
+    timestamp: Optional[datetime] = None,
+    max_workers: int = 1,
+    copy_options: Optional[CopyOptions] = None,
+) -> AsyncGenerator[RestoreResult, None]:
+    """
+    Restores the keys of a listing as decided by `plan_restore` and
+    yields the result of every request as soon as it is available.
+
+    The delete markers to remove are collected across keys into batches
+    of 1000 markers for `delete_objects`, the versions to promote are
+    copied one by one, see `copy_object`. At most `max_workers` requests
+    are in flight at the same time, see `run_bounded`, while the listing
+    moves on. Errors of single keys are reported in the results.
+    """
+
+    async def remove(
+        markers: List[ObjectIdentifierTypeDef], keys: Set[str]
+    ) -> RestoreResult:
+        """
+        :param keys: The keys whose last delete marker is removed by this
+            request. These are restored unless an error is reported.
+        """
+        s3_res: DeleteObjectsOutputTypeDef = await s3.delete_objects(
+            Bucket=bucket, Delete={"Objects": markers}
+        )
+        res = delete_objects_output_to_result(0, s3_res)
+        return RestoreResult.construct(
+            Restored=len(keys - {error.Key for error in res.Errors}),
+            DeleteMarkers=len(res.Deleted),
+            Errors=res.Errors,
+        )
+
+    async def promote(version: KeyVersion) -> RestoreResult:
+        try:
+            await copy_object(
+                s3,
+                bucket,
+                version.key,
+                {
+                    "Bucket": bucket,
+                    "Key": version.key,
+                    "VersionId": version.version_id,
+                },
+                version.size,
+                copy_options,
+            )
+        except ClientError as e:
+            error = e.response.get("Error", {})
+            return RestoreResult.construct(
+                Errors=[
+                    DeleteObjectError.construct(
+                        Key=version.key,
+                        VersionId=version.version_id,
+                        Code=error.get("Code", "n/a"),
+                        Message=error.get("Message"),
+                    )
+                ]
+            )
+        return RestoreResult.construct(Restored=1, Copied=1)
+
+    async def requests() -> AsyncIterator[Awaitable[RestoreResult]]:
+        batch: List[ObjectIdentifierTypeDef] = []
+        # The keys of the batch by the index of their last marker. The
+        # markers of a key may span two batches, thus a key is counted
+        # as restored by the batch that holds its last marker only.
+        ends: List[Tuple[int, str]] = []
+        async for versions in group_versions(pages):
+            markers, version = plan_restore(versions, timestamp)
+            if version is not None:
+                yield promote(version)
+            if markers:
+                batch.extend(markers)
+                ends.append((len(batch) - 1, versions[0].key))
+            while len(batch) >= MAX_DELETE_KEYS:
+                keys = {key for i, key in ends if i < MAX_DELETE_KEYS}
+                ends = [
+                    (i - MAX_DELETE_KEYS, key)
+                    for i, key in ends
+                    if i >= MAX_DELETE_KEYS
+                ]
+                yield remove(batch[:MAX_DELETE_KEYS], keys)
+                batch = batch[MAX_DELETE_KEYS:]
+        if batch:
+            yield remove(batch, {key for _, key in ends})
+
+    async with contextlib.aclosing(
+        run_bounded(requests(), max_workers)
+    ) as results:
+        async for result in results:
+            yield result
+
+
+def add_restore_result(total: RestoreResult, result: RestoreResult) -> None:
+    """
+    Adds the result of a single request to the total result.
+    """
+    total.Restored += result.Restored
+    total.Copied += result.Copied
+    total.DeleteMarkers += result.DeleteMarkers
+    total.Errors.extend(result.Errors)
@@ -120,6 +120,25 @@ class DeletedObject(BaseModel):
     DeleteMarkerVersionId: Optional[str] = None
 
 
+class DeleteObjectError(BaseModel):
+    Key: str
+    VersionId: Optional[str] = None
+    Code: str
+    Message: Optional[str] = None
+
+
+class DeleteObjectsResult(BaseModel):
+    Deleted: List[DeletedObject]
+    Errors: List[DeleteObjectError]
+
+
+class DeleteResult(DeleteObjectsResult):
+    Batch: int = Field(
+        description="The index of the batch. Note, the results of the "
+        "batches may arrive out of order."
+    )
+
+
 class ObjectIdentifier(BaseModel):
     Key: str
     VersionId: str = ""
@@ -129,9 +148,87 @@ class ObjectRequest(ObjectIdentifier):
     pass
 
 
+class ObjectFilter(BaseModel):
+    Name: Optional[str] = Field(
+        default=None,
+        description="Only return the objects and folders whose name "
+        "contains this string, ignoring case. Glob patterns like `*.txt` "
+        "are supported.",
+    )
+    MinSize: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="Only return the objects of at least this size in bytes.",
+    )
+    MaxSize: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="Only return the objects of at most this size in bytes.",
+    )
+    ModifiedAfter: Optional[dt] = Field(
+        default=None,
+        description="Only return the objects modified at or after this "
+        "date. Dates without time zone are considered to be UTC.",
+    )
+    ModifiedBefore: Optional[dt] = Field(
+        default=None,
+        description="Only return the objects modified before this date. "
+        "Dates without time zone are considered to be UTC.",
+    )
+    ContentType: Optional[str] = Field(
+        default=None,
+        description="Only return the objects of this content type, e.g. "
+        "`image/*`. Listings do not provide the content type, thus it is "
+        "guessed from the object name.",
+    )
+
+
 class ListObjectsRequest(BaseModel):
     Prefix: str = ""
     Delimiter: str = "/"
+    Filter: Optional[ObjectFilter] = Field(
+        default=None,
+        description="Only return the objects and folders that match all "
+        "the given criteria. Folders only match if no criteria except the "
+        "`Name` are given.",
+    )
+    SortBy: Optional[Literal["Name", "Size", "LastModified"]] = Field(
+        default=None,
+        description="Sort the objects by this property. Folders are always "
+        "returned first, sorted by name. Sorting requires the whole "
+        "listing to be processed before anything is returned.",
+    )
+    SortOrder: Literal["asc", "desc"] = "asc"
+    Limit: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="The maximum number of objects and folders to return.",
+    )
+
+
+class ListObjectsPageRequest(ListObjectsRequest):
+    MaxKeys: int = Field(
+        default=1000,
+        ge=1,
+        le=1000,
+        description="The maximum number of objects and folders per page.",
+    )
+    StartAfter: str = Field(
+        default="",
+        description="Start listing after this key. This is ignored if a "
+        "`ContinuationToken` is specified.",
+    )
+    ContinuationToken: str = Field(
+        default="",
+        description="The opaque token returned by a previous request as "
+        "`NextContinuationToken` to obtain the next page.",
+    )
+
+
+class ListObjectsPage(BaseModel):
+    Objects: List[Object]
+    IsTruncated: bool = False
+    NextContinuationToken: Optional[str] = None
 
 
 class ListObjectVersionsRequest(ListObjectsRequest):
@@ -142,11 +239,40 @@ class ListObjectVersionsRequest(ListObjectsRequest):
     )
 
 
+class ListObjectVersionsPageRequest(ListObjectVersionsRequest):
+    MaxKeys: int = Field(
+        default=1000,
+        ge=1,
+        le=1000,
+        description="The maximum number of object versions, delete markers "
+        "and folders per page.",
+    )
+    KeyMarker: str = Field(
+        default="",
+        description="Start listing after this key, or at this key if a "
+        "`VersionIdMarker` is specified. Use the `NextKeyMarker` returned "
+        "by a previous request to obtain the next page.",
+    )
+    VersionIdMarker: str = Field(
+        default="",
+        description="Start listing after this version of the `KeyMarker` "
+        "key. Use the `NextVersionIdMarker` returned by a previous request "
+        "to obtain the next page.",
+    )
+
+
 class ObjectVersion(Object):
     IsDeleted: bool
     IsLatest: bool
 
 
+class ListObjectVersionsPage(BaseModel):
+    Objects: List[ObjectVersion]
+    IsTruncated: bool = False
+    NextKeyMarker: Optional[str] = None
+    NextVersionIdMarker: Optional[str] = None
+
+
 class ObjectLockLegalHold(BaseModel):
     Status: ObjectLockLegalHoldStatusType
 
@@ -182,9 +308,98 @@ class DeleteObjectByPrefixRequest(BaseModel):
         "starting with that prefix, whereas `a/b` will only delete this "
         "specific object.",
     )
-    Delimiter: str = "/"
+    Delimiter: str = Field(
+        default="/",
+        description="Deprecated, the objects are listed without delimiter.",
+    )
     AllVersions: bool = Field(
         default=False,
         description="If `True`, all versions will be deleted, otherwise "
         "the latest one.",
     )
+
+
+class RestoreObjectByPrefixRequest(BaseModel):
+    Prefix: str = Field(
+        title="The prefix of the objects to restore.",
+        description="Note, a prefix like `a/b/` will restore all objects "
+        "starting with that prefix, whereas `a/b` will only restore this "
+        "specific object.",
+    )
+    Timestamp: Optional[dt] = Field(
+        default=None,
+        description="Restore the objects to the version that was the "
+        "latest at this time. Objects that did not exist at this time are "
+        "left as they are. By default, the objects whose latest version is "
+        "a delete marker are restored to their latest version. Dates "
+        "without time zone are considered to be UTC.",
+    )
+
+
+class DownloadArchiveRequest(BaseModel):
+    Prefix: Optional[str] = Field(
+        default=None,
+        description="Download all objects starting with this prefix, e.g. "
+        "`a/b/` for the folder `b`. The names within the archive are "
+        "relative to the parent folder, e.g. `b/c.txt`.",
+    )
+    Keys: List[ObjectIdentifier] = Field(
+        default=[],
+        description="Download these objects instead of a prefix. Keys "
+        "ending with a `/` are folders, whose objects are downloaded. The "
+        "names within the archive are relative to the deepest folder that "
+        "contains all of them.",
+    )
+    Format: Literal["zip", "tar"] = "zip"
+    Compression: Literal["deflate", "store"] = Field(
+        default="deflate",
+        description="How the objects are compressed within a ZIP archive. "
+        "Use `store` for objects that are compressed already, e.g. images "
+        "or videos. Tar archives are not compressed.",
+    )
+
+
+class RestoreResult(BaseModel):
+    Restored: int = Field(
+        default=0, description="The number of restored objects."
+    )
+    Copied: int = Field(
+        default=0,
+        description="The number of objects that were restored by copying "
+        "an older version, because newer versions exist.",
+    )
+    DeleteMarkers: int = Field(
+        default=0, description="The number of removed delete markers."
+    )
+    Errors: List[DeleteObjectError] = []
+    Seconds: float = Field(default=0, description="The duration in seconds.")
+    ObjectsPerSecond: float = Field(
+        default=0, description="The number of restored objects per second."
+    )
+
+
+JobStatus = Literal["PENDING", "RUNNING", "SUCCEEDED", "FAILED", "CANCELLED"]
+
+
+class Job(BaseModel):
+    Id: str
+    Type: str = Field(description="The operation, e.g. `delete-by-prefix`.")
+    Description: str = ""
+    Status: JobStatus = "PENDING"
+    CreatedAt: dt
+    StartedAt: Optional[dt] = None
+    FinishedAt: Optional[dt] = None
+    Done: int = Field(
+        default=0, description="The number of items processed so far."
+    )
+    Failed: int = Field(
+        default=0, description="The number of items that failed so far."
+    )
+    Errors: List[str] = Field(
+        default=[],
+        description="The reasons why items failed. Only the first 100 "
+        "reasons are kept.",
+    )
+    Error: Optional[str] = Field(
+        default=None, description="The reason why the job failed."
+    )
@@ -91,6 +91,47 @@ def get_environ_enum(enum_cls: Type[ET], key: str, default: Any) -> ET:
     return enum_cls(value)
 
 
+def get_environ_int(key: str, default: int) -> int:
+    """
+    Helper function to obtain an integer value from an environment variable.
+    :param key: The name of the environment variable.
+    :param default: The default value if the variable does not exist.
+    :return: The content of the specified environment variable as integer.
+    """
+    value: str | None = os.environ.get(key)
+    if value is None:
+        res = default
+    else:
+        try:
+            res = int(value)
+        except ValueError:
+            logger.error(
+                f"Malformed value in environment variable {key}: {value}"
+            )
+            raise EnvironMalformedError(key)
+    logger.info(f"Using {key}={res}")
+    return res
+
+
+def get_environ_bool(key: str, default: bool = False) -> bool:
+    """
+    Helper function to obtain a boolean value from an environment variable.
+    The values `1`, `true`, `yes` and `on` (case-insensitive) are treated
+    as `True`, any other value as `False`.
+    :param key: The name of the environment variable.
+    :param default: The default value if the variable does not exist.
+    :return: The content of the specified environment variable as boolean.
+    """
+    value: str | None = os.environ.get(key)
+    res = (
+        default
+        if value is None
+        else value.strip().lower() in ["1", "true", "yes", "on"]
+    )
+    logger.info(f"Using {key}={res}")
+    return res
+
+
 def get_s3gw_address() -> str:
     """
     Obtain s3gw service address from environment, and validate format.
@@ -153,6 +194,30 @@ class Config:
     _ui_path: str
     _api_path: str
     _instance_id: str
+    _s3_client_pool_size: int
+    _s3_client_idle_ttl: int
+    _s3_max_pool_connections: int
+    _s3_list_workers: int
+    _s3_delete_workers: int
+    _s3_copy_multipart_threshold: int
+    _s3_copy_part_size: int
+    _s3_copy_workers: int
+    _s3_download_parallel_threshold: int
+    _s3_download_chunk_size: int
+    _s3_download_workers: int
+    _s3_download_buffer_size: int
+    _s3_archive_workers: int
+    _key_index_path: str
+    _key_index_max_age: int
+    _admin_ops_max_connections: int
+    _admin_ops_max_keepalive_connections: int
+    _admin_ops_keepalive_expiry: int
+    _admin_ops_http2: bool
+    _api_compression_level: int
+    _api_compression_min_size: int
+    _jobs_max_running: int
+    _jobs_db_path: str
+    _jobs_ttl: int
 
     def __init__(self) -> None:
         self._s3gw_addr = get_s3gw_address()
@@ -165,6 +230,58 @@ class Config:
         self._ui_path = get_ui_path()
         self._api_path = get_api_path()
         self._instance_id = get_environ_str("S3GW_INSTANCE_ID")
+        self._s3_client_pool_size = get_environ_int(
+            "S3GW_S3_CLIENT_POOL_SIZE", 32
+        )
+        self._s3_client_idle_ttl = get_environ_int(
+            "S3GW_S3_CLIENT_IDLE_TTL", 300
+        )
+        self._s3_max_pool_connections = get_environ_int(
+            "S3GW_S3_MAX_POOL_CONNECTIONS", 50
+        )
+        self._s3_list_workers = get_environ_int("S3GW_S3_LIST_WORKERS", 1)
+        self._s3_delete_workers = get_environ_int("S3GW_S3_DELETE_WORKERS", 4)
+        self._s3_copy_multipart_threshold = get_environ_int(
+            "S3GW_S3_COPY_MULTIPART_THRESHOLD", 128 * 1024 * 1024
+        )
+        self._s3_copy_part_size = get_environ_int(
+            "S3GW_S3_COPY_PART_SIZE", 64 * 1024 * 1024
+        )
+        self._s3_copy_workers = get_environ_int("S3GW_S3_COPY_WORKERS", 4)
+        self._s3_download_parallel_threshold = get_environ_int(
+            "S3GW_S3_DOWNLOAD_PARALLEL_THRESHOLD", 64 * 1024 * 1024
+        )
+        self._s3_download_chunk_size = get_environ_int(
+            "S3GW_S3_DOWNLOAD_CHUNK_SIZE", 8 * 1024 * 1024
+        )
+        self._s3_download_workers = get_environ_int(
+            "S3GW_S3_DOWNLOAD_WORKERS", 1
+        )
+        self._s3_download_buffer_size = get_environ_int(
+            "S3GW_S3_DOWNLOAD_BUFFER_SIZE", 1024 * 1024
+        )
+        self._s3_archive_workers = get_environ_int("S3GW_S3_ARCHIVE_WORKERS", 4)
+        self._key_index_path = get_environ_str("S3GW_KEY_INDEX_PATH")
+        self._key_index_max_age = get_environ_int("S3GW_KEY_INDEX_MAX_AGE", 60)
+        self._admin_ops_max_connections = get_environ_int(
+            "S3GW_ADMIN_OPS_MAX_CONNECTIONS", 100
+        )
+        self._admin_ops_max_keepalive_connections = get_environ_int(
+            "S3GW_ADMIN_OPS_MAX_KEEPALIVE_CONNECTIONS", 20
+        )
+        self._admin_ops_keepalive_expiry = get_environ_int(
+            "S3GW_ADMIN_OPS_KEEPALIVE_EXPIRY", 5
+        )
+        self._admin_ops_http2 = get_environ_bool("S3GW_ADMIN_OPS_HTTP2")
+        self._api_compression_level = get_environ_int(
+            "S3GW_API_COMPRESSION_LEVEL", 6
+        )
+        self._api_compression_min_size = get_environ_int(
+            "S3GW_API_COMPRESSION_MIN_SIZE", 500
+        )
+        self._jobs_max_running = get_environ_int("S3GW_JOBS_MAX_RUNNING", 4)
+        self._jobs_db_path = get_environ_str("S3GW_JOBS_DB_PATH")
+        self._jobs_ttl = get_environ_int("S3GW_JOBS_TTL", 3600)
 
     @property
     def s3gw_addr(self) -> str:
@@ -203,6 +320,210 @@ class Config:
         """
         return self._instance_id
 
+    @property
+    def s3_client_pool_size(self) -> int:
+        """
+        The maximum number of idle S3 clients that are kept open for
+        reuse. Defaults to `32`.
+        """
+        return self._s3_client_pool_size
+
+    @property
+    def s3_client_idle_ttl(self) -> int:
+        """
+        The number of seconds an unused S3 client is kept open before
+        it is closed. Defaults to `300`.
+        """
+        return self._s3_client_idle_ttl
+
+    @property
+    def s3_max_pool_connections(self) -> int:
+        """
+        The maximum number of open connections of an S3 client. Note, a
+        client is shared by all requests using the same credentials, and
+        a streamed download or a concurrent worker, e.g. of a parallel
+        listing or download, holds a connection until it is done. Other
+        requests wait for a free connection once the limit is reached.
+        Defaults to `50`.
+        """
+        return self._s3_max_pool_connections
+
+    @property
+    def s3_list_workers(self) -> int:
+        """
+        The maximum number of concurrent requests used to list the
+        objects of a bucket, if the listing does not fit into a single
+        page. Defaults to `1`, which lists the pages sequentially.
+        """
+        return self._s3_list_workers
+
+    @property
+    def s3_delete_workers(self) -> int:
+        """
+        The maximum number of concurrent `DeleteObjects` requests used to
+        delete the objects of a prefix. Defaults to `4`.
+        """
+        return self._s3_delete_workers
+
+    @property
+    def s3_copy_multipart_threshold(self) -> int:
+        """
+        The size in bytes above which objects are copied via a multipart
+        upload instead of a single `CopyObject` request, e.g. to restore
+        an older version. Defaults to 128 MiB.
+        """
+        return self._s3_copy_multipart_threshold
+
+    @property
+    def s3_copy_part_size(self) -> int:
+        """
+        The size in bytes of the parts of a multipart copy. Defaults to
+        64 MiB.
+        """
+        return self._s3_copy_part_size
+
+    @property
+    def s3_copy_workers(self) -> int:
+        """
+        The maximum number of concurrent `UploadPartCopy` requests of a
+        multipart copy. Defaults to `4`.
+        """
+        return self._s3_copy_workers
+
+    @property
+    def s3_download_parallel_threshold(self) -> int:
+        """
+        The size in bytes above which objects are downloaded via
+        concurrent ranged requests, see `s3_download_workers`. Defaults to
+        64 MiB.
+        """
+        return self._s3_download_parallel_threshold
+
+    @property
+    def s3_download_chunk_size(self) -> int:
+        """
+        The size in bytes of the ranges of a parallel download. Defaults
+        to 8 MiB.
+        """
+        return self._s3_download_chunk_size
+
+    @property
+    def s3_download_workers(self) -> int:
+        """
+        The maximum number of concurrent ranged requests per download of
+        a large object. The memory used per download is bounded by this
+        number times `s3_download_chunk_size`. Defaults to `1`, which
+        streams the object via a single request.
+        """
+        return self._s3_download_workers
+
+    @property
+    def s3_download_buffer_size(self) -> int:
+        """
+        The size in bytes of the chunks in which an object that is
+        streamed via a single request is sent to the client. Defaults to
+        1 MiB.
+        """
+        return self._s3_download_buffer_size
+
+    @property
+    def s3_archive_workers(self) -> int:
+        """
+        The maximum number of objects that are requested at the same time
+        when downloading an archive of multiple objects. The memory used
+        per download is bounded by about this number times
+        `s3_download_buffer_size`. Defaults to `4`.
+        """
+        return self._s3_archive_workers
+
+    @property
+    def key_index_path(self) -> str:
+        """
+        The path of the SQLite database used to index the objects of the
+        buckets. Defaults to an empty string, which disables the index.
+        """
+        return self._key_index_path
+
+    @property
+    def key_index_max_age(self) -> int:
+        """
+        The number of seconds a folder is served from the index before it
+        is listed again. Defaults to `60`.
+        """
+        return self._key_index_max_age
+
+    @property
+    def admin_ops_max_connections(self) -> int:
+        """
+        The maximum number of concurrent connections to the Admin Ops API.
+        Defaults to `100`.
+        """
+        return self._admin_ops_max_connections
+
+    @property
+    def admin_ops_max_keepalive_connections(self) -> int:
+        """
+        The maximum number of idle connections to the Admin Ops API that
+        are kept alive. Defaults to `20`.
+        """
+        return self._admin_ops_max_keepalive_connections
+
+    @property
+    def admin_ops_keepalive_expiry(self) -> int:
+        """
+        The number of seconds after which an idle connection to the Admin
+        Ops API is closed. Defaults to `5`.
+        """
+        return self._admin_ops_keepalive_expiry
+
+    @property
+    def admin_ops_http2(self) -> bool:
+        """
+        Use HTTP/2 for the Admin Ops API, if supported. Defaults to `False`.
+        """
+        return self._admin_ops_http2
+
+    @property
+    def api_compression_level(self) -> int:
+        """
+        The level used to compress API responses, from `1` (fastest) to
+        `9` (smallest). `0` disables the compression. Defaults to `6`.
+        """
+        return self._api_compression_level
+
+    @property
+    def api_compression_min_size(self) -> int:
+        """
+        The minimum size in bytes of an API response to be compressed.
+        Streamed responses are always compressed. Defaults to `500`.
+        """
+        return self._api_compression_min_size
+
+    @property
+    def jobs_max_running(self) -> int:
+        """
+        The maximum number of background jobs that are running at the
+        same time. Defaults to `4`.
+        """
+        return self._jobs_max_running
+
+    @property
+    def jobs_db_path(self) -> str:
+        """
+        The path of the SQLite database used to keep the state of the
+        background jobs across restarts. Defaults to an empty string,
+        which keeps the jobs in memory only.
+        """
+        return self._jobs_db_path
+
+    @property
+    def jobs_ttl(self) -> int:
+        """
+        The number of seconds a finished background job is kept.
+        Defaults to `3600`.
+        """
+        return self._jobs_ttl
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             "ApiPath": self.api_path,
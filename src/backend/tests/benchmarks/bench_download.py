@@ -0,0 +1,114 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compares the throughput of streaming an object body to the client as
+returned by the S3 response, i.e. in chunks of 1 KiB, with the one of
+streaming it in large chunks of `buffer_size` bytes that are read ahead,
+against the moto S3 server.
+
+Run from the `src/` directory:
+
+    $ python3 -m backend.tests.benchmarks.bench_download [N]
+
+where `N` is the size of the object in MiB, 64 by default.
+"""
+
+import asyncio
+import sys
+import time
+from typing import Any, AsyncIterable, Callable, Optional
+
+from starlette.types import Message, Scope
+
+from backend.api import S3GWClient, objects
+from backend.api.types import ObjectRequest
+from backend.tests.unit.helpers import ConfigMock
+from backend.tests.unit.moto_server import MotoService
+
+BUCKET = "bench"
+KEY = "object.bin"
+
+
+def unbuffered_body(s3_res: Any, options: Any) -> AsyncIterable[bytes]:
+    # The body as it was streamed before large chunks were used.
+    return s3_res["Body"]
+
+
+async def download(conn: S3GWClient) -> int:
+    received = 0
+    messages = 0
+
+    async def receive() -> Message:
+        await asyncio.Event().wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        nonlocal received, messages
+        received += len(message.get("body", b""))
+        messages += 1
+
+    res = await objects.download_object(conn, BUCKET, ObjectRequest(Key=KEY))
+    scope: Scope = {"type": "http", "method": "POST", "headers": []}
+    await res(scope, receive, send)
+    assert received == res.stats.bytes
+    return messages
+
+
+async def run(
+    name: str,
+    endpoint: str,
+    size: int,
+    buffer_size: int = 1024 * 1024,
+    body: Optional[Callable[[Any, Any], AsyncIterable[bytes]]] = None,
+) -> float:
+    conn = S3GWClient(
+        ConfigMock(endpoint, s3_download_buffer_size=buffer_size), "foo", "bar"
+    )
+    buffered_body = objects.buffered_body
+    if body is not None:
+        objects.buffered_body = body  # type: ignore
+    try:
+        start = time.perf_counter()
+        messages = await download(conn)
+        elapsed = time.perf_counter() - start
+    finally:
+        objects.buffered_body = buffered_body
+    print(
+        f"{name:>16}: {size / elapsed / 2**20:>10.1f} MiB/s "
+        f"({elapsed:.2f}s, {messages} messages)"
+    )
+    return elapsed
+
+
+async def main() -> None:
+    size = (int(sys.argv[1]) if len(sys.argv) > 1 else 64) * 2**20
+    async with MotoService("s3") as svc:
+        conn = S3GWClient(ConfigMock(svc.endpoint_url), "foo", "bar")
+        async with conn.conn() as s3:
+            await s3.create_bucket(Bucket=BUCKET)
+            await s3.put_object(Bucket=BUCKET, Key=KEY, Body=bytes(size))
+        print(f"Download of {size // 2**20} MiB")
+        unbuffered = await run(
+            "1 KiB chunks", svc.endpoint_url, size, body=unbuffered_body
+        )
+        for mib in [1, 4, 8]:
+            buffered = await run(
+                f"{mib} MiB chunks", svc.endpoint_url, size, mib * 2**20
+            )
+            print(f"{'speedup':>16}: {unbuffered / buffered:>10.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
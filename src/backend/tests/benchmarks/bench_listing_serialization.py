@@ -0,0 +1,133 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compares the throughput of converting and serializing a large
+`list_objects_v2` listing via validated models and FastAPI's default
+response path with the one of trusted models and `ModelResponse`, as
+well as the size of the columnar representation of `ColumnsResponse`.
+
+Run from the `src/` directory:
+
+    $ python3 -m backend.tests.benchmarks.bench_listing_serialization [N]
+
+where `N` is the number of listed objects, 1000000 by default.
+"""
+
+import asyncio
+import datetime
+import sys
+import time
+from typing import Any, Callable, Dict, List, cast
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import parse_obj_as
+from types_aiobotocore_s3.type_defs import ListObjectsV2OutputTypeDef
+
+from backend.api.objects import list_objects_output_to_objects, split_key
+from backend.api.responses import ColumnsResponse, ModelResponse
+from backend.api.types import Object
+
+PAGE_SIZE = 1000
+
+
+def make_pages(count: int) -> List[ListObjectsV2OutputTypeDef]:
+    lm = datetime.datetime.now(datetime.timezone.utc)
+    contents: List[Dict[str, Any]] = [
+        {
+            "Key": f"folder-{i // 10000:03d}/object-{i:07d}.txt",
+            "LastModified": lm,
+            "ETag": '"d41d8cd98f00b204e9800998ecf8427e"',
+            "Size": i,
+            "StorageClass": "STANDARD",
+        }
+        for i in range(count)
+    ]
+    return [
+        cast(
+            ListObjectsV2OutputTypeDef,
+            {"Contents": contents[i : i + PAGE_SIZE]},
+        )
+        for i in range(0, count, PAGE_SIZE)
+    ]
+
+
+def validated_objects(s3_res: ListObjectsV2OutputTypeDef) -> List[Object]:
+    # The conversion as it was done before trusted models were used.
+    return [
+        parse_obj_as(
+            Object,
+            {
+                "Name": split_key(content.get("Key", "")).pop(),
+                "Type": "OBJECT",
+                **content,
+            },
+        )
+        for content in s3_res.get("Contents", [])
+    ]
+
+
+async def default_response(pages: List[ListObjectsV2OutputTypeDef]) -> bytes:
+    res: List[Object] = []
+    for page in pages:
+        res.extend(validated_objects(page))
+    field = create_response_field(name="Response", type_=List[Object])
+    content = await serialize_response(field=field, response_content=res)
+    return JSONResponse(content).body
+
+
+async def model_response(pages: List[ListObjectsV2OutputTypeDef]) -> bytes:
+    res: List[Object] = []
+    for page in pages:
+        res.extend(list_objects_output_to_objects(page))
+    return ModelResponse(res).body
+
+
+async def columns_response(pages: List[ListObjectsV2OutputTypeDef]) -> bytes:
+    res: List[Object] = []
+    for page in pages:
+        res.extend(list_objects_output_to_objects(page))
+    return ColumnsResponse(res).body
+
+
+def run(
+    name: str,
+    fn: Callable[[List[ListObjectsV2OutputTypeDef]], Any],
+    pages: List[ListObjectsV2OutputTypeDef],
+    count: int,
+) -> float:
+    start = time.perf_counter()
+    body: bytes = asyncio.run(fn(pages))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:>16}: {count / elapsed:>10.0f} objects/s "
+        f"({elapsed:.2f}s, {len(body) / 2**20:.1f} MiB)"
+    )
+    return elapsed
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    pages = make_pages(count)
+    print(f"Listing of {count} objects")
+    default = run("response_model", default_response, pages, count)
+    fast = run("ModelResponse", model_response, pages, count)
+    print(f"{'speedup':>16}: {default / fast:>10.2f}x")
+    run("ColumnsResponse", columns_response, pages, count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compares the throughput of signing Admin Ops requests via botocore's
+`HmacV1Auth` with the one of `HmacV1Signer`.
+
+Run from the `src/` directory:
+
+    $ python3 -m backend.tests.benchmarks.bench_signer
+"""
+
+import timeit
+from typing import Any, Dict
+
+import httpx
+from botocore.auth import HmacV1Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+
+from backend.admin_ops import signed_request
+from backend.admin_ops.signer import get_signer
+
+URL = "http://127.0.0.1:7480/admin/user"
+PARAMS: Dict[str, Any] = {"uid": "testid", "stats": False}
+
+
+def botocore_signed_request() -> httpx.Request:
+    creds = Credentials("test", "test")
+    aws_req = AWSRequest(method="GET", url=URL, params=PARAMS)
+    HmacV1Auth(credentials=creds).add_auth(aws_req)
+    return httpx.Request(
+        method="GET",
+        url=URL,
+        params=aws_req.params,
+        data=aws_req.data,
+        headers=dict(aws_req.headers),
+    )
+
+
+def fast_signed_request() -> httpx.Request:
+    return signed_request(
+        access="test", secret="test", method="GET", url=URL, params=PARAMS
+    )
+
+
+def botocore_sign() -> Dict[str, Any]:
+    aws_req = AWSRequest(method="GET", url=URL)
+    HmacV1Auth(credentials=Credentials("test", "test")).add_auth(aws_req)
+    return dict(aws_req.headers)
+
+
+def fast_sign() -> Dict[str, Any]:
+    return get_signer("test", "test").sign("GET", URL)
+
+
+def run(title: str, botocore_fn: Any, fast_fn: Any, number: int) -> None:
+    print(title)
+    results: Dict[str, float] = {}
+    for name, fn in [("botocore", botocore_fn), ("HmacV1Signer", fast_fn)]:
+        elapsed = min(timeit.repeat(fn, number=number, repeat=5))
+        results[name] = number / elapsed
+        print(f"{name:>14}: {results[name]:>10.0f} ops/s")
+    speedup = results["HmacV1Signer"] / results["botocore"]
+    print(f"{'speedup':>14}: {speedup:>10.2f}x")
+
+
+def main() -> None:
+    run("Signature only", botocore_sign, fast_sign, 50000)
+    run(
+        "Signed httpx.Request",
+        botocore_signed_request,
+        fast_signed_request,
+        20000,
+    )
+
+
+if __name__ == "__main__":
+    main()
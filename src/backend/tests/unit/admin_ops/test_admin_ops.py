@@ -18,7 +18,13 @@ import httpx
 import pytest
 from pytest_mock import MockerFixture
 
-from backend.admin_ops import do_request, send_request, signed_request
+import backend.admin_ops as admin_ops
+from backend.admin_ops import (
+    AdminOpsTransport,
+    do_request,
+    send_request,
+    signed_request,
+)
 
 
 @pytest.mark.anyio
@@ -102,3 +108,39 @@ async def test_send_request(mocker: MockerFixture) -> None:
     req = httpx.Request("GET", "foo.bar")
     await send_request(req)
     p.assert_called_once_with(req)
+
+
+@pytest.mark.anyio
+async def test_send_request_transport(mocker: MockerFixture) -> None:
+    transport = AdminOpsTransport()
+    admin_ops.set_transport(transport)
+    assert admin_ops.get_transport() is transport
+    p = mocker.patch("httpx.AsyncClient.send")
+    req = httpx.Request("GET", "foo.bar")
+    await send_request(req)
+    client = transport.client
+    await send_request(req)
+    assert transport.client is client
+    assert not client.is_closed
+    assert p.call_count == 2
+    admin_ops.set_transport(None)
+    await transport.close()
+    assert client.is_closed
+
+
+@pytest.mark.anyio
+async def test_transport_limits() -> None:
+    transport = AdminOpsTransport(
+        max_connections=10, max_keepalive_connections=5, keepalive_expiry=1
+    )
+    assert transport.limits.max_connections == 10
+    assert transport.limits.max_keepalive_connections == 5
+    assert transport.limits.keepalive_expiry == 1
+    await transport.close()
+
+
+@pytest.mark.anyio
+async def test_transport_http2_unavailable(mocker: MockerFixture) -> None:
+    mocker.patch("importlib.util.find_spec", return_value=None)
+    transport = AdminOpsTransport(http2=True)
+    assert transport.http2 is False
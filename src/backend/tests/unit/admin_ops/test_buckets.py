@@ -102,6 +102,26 @@ async def test_bucket_list(httpx_mock: HTTPXMock) -> None:
     assert res[1].bucket == "bar"
 
 
+@pytest.mark.anyio
+async def test_bucket_list_names(httpx_mock: HTTPXMock) -> None:
+    httpx_mock.add_response(  # pyright: ignore [reportUnknownMemberType]
+        json=["foo", "bar"],
+    )
+
+    res: List[str] = await buckets.list_bucket_names(
+        url="http://foo.bar:123",
+        access_key="asd",
+        secret_key="qwe",
+        uid="baz",
+    )
+
+    assert res == ["foo", "bar"]
+    req = httpx_mock.get_request()  # pyright: ignore [reportUnknownMemberType]
+    assert req is not None
+    assert req.url.params.get("uid") == "baz"
+    assert "stats" not in req.url.params
+
+
 @pytest.mark.anyio
 async def test_bucket_list_failure(httpx_mock: HTTPXMock) -> None:
     httpx_mock.add_response(  # pyright: ignore [reportUnknownMemberType]
@@ -0,0 +1,169 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import pytest
+from botocore.auth import HmacV1Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+from pytest_mock import MockerFixture
+
+from backend.admin_ops import signed_request, signer
+from backend.admin_ops.signer import HmacV1Signer, get_signer
+
+DATE = "Mon, 07 Aug 2023 12:49:30 GMT"
+
+
+class FixedDateHmacV1Auth(HmacV1Auth):
+    def _get_date(self) -> str:
+        return DATE
+
+
+def botocore_sign(
+    access: str,
+    secret: str,
+    method: str,
+    url: str,
+    headers: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    aws_req = AWSRequest(method=method, url=url, headers=headers)
+    FixedDateHmacV1Auth(Credentials(access, secret)).add_auth(aws_req)
+    return dict(aws_req.headers)
+
+
+@pytest.mark.parametrize(
+    "method,url",
+    [
+        ("GET", "http://foo.bar:123"),
+        ("get", "http://foo.bar:123/"),
+        ("POST", "http://foo.bar:123/admin/user"),
+        ("PUT", "http://foo.bar:123/admin/user?key"),
+        ("DELETE", "http://foo.bar:123/admin/user?quota&uid=foo"),
+        ("GET", "http://foo.bar:123/?usage"),
+        ("GET", "http://foo.bar:123/?param1=baz"),
+        ("GET", "http://foo.bar:123/bucket/obj?versionId=a%2Fb&acl"),
+        ("GET", "http://foo.bar:123/bucket/obj?uploads&tagging&acl="),
+        ("GET", "http://foo.bar:123/bucket/obj?uploadId=1&partNumber=2"),
+        ("GET", "http://foo.bar:123/b/o?response-content-type=text%2Fplain"),
+        ("GET", "https://foo.bar/b%C3%A4r/f%20o?versions&delete"),
+        ("GET", "http://foo.bar:123/b/o?acl&acl=foo&x=y&"),
+    ],
+)
+def test_signer_url_equivalence(method: str, url: str) -> None:
+    signer = HmacV1Signer("test", "secret")
+    expected = botocore_sign("test", "secret", method, url)
+    assert signer.sign(method, url, date=DATE) == expected
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        None,
+        {},
+        {"Content-Type": "application/json"},
+        {"content-md5": " 1B2M2Y8AsgTpgAmY7PhCfg== ", "Foo": "bar"},
+        {"Date": "Sat, 01 Jan 2000 00:00:00 GMT"},
+        {"date": "Sat, 01 Jan 2000 00:00:00 GMT", "Content-Type": "a/b"},
+        {"X-Amz-Meta-Foo": "bar", "x-amz-date": "baz"},
+        {"x-amz-b": " 2 ", "X-AMZ-A": "1", "Content-Type": "text/plain"},
+        {"Authorization": "AWS foo:bar", "x-amz-acl": "private"},
+    ],
+)
+def test_signer_headers_equivalence(headers: Optional[Dict[str, Any]]) -> None:
+    url = "http://foo.bar:123/admin/bucket?uid=test"
+    signer = HmacV1Signer("foo", "bar")
+    expected = botocore_sign("foo", "bar", "PUT", url, headers)
+    assert signer.sign("PUT", url, headers, date=DATE) == expected
+
+
+@pytest.mark.parametrize(
+    "access,secret",
+    [
+        ("test", "test"),
+        (
+            "0555b35654ad1656d804",
+            "h7GhxuBLTrlhVUyxSPUKUV8r/2EI4ngqJxD7iBdBYLhwluN30JaT3Q==",
+        ),
+        ("ÄÖÜ", "äöü"),
+        ("a", ""),
+    ],
+)
+def test_signer_credentials_equivalence(access: str, secret: str) -> None:
+    url = "http://foo.bar:123/admin/metadata/user"
+    signer = HmacV1Signer(access, secret)
+    expected = botocore_sign(access, secret, "GET", url)
+    assert signer.sign("GET", url, date=DATE) == expected
+
+
+def test_signer_reuse() -> None:
+    signer = HmacV1Signer("foo", "bar")
+    res1 = signer.sign("GET", "http://foo.bar:123/admin/user", date=DATE)
+    res2 = signer.sign("POST", "http://foo.bar:123/admin/user", date=DATE)
+    res3 = signer.sign("GET", "http://foo.bar:123/admin/user", date=DATE)
+    assert res1 == res3
+    assert res1["Authorization"] != res2["Authorization"]
+
+
+def test_signer_default_date(mocker: MockerFixture) -> None:
+    mocker.patch("backend.admin_ops.signer.formatdate", return_value=DATE)
+    signer = HmacV1Signer("foo", "bar")
+    res = signer.sign("GET", "http://foo.bar:123/")
+    assert res["Date"] == DATE
+    assert res == botocore_sign("foo", "bar", "GET", "http://foo.bar:123/")
+
+
+def test_get_signer() -> None:
+    assert get_signer("foo", "bar") is get_signer("foo", "bar")
+    assert get_signer("foo", "bar") is not get_signer("foo", "baz")
+    assert get_signer("foo", "bar").access_key == "foo"
+
+
+def test_get_signer_cache(mocker: MockerFixture) -> None:
+    mocker.patch.object(signer, "SIGNER_CACHE_SIZE", 2)
+    signers: "OrderedDict[Tuple[str, str], HmacV1Signer]" = OrderedDict()
+    mocker.patch.object(signer, "_signers", signers)
+    first = get_signer("foo", "secret1")
+    second = get_signer("foo", "secret2")
+    assert get_signer("foo", "secret1") is first
+    get_signer("foo", "secret3")
+    # The least recently used signer has been dropped.
+    assert get_signer("foo", "secret1") is first
+    assert get_signer("foo", "secret2") is not second
+    assert len(signers) == 2
+    # The secrets are not kept in plain text as part of the cache key.
+    for key in signers:
+        assert not any("secret" in k for k in key)
+
+
+def test_signed_request_equivalence(mocker: MockerFixture) -> None:
+    mocker.patch("backend.admin_ops.signer.formatdate", return_value=DATE)
+    url = "http://foo.bar:123/admin/user?key"
+    params = {"uid": "foo", "access-key": "bar"}
+    req = signed_request(
+        access="foo",
+        secret="bar",
+        method="DELETE",
+        url=url,
+        params=params,
+        headers={"Content-Type": "application/json"},
+    )
+    expected = botocore_sign(
+        "foo", "bar", "DELETE", url, {"Content-Type": "application/json"}
+    )
+    assert req.headers["Date"] == expected["Date"]
+    assert req.headers["Authorization"] == expected["Authorization"]
+    assert req.url.params["uid"] == "foo"
+    assert req.url.params["access-key"] == "bar"
@@ -75,6 +75,16 @@ async def test_s3gw_client_addressing_style() -> None:
     assert S3AddressingStyle.PATH.value == s3gw_client.addressing_style
 
 
+@pytest.mark.anyio
+async def test_s3gw_client_max_pool_connections() -> None:
+    s3gw_client = S3GWClient(
+        ConfigMock("https://abc.xyz", s3_max_pool_connections=64), "foo", "bar"
+    )
+    async with s3gw_client.conn() as client:
+        config = client.meta.config
+        assert getattr(config, "max_pool_connections") == 64
+
+
 @pytest.mark.anyio
 async def test_s3server(s3_server: str) -> None:
     s3gw_client = S3GWClient(ConfigMock(s3_server), "foo", "bar")
@@ -17,6 +17,7 @@ from fastapi import HTTPException, Response
 from pytest_mock import MockerFixture
 
 from backend.api import S3GWClient, admin
+from backend.api.job_manager import JobManager
 
 
 @pytest.mark.anyio
@@ -86,6 +87,28 @@ async def test_admin_ops_list_users_2(
     p.assert_called_once()
 
 
+@pytest.mark.anyio
+async def test_admin_ops_list_users_fields(
+    s3_client: S3GWClient, mocker: MockerFixture
+) -> None:
+    p1 = mocker.patch(
+        "backend.admin_ops.users.list_uids", return_value=["foo", "bar"]
+    )
+    p2 = mocker.patch("backend.admin_ops.users.list_users")
+    res = await admin.list_users(s3_client, True, fields="user_id")
+    assert [u.user_id for u in res if not isinstance(u, str)] == ["foo", "bar"]
+    p1.assert_called_once()
+    p2.assert_not_called()
+    # The statistics are only gathered if requested.
+    await admin.list_users(s3_client, True, True, fields="user_id,email")
+    assert p2.call_args.args[3] is False
+    await admin.list_users(s3_client, True, True, fields="email,stats")
+    assert p2.call_args.args[3] is True
+    with pytest.raises(HTTPException) as e:
+        await admin.list_users(s3_client, True, fields="foo")
+    assert e.value.status_code == 422
+
+
 @pytest.mark.anyio
 async def test_admin_ops_create_user_key(
     s3_client: S3GWClient, response: Response, mocker: MockerFixture
@@ -183,6 +206,23 @@ async def test_admin_ops_list_buckets(
     p.assert_called_once()
 
 
+@pytest.mark.anyio
+async def test_admin_ops_list_buckets_fields(
+    s3_client: S3GWClient, mocker: MockerFixture
+) -> None:
+    p1 = mocker.patch(
+        "backend.admin_ops.buckets.list_bucket_names", return_value=["foo"]
+    )
+    p2 = mocker.patch("backend.admin_ops.buckets.list_buckets")
+    res = await admin.list_buckets(s3_client, "baz", fields="bucket")
+    assert [b.bucket for b in res] == ["foo"]
+    p1.assert_called_once()
+    assert p1.call_args.args[3] == "baz"
+    p2.assert_not_called()
+    await admin.list_buckets(s3_client, fields="bucket,usage")
+    p2.assert_called_once()
+
+
 @pytest.mark.anyio
 async def test_admin_ops_delete_bucket(
     s3_client: S3GWClient, mocker: MockerFixture
@@ -194,6 +234,23 @@ async def test_admin_ops_delete_bucket(
     assert res == "bar"
 
 
+@pytest.mark.anyio
+async def test_admin_ops_delete_bucket_job(
+    s3_client: S3GWClient, mocker: MockerFixture
+) -> None:
+    p = mocker.patch("backend.admin_ops.buckets.delete_bucket")
+    p.return_value = "bar"
+    manager = JobManager()
+    job = await admin.delete_bucket_job(s3_client, manager, "bar", True)
+    assert (job.Type, job.Status) == ("delete-bucket", "PENDING")
+    await manager.wait(job.Id)
+    res = await manager.get(s3_client.job_owner, job.Id)
+    assert res is not None
+    assert (res.Status, res.Done) == ("SUCCEEDED", 1)
+    p.assert_called_once()
+    assert p.call_args.kwargs["purge_objects"] is True
+
+
 @pytest.mark.anyio
 async def test_admin_ops_link_bucket(
     s3_client: S3GWClient, mocker: MockerFixture
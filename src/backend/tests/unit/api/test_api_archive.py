@@ -0,0 +1,255 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import contextlib
+import datetime
+import io
+import tarfile
+import uuid
+import zipfile
+from typing import Any, AsyncGenerator, Dict, List, Optional, cast
+
+import pytest
+from botocore.exceptions import ClientError
+from fastapi import HTTPException
+from types_aiobotocore_s3.client import S3Client
+
+from backend.api import S3GWClient, archive, objects
+from backend.api.archive import ArchiveEntry, FetchedObject
+from backend.api.types import DownloadArchiveRequest, ObjectIdentifier
+
+LAST_MODIFIED = datetime.datetime(
+    2023, 5, 4, 3, 2, 2, tzinfo=datetime.timezone.utc
+)
+
+
+def content(key: str) -> bytes:
+    return key.encode() * (len(key) * 100)
+
+
+class Body:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+
+    async def read(self, amt: Optional[int] = None) -> bytes:
+        amt = len(self.data) if amt is None else min(amt, 1000)
+        data, self.data = self.data[:amt], self.data[amt:]
+        return data
+
+    def close(self) -> None:
+        pass
+
+
+class S3Mock:
+    """
+    Answers `get_object` requests, the earlier ones last, and tracks the
+    number of concurrent requests.
+    """
+
+    def __init__(self, missing: List[str] = []) -> None:
+        self.missing = missing
+        self.requested: List[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_object(self, **kwargs: Any) -> Dict[str, Any]:
+        key: str = kwargs["Key"]
+        self.requested.append(key)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01 / len(self.requested))
+        finally:
+            self.in_flight -= 1
+        if key in self.missing:
+            raise ClientError(
+                {
+                    "Error": {"Code": "NoSuchKey"},
+                    "ResponseMetadata": {
+                        "RequestId": "",
+                        "HostId": "",
+                        "HTTPStatusCode": 404,
+                        "HTTPHeaders": {},
+                        "RetryAttempts": 0,
+                    },
+                },
+                "GetObject",
+            )
+        data = content(key)
+        return {
+            "Body": Body(data),
+            "ContentLength": len(data),
+            "LastModified": LAST_MODIFIED,
+        }
+
+
+async def entries(names: List[str]) -> AsyncGenerator[ArchiveEntry, None]:
+    for name in names:
+        yield ArchiveEntry(name, f"a/{name}")
+
+
+async def fetch(
+    names: List[str], s3: S3Mock, max_workers: int = 4
+) -> AsyncGenerator[FetchedObject, None]:
+    async with contextlib.aclosing(
+        archive.fetch_objects(
+            cast(S3Client, s3), "bucket", entries(names), max_workers, 1000
+        )
+    ) as objects:
+        async for obj in objects:
+            yield obj
+
+
+@pytest.mark.parametrize(
+    "keys,expected",
+    [
+        (["a/b/"], "a/"),
+        (["a/b"], "a/"),
+        (["b/"], ""),
+        (["a/b/", "a/c.txt"], "a/"),
+        (["a/b/c.txt", "a/b/d/"], "a/b/"),
+        (["a/b/c.txt", "a/bc/d.txt"], "a/"),
+        (["a/c.txt", "b/c.txt"], ""),
+    ],
+)
+def test_archive_base(keys: List[str], expected: str) -> None:
+    assert archive.archive_base(keys) == expected
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("max_workers", [1, 3])
+async def test_fetch_objects(max_workers: int) -> None:
+    s3 = S3Mock(missing=["a/c.txt"])
+    names = ["b.txt", "c.txt", "d/e.txt", "f.txt", "g.txt"]
+    res: List[bytes] = []
+    async for obj in fetch(names, s3, max_workers):
+        assert obj.size == len(content(obj.entry.key))
+        res.append(b"".join([chunk async for chunk in obj.body()]))
+    # The objects are returned in order, and missing ones are skipped.
+    assert res == [content(f"a/{n}") for n in names if n != "c.txt"]
+    assert s3.max_in_flight == max_workers
+
+
+@pytest.mark.anyio
+async def test_fetch_objects_cancel() -> None:
+    s3 = S3Mock()
+    objects = fetch([f"{i}.txt" for i in range(10)], s3, 4)
+    obj = await objects.__anext__()
+    assert obj.entry.name == "0.txt"
+    await objects.aclose()
+    await asyncio.sleep(0)
+    # Only the objects ahead have been requested.
+    assert s3.requested == [f"a/{i}.txt" for i in range(4)]
+    assert s3.in_flight == 0
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("compress", [True, False])
+async def test_zip_archive(compress: bool) -> None:
+    names = ["b.txt", "d/e.txt", "ü.txt"]
+    data = b"".join(
+        [
+            chunk
+            async for chunk in archive.zip_archive(
+                fetch(names, S3Mock()), compress
+            )
+        ]
+    )
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == names
+        for info in zf.infolist():
+            assert zf.read(info) == content(f"a/{info.filename}")
+            assert info.date_time == (2023, 5, 4, 3, 2, 2)
+            assert info.compress_type == (
+                zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+            )
+            # The sizes follow the data in a data descriptor.
+            assert info.flag_bits & 0x08
+
+
+@pytest.mark.anyio
+async def test_tar_archive() -> None:
+    names = ["b.txt", "d/e.txt", "ü" * 120 + ".txt"]
+    data = b"".join(
+        [chunk async for chunk in archive.tar_archive(fetch(names, S3Mock()))]
+    )
+    assert len(data) % tarfile.RECORDSIZE == 0
+    with tarfile.open(fileobj=io.BytesIO(data)) as tf:
+        members = tf.getmembers()
+        assert [m.name for m in members] == names
+        for member in members:
+            assert member.mtime == LAST_MODIFIED.timestamp()
+            fh = tf.extractfile(member)
+            assert fh is not None
+            assert fh.read() == content(f"a/{member.name}")
+
+
+async def read_archive(res: objects.ArchiveStreamingResponse) -> bytes:
+    chunks: List[bytes] = []
+    async for chunk in res.body_iterator:
+        assert isinstance(chunk, bytes)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+@pytest.mark.anyio
+async def test_download_archive(s3_client: S3GWClient) -> None:
+    bucket = str(uuid.uuid4())
+    keys = ["a/b/c.txt", "a/b/d/e.txt", "a/b/d/", "a/f.txt", "g.txt"]
+    async with s3_client.conn() as s3:
+        await s3.create_bucket(Bucket=bucket)
+        for key in keys:
+            await s3.put_object(Bucket=bucket, Key=key, Body=content(key))
+
+    res = await objects.download_archive(
+        s3_client, bucket, DownloadArchiveRequest(Prefix="a/b/")
+    )
+    assert res.media_type == "application/zip"
+    assert res.headers["content-disposition"] == "attachment; filename=b.zip"
+    with zipfile.ZipFile(io.BytesIO(await read_archive(res))) as zf:
+        assert zf.namelist() == ["b/c.txt", "b/d/e.txt"]
+        assert zf.read("b/d/e.txt") == content("a/b/d/e.txt")
+
+    res = await objects.download_archive(
+        s3_client,
+        bucket,
+        DownloadArchiveRequest(
+            Keys=[
+                ObjectIdentifier(Key="a/f.txt"),
+                ObjectIdentifier(Key="a/b/"),
+            ],
+            Format="tar",
+        ),
+    )
+    assert res.media_type == "application/x-tar"
+    assert res.headers["content-disposition"] == "attachment; filename=a.tar"
+    with tarfile.open(fileobj=io.BytesIO(await read_archive(res))) as tf:
+        assert tf.getnames() == ["f.txt", "b/c.txt", "b/d/e.txt"]
+
+    for params in [
+        DownloadArchiveRequest(),
+        DownloadArchiveRequest(Prefix="", Keys=[ObjectIdentifier(Key="g")]),
+    ]:
+        with pytest.raises(HTTPException) as e:
+            await objects.download_archive(s3_client, bucket, params)
+        assert e.value.status_code == 422
+
+    # Do not leave the bucket behind for the tests that list buckets.
+    async with s3_client.conn() as s3:
+        await s3.delete_objects(
+            Bucket=bucket, Delete={"Objects": [{"Key": key} for key in keys]}
+        )
+        await s3.delete_bucket(Bucket=bucket)
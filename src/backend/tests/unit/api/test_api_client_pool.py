@@ -0,0 +1,143 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+from typing import Any, AsyncGenerator, List
+
+import pytest
+from aiobotocore.session import AioSession
+from fastapi import HTTPException, status
+
+from backend.api import S3GWClient, buckets
+from backend.api.client_pool import S3ClientPool
+from backend.tests.unit.helpers import ConfigMock
+
+
+class ClientFactoryMock:
+    def __init__(self) -> None:
+        self.created: List[str] = []
+        self.closed: List[str] = []
+
+    def __call__(self, name: str) -> Any:
+        @contextlib.asynccontextmanager
+        async def factory(_: AioSession) -> AsyncGenerator[Any, None]:
+            self.created.append(name)
+            yield name
+            self.closed.append(name)
+
+        return factory
+
+
+@pytest.mark.anyio
+async def test_pool_reuse() -> None:
+    pool = S3ClientPool()
+    factory = ClientFactoryMock()
+    async with pool.lease("a", factory("a")) as c1:
+        async with pool.lease("a", factory("a")) as c2:
+            assert c1 == c2
+    async with pool.lease("a", factory("a")):
+        pass
+    assert factory.created == ["a"]
+    assert factory.closed == []
+    assert len(pool) == 1
+    await pool.close()
+    assert factory.closed == ["a"]
+    assert len(pool) == 0
+
+
+@pytest.mark.anyio
+async def test_pool_lru_eviction() -> None:
+    pool = S3ClientPool(max_size=2)
+    factory = ClientFactoryMock()
+    async with pool.lease("a", factory("a")):
+        pass
+    async with pool.lease("b", factory("b")):
+        pass
+    async with pool.lease("a", factory("a")):
+        pass
+    async with pool.lease("c", factory("c")):
+        pass
+    assert factory.created == ["a", "b", "c"]
+    assert factory.closed == ["b"]
+    assert len(pool) == 2
+    await pool.close()
+
+
+@pytest.mark.anyio
+async def test_pool_no_eviction_while_leased() -> None:
+    pool = S3ClientPool(max_size=1)
+    factory = ClientFactoryMock()
+    async with pool.lease("a", factory("a")):
+        async with pool.lease("b", factory("b")):
+            pass
+        assert factory.closed == ["b"]
+        assert len(pool) == 1
+    assert factory.closed == ["b"]
+    await pool.close()
+
+
+@pytest.mark.anyio
+async def test_pool_idle_ttl() -> None:
+    pool = S3ClientPool(idle_ttl=-1)
+    factory = ClientFactoryMock()
+    async with pool.lease("a", factory("a")):
+        pass
+    async with pool.lease("a", factory("a")):
+        pass
+    assert factory.created == ["a", "a"]
+    assert factory.closed == ["a", "a"]
+    assert len(pool) == 0
+
+
+@pytest.mark.anyio
+async def test_pool_session() -> None:
+    pool = S3ClientPool()
+    assert pool.session is pool.session
+
+
+@pytest.mark.anyio
+async def test_s3gw_client_pool(s3_server: str) -> None:
+    pool = S3ClientPool()
+    client = S3GWClient(ConfigMock(s3_server), "foo", "bar", pool)
+    async with client.conn() as s3_1:
+        await s3_1.create_bucket(Bucket="foo")
+    async with client.conn() as s3_2:
+        assert s3_1 is s3_2
+    await buckets.get_bucket_attributes(client, "foo")
+    assert len(pool) == 1
+    async with client.conn() as s3:
+        await s3.delete_bucket(Bucket="foo")
+    await pool.close()
+
+
+@pytest.mark.anyio
+async def test_s3gw_client_pool_credentials(s3_server: str) -> None:
+    pool = S3ClientPool()
+    client1 = S3GWClient(ConfigMock(s3_server), "foo", "bar", pool)
+    client2 = S3GWClient(ConfigMock(s3_server), "foo", "baz", pool)
+    async with client1.conn() as s3_1, client2.conn() as s3_2:
+        assert s3_1 is not s3_2
+    assert len(pool) == 2
+    await pool.close()
+
+
+@pytest.mark.anyio
+async def test_s3gw_client_pool_bad_endpoint() -> None:
+    pool = S3ClientPool()
+    client = S3GWClient(ConfigMock("http://foo.bar"), "asd", "qwe", pool)
+    with pytest.raises(HTTPException) as e:
+        async with client.conn() as s3:
+            await s3.list_buckets()
+    assert e.value.status_code == status.HTTP_502_BAD_GATEWAY
+    await pool.close()
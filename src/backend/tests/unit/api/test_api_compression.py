@@ -0,0 +1,166 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+import zlib
+from typing import AsyncIterator, Callable, List, Optional
+
+import anyio
+import brotli
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+from starlette.types import Message, Receive, Scope, Send
+
+from backend.api.compression import (
+    CompressionMiddleware,
+    disable_compression,
+    select_encoding,
+)
+
+BODY = b'{"Key": "foo/bar.txt", "Size": 123}\n' * 100
+
+
+def create_app(level: int = 6) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, level=level, minimum_size=500)
+
+    @app.get("/large")
+    async def large() -> Response:  # pyright: ignore [reportUnusedFunction]
+        return Response(BODY, media_type="application/json")
+
+    @app.get("/small")
+    async def small() -> Response:  # pyright: ignore [reportUnusedFunction]
+        return PlainTextResponse("foo")
+
+    @app.get("/encoded")
+    async def encoded() -> Response:  # pyright: ignore [reportUnusedFunction]
+        return Response(
+            gzip.compress(BODY), headers={"Content-Encoding": "gzip"}
+        )
+
+    @app.get("/disabled")
+    async def disabled(  # pyright: ignore [reportUnusedFunction]
+        request: Request,
+    ) -> Response:
+        disable_compression(request.scope)
+        return Response(BODY)
+
+    return app
+
+
+@pytest.mark.parametrize(
+    "accept_encoding,expected",
+    [
+        ("", None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("gzip, deflate, br", "br"),
+        ("BR;q=0.5, gzip", "gzip"),
+        ("br;q=0, gzip;q=0", None),
+        ("*", "br"),
+        ("*;q=0.1, gzip", "gzip"),
+        ("br;q=foo, gzip", "gzip"),
+    ],
+)
+def test_select_encoding(accept_encoding: str, expected: Optional[str]) -> None:
+    assert select_encoding(accept_encoding) == expected
+
+
+@pytest.mark.parametrize(
+    "encoding,decompress",
+    [("gzip", gzip.decompress), ("br", brotli.decompress)],
+)
+def test_compression(
+    encoding: str, decompress: Callable[[bytes], bytes]
+) -> None:
+    client = TestClient(create_app())
+    with client.stream(
+        "GET", "/large", headers={"Accept-Encoding": encoding}
+    ) as resp:
+        raw = b"".join(resp.iter_raw())
+    assert resp.headers["content-encoding"] == encoding
+    assert resp.headers["content-length"] == str(len(raw))
+    assert resp.headers["vary"] == "Accept-Encoding"
+    assert len(raw) < len(BODY)
+    assert decompress(raw) == BODY
+
+
+def test_compression_skipped() -> None:
+    client = TestClient(create_app())
+    headers = {"Accept-Encoding": "gzip, br"}
+    resp = client.get("/small", headers=headers)
+    assert "content-encoding" not in resp.headers
+    assert resp.headers["vary"] == "Accept-Encoding"
+    assert resp.text == "foo"
+    resp = client.get("/encoded", headers=headers)
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.content == BODY
+    resp = client.get("/disabled", headers=headers)
+    assert "content-encoding" not in resp.headers
+    assert "vary" not in resp.headers
+    assert resp.content == BODY
+    resp = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in resp.headers
+    assert resp.content == BODY
+    client = TestClient(create_app(level=0))
+    resp = client.get("/large", headers=headers)
+    assert "content-encoding" not in resp.headers
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+async def test_compression_streaming(encoding: str) -> None:
+    async def generate() -> AsyncIterator[bytes]:
+        for i in range(3):
+            yield f'{{"Key": "{i}"}}\n'.encode()
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        await StreamingResponse(generate())(scope, receive, send)
+
+    async def receive() -> Message:
+        # The client does not disconnect.
+        await anyio.sleep_forever()
+        return {"type": "http.disconnect"}
+
+    messages: List[Message] = []
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    scope: Scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"accept-encoding", encoding.encode())],
+    }
+    await CompressionMiddleware(app, minimum_size=500)(scope, receive, send)
+
+    headers = dict(messages[0]["headers"])
+    assert headers[b"content-encoding"] == encoding.encode()
+    assert b"content-length" not in headers
+    # Every chunk can be decoded as soon as it has been received.
+    if encoding == "gzip":
+        decoder = zlib.decompressobj(16 + 15)
+        decode: Callable[[bytes], bytes] = decoder.decompress
+    else:
+        decode = brotli.Decompressor().process
+    chunks = [decode(m["body"]) for m in messages[1:]]
+    assert chunks[:3] == [
+        b'{"Key": "0"}\n',
+        b'{"Key": "1"}\n',
+        b'{"Key": "2"}\n',
+    ]
+    assert b"".join(chunks[3:]) == b""
@@ -0,0 +1,115 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import uuid
+
+import pytest
+from pytest_mock import MockerFixture
+
+from backend.api import S3GWClient, copying
+from backend.api.copying import CopyOptions
+
+MIB = 1024 * 1024
+
+
+def test_part_ranges() -> None:
+    assert copying.part_ranges(0, 10) == []
+    assert copying.part_ranges(10, 10) == [(0, 9)]
+    assert copying.part_ranges(25, 10) == [(0, 9), (10, 19), (20, 24)]
+    # The number of parts is limited.
+    ranges = copying.part_ranges(copying.MAX_PARTS * 10, 5)
+    assert len(ranges) == copying.MAX_PARTS
+    assert ranges[-1] == (
+        copying.MAX_PARTS * 10 - 10,
+        copying.MAX_PARTS * 10 - 1,
+    )
+    assert (
+        len(copying.part_ranges(copying.MAX_PARTS * 10 + 1, 5))
+        < copying.MAX_PARTS
+    )
+
+
+@pytest.mark.anyio
+async def test_copy_object(
+    s3_client: S3GWClient, mocker: MockerFixture
+) -> None:
+    bucket: str = str(uuid.uuid4())
+    body = bytes(range(256)) * (12 * MIB // 256) + b"end"
+    async with s3_client.conn() as s3:
+        await s3.create_bucket(Bucket=bucket)
+        await s3.put_object(
+            Bucket=bucket,
+            Key="src",
+            Body=body,
+            ContentType="text/plain",
+            Metadata={"foo": "bar"},
+            Tagging="a=1&b=2",
+        )
+        upload_part_copy = mocker.spy(s3, "upload_part_copy")
+        copy_object = mocker.spy(s3, "copy_object")
+
+        # Small objects are copied by a single request.
+        options = CopyOptions(
+            multipart_threshold=len(body), part_size=5 * MIB, max_workers=2
+        )
+        await copying.copy_object(
+            s3, bucket, "dst1", {"Bucket": bucket, "Key": "src"}, None, options
+        )
+        assert copy_object.call_count == 1
+        assert upload_part_copy.call_count == 0
+
+        # Large objects are copied part by part.
+        options.multipart_threshold = 5 * MIB
+        await copying.copy_object(
+            s3, bucket, "dst2", {"Bucket": bucket, "Key": "src"}, None, options
+        )
+        assert copy_object.call_count == 1
+        assert upload_part_copy.call_count == 3
+
+        for key in ["dst1", "dst2"]:
+            res = await s3.get_object(Bucket=bucket, Key=key)
+            assert await res["Body"].read() == body
+            assert res["ContentType"] == "text/plain"
+            assert res["Metadata"] == {"foo": "bar"}
+            tagging = await s3.get_object_tagging(Bucket=bucket, Key=key)
+            assert sorted(
+                (tag["Key"], tag["Value"]) for tag in tagging["TagSet"]
+            ) == [("a", "1"), ("b", "2")]
+
+
+@pytest.mark.anyio
+async def test_copy_object_failure(
+    s3_client: S3GWClient, mocker: MockerFixture
+) -> None:
+    bucket: str = str(uuid.uuid4())
+    async with s3_client.conn() as s3:
+        await s3.create_bucket(Bucket=bucket)
+        await s3.put_object(Bucket=bucket, Key="src", Body=b"x" * 11 * MIB)
+        mocker.patch.object(
+            s3, "upload_part_copy", side_effect=RuntimeError("Failed")
+        )
+        abort = mocker.spy(s3, "abort_multipart_upload")
+        with pytest.raises(RuntimeError):
+            await copying.copy_object(
+                s3,
+                bucket,
+                "dst",
+                {"Bucket": bucket, "Key": "src"},
+                11 * MIB,
+                CopyOptions(multipart_threshold=5 * MIB, part_size=5 * MIB),
+            )
+        # The upload has been aborted.
+        assert abort.call_count == 1
+        res = await s3.list_multipart_uploads(Bucket=bucket)
+        assert res.get("Uploads", []) == []
@@ -0,0 +1,239 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, cast
+
+import pytest
+from fastapi import HTTPException, status
+from pytest_mock import MockerFixture
+from types_aiobotocore_s3.client import S3Client
+from types_aiobotocore_s3.type_defs import (
+    ListObjectVersionsOutputTypeDef,
+    ObjectIdentifierTypeDef,
+)
+
+from backend.api import S3GWClient, deletion, objects
+from backend.api.types import DeleteResult
+from backend.tests.unit.helpers import S3ApiMock, async_return, body_request
+
+PAGE: Dict[str, Any] = {
+    "Versions": [
+        {"Key": "a", "VersionId": "2", "IsLatest": True},
+        {"Key": "a", "VersionId": "1", "IsLatest": False},
+        {"Key": "b", "VersionId": "1", "IsLatest": False},
+        {"Key": "c", "VersionId": None, "IsLatest": True},
+    ],
+    "DeleteMarkers": [{"Key": "b", "VersionId": "2", "IsLatest": True}],
+}
+
+
+class S3Mock:
+    """
+    Answers `delete_objects` requests and tracks the number of
+    concurrent requests.
+    """
+
+    def __init__(self, fail: str = "") -> None:
+        self.fail = fail
+        self.requests: List[List[ObjectIdentifierTypeDef]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.cancelled = 0
+
+    async def delete_objects(
+        self, Bucket: str, Delete: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        objects: List[ObjectIdentifierTypeDef] = Delete["Objects"]
+        self.requests.append(objects)
+        if any(obj["Key"] == self.fail for obj in objects):
+            raise RuntimeError("Failed")
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Later batches finish first.
+            await asyncio.sleep(0.01 / len(self.requests))
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        return {
+            "Deleted": [obj for obj in objects if obj["Key"] != "denied"],
+            "Errors": [
+                {"Key": obj["Key"], "Code": "AccessDenied"}
+                for obj in objects
+                if obj["Key"] == "denied"
+            ],
+        }
+
+
+async def to_batches(
+    keys: List[str], size: int
+) -> AsyncIterator[List[ObjectIdentifierTypeDef]]:
+    for i in range(0, len(keys), size):
+        yield [{"Key": key, "VersionId": ""} for key in keys[i : i + size]]
+
+
+def test_select_versions() -> None:
+    page = cast(ListObjectVersionsOutputTypeDef, PAGE)
+    assert list(deletion.select_versions(page, False)) == [
+        {"Key": "a", "VersionId": ""},
+        {"Key": "c", "VersionId": ""},
+    ]
+    assert list(deletion.select_versions(page, True)) == [
+        {"Key": "a", "VersionId": "2"},
+        {"Key": "a", "VersionId": "1"},
+        {"Key": "b", "VersionId": "1"},
+        {"Key": "c", "VersionId": ""},
+        {"Key": "b", "VersionId": "2"},
+    ]
+
+
+@pytest.mark.anyio
+async def test_batch_versions() -> None:
+    listed: List[int] = []
+
+    async def pages() -> AsyncIterator[ListObjectVersionsOutputTypeDef]:
+        for i in range(3):
+            listed.append(i)
+            yield cast(ListObjectVersionsOutputTypeDef, PAGE)
+
+    batches = [
+        batch async for batch in deletion.batch_versions(pages(), True, size=4)
+    ]
+    assert [len(batch) for batch in batches] == [4, 4, 4, 3]
+    batches = [batch async for batch in deletion.batch_versions(pages(), False)]
+    assert [len(batch) for batch in batches] == [6]
+
+    # A batch is not deleted before the next page has arrived.
+    listed.clear()
+    batches.clear()
+    async for batch in deletion.batch_versions(pages(), True, size=5):
+        assert len(listed) == min(len(batches) + 2, 3)
+        batches.append(batch)
+    assert len(batches) == 3
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("max_workers", [0, 1, 3])
+async def test_delete_batches(max_workers: int) -> None:
+    s3 = S3Mock()
+    keys = [f"{i:03d}" for i in range(20)] + ["denied"]
+    results: List[DeleteResult] = [
+        result
+        async for result in deletion.delete_batches(
+            cast(S3Client, s3), "bucket", to_batches(keys, 4), max_workers
+        )
+    ]
+    assert s3.max_in_flight == max(max_workers, 1)
+    assert len(s3.requests) == 6
+    assert sorted(result.Batch for result in results) == list(range(6))
+    deleted = [obj.Key for result in results for obj in result.Deleted]
+    assert sorted(deleted) == keys[:-1]
+    errors = [error for result in results for error in result.Errors]
+    assert [(error.Key, error.Code) for error in errors] == [
+        ("denied", "AccessDenied")
+    ]
+    assert [r.Batch for r in results if r.Errors] == [5]
+
+
+@pytest.mark.anyio
+async def test_delete_batches_failure() -> None:
+    s3 = S3Mock(fail="004")
+    keys = [f"{i:03d}" for i in range(20)]
+    with pytest.raises(RuntimeError):
+        async for _ in deletion.delete_batches(
+            cast(S3Client, s3), "bucket", to_batches(keys, 4), 3
+        ):
+            pass
+    # The pending requests have been cancelled.
+    assert s3.in_flight == 0
+    assert s3.cancelled > 0
+
+
+async def to_chunks(data: bytes, size: int) -> AsyncIterator[bytes]:
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "data",
+    [
+        b'[{"Key": "a"}, {"Key": "\xc3\xa4", "VersionId": "1"}, 12345]',
+        b'{"Key": "a"}\n{"Key": "\xc3\xa4", "VersionId": "1"}\n12345\n',
+        b' [ {"Key": "a"} ,\n{"Key": "\xc3\xa4", "VersionId": "1"},12345 ] ',
+    ],
+)
+async def test_parse_json_values(data: bytes) -> None:
+    expected = [{"Key": "a"}, {"Key": "ä", "VersionId": "1"}, 12345]
+    # The values are split across chunks, even within UTF-8 characters.
+    for size in [1, 2, 7, len(data)]:
+        values = [
+            value
+            async for value in deletion.parse_json_values(to_chunks(data, size))
+        ]
+        assert values == expected
+    assert [
+        v async for v in deletion.parse_json_values(to_chunks(b"", 1))
+    ] == []
+    assert [
+        v async for v in deletion.parse_json_values(to_chunks(b"[]", 1))
+    ] == []
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "data",
+    [
+        b'[{"Key": "a"}',
+        b'[{"Key": "a"}] {}',
+        b'{"Key": "a"',
+        b"[{]",
+        b"[1 2]",
+        b"[,,1]",
+        b"[1,,2]",
+        b"[1,]",
+        b"[1,",
+    ],
+)
+async def test_parse_json_values_invalid(data: bytes) -> None:
+    with pytest.raises(ValueError):
+        async for _ in deletion.parse_json_values(to_chunks(data, 3)):
+            pass
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "data",
+    [
+        b'[, {"Key": "a"}]',
+        b'[{"Key": "a"},, {"Key": "b"}]',
+        b'[{"Key": "a"},]',
+        b'[{"Key": "a"} {"Key": "b"}]',
+    ],
+)
+async def test_delete_objects_bulk_invalid_separators(
+    s3_client: S3GWClient, mocker: MockerFixture, data: bytes
+) -> None:
+    s3api_mock = S3ApiMock(s3_client, mocker)
+    s3api_mock.patch("delete_objects", return_value=async_return({}))
+    with pytest.raises(HTTPException) as e:
+        await objects.delete_objects_bulk(
+            s3_client, "bucket", body_request(data)
+        )
+    assert e.value.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    # Nothing is salvaged from a malformed body.
+    s3api_mock.mocked_fn["delete_objects"].assert_not_called()
@@ -0,0 +1,155 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+from typing import AsyncGenerator, List
+
+import anyio
+import pytest
+from fastapi import FastAPI, Request
+from starlette.types import Message, Scope
+
+from backend.api.disconnect import DisconnectMiddleware
+from backend.api.metrics import Metrics
+from backend.api.responses import ClosingStreamingResponse
+
+
+class State:
+    def __init__(self) -> None:
+        self.started = anyio.Event()
+        self.cancelled = False
+        self.closed = False
+
+
+def create_app(metrics: Metrics, state: State) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(DisconnectMiddleware, metrics=metrics)
+
+    @app.get("/slow")
+    async def slow() -> None:  # pyright: ignore [reportUnusedFunction]
+        state.started.set()
+        try:
+            await anyio.sleep_forever()
+        except BaseException:
+            state.cancelled = True
+            raise
+
+    @app.get("/stream")
+    async def stream() -> (  # pyright: ignore [reportUnusedFunction]
+        ClosingStreamingResponse
+    ):
+        async def generate() -> AsyncGenerator[bytes, None]:
+            try:
+                yield b"foo"
+                state.started.set()
+                await anyio.sleep_forever()
+                yield b"bar"
+            finally:
+                state.closed = True
+
+        return ClosingStreamingResponse(generate())
+
+    @app.post("/echo")
+    async def echo(  # pyright: ignore [reportUnusedFunction]
+        request: Request,
+    ) -> ClosingStreamingResponse:
+        body = await request.body()
+        return ClosingStreamingResponse(iter([body]))
+
+    return app
+
+
+async def disconnect(path: str, metrics: Metrics, state: State) -> float:
+    async def receive() -> Message:
+        if not state.started.is_set():
+            await state.started.wait()
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.disconnect"}
+
+    messages: List[Message] = []
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    scope: Scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "headers": [],
+        "query_string": b"",
+    }
+    start = time.monotonic()
+    with anyio.fail_after(5):
+        await create_app(metrics, state)(scope, receive, send)
+    return time.monotonic() - start
+
+
+@pytest.mark.anyio
+async def test_disconnect_cancels_request() -> None:
+    metrics = Metrics()
+    state = State()
+    elapsed = await disconnect("/slow", metrics, state)
+    assert elapsed < 1
+    assert state.cancelled
+    assert metrics.cancelled_requests == {"slow": 1}
+
+
+@pytest.mark.anyio
+async def test_disconnect_closes_stream() -> None:
+    metrics = Metrics()
+    state = State()
+    await disconnect("/stream", metrics, state)
+    # The generator is closed right away, not once it is collected.
+    assert state.closed
+    assert metrics.cancelled_requests == {"stream": 1}
+
+
+@pytest.mark.anyio
+async def test_disconnect_after_response() -> None:
+    metrics = Metrics()
+    chunks = [b"foo", b"bar", b"baz"]
+    complete = anyio.Event()
+
+    async def receive() -> Message:
+        if chunks:
+            body = chunks.pop(0)
+            return {
+                "type": "http.request",
+                "body": body,
+                "more_body": bool(chunks),
+            }
+        # Like a server, wait until the response is complete.
+        await complete.wait()
+        return {"type": "http.disconnect"}
+
+    messages: List[Message] = []
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+        if not message.get("more_body", True):
+            complete.set()
+
+    scope: Scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/echo",
+        "headers": [],
+        "query_string": b"",
+    }
+    with anyio.fail_after(5):
+        await create_app(metrics, State())(scope, receive, send)
+    assert b"".join(m.get("body", b"") for m in messages[1:]) == b"foobarbaz"
+    # The client disconnects once the response is complete, which does
+    # not cancel anything.
+    assert metrics.cancelled_requests == {}
@@ -0,0 +1,248 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import uuid
+from typing import Any, AsyncGenerator, Dict, List, Optional, cast
+
+import anyio
+import pytest
+from aiobotocore.response import StreamingBody
+from starlette.types import Message, Scope
+from types_aiobotocore_s3.client import S3Client
+from types_aiobotocore_s3.type_defs import GetObjectOutputTypeDef
+
+from backend.api import S3GWClient, download, objects
+from backend.api.download import DownloadOptions
+from backend.api.types import ObjectRequest
+from backend.tests.unit.helpers import ConfigMock
+
+BODY = bytes(range(256)) * 40
+
+
+class Body:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.closed = False
+
+    async def read(self, amt: Optional[int] = None) -> bytes:
+        # Return less than requested, like a network stream.
+        amt = len(self.data) if amt is None else min(amt, 100)
+        data, self.data = self.data[:amt], self.data[amt:]
+        return data
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class S3Mock:
+    """
+    Answers ranged `get_object` requests, the later ones first, and
+    tracks the number of concurrent requests.
+    """
+
+    def __init__(self) -> None:
+        self.ranges: List[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_object(self, **kwargs: Any) -> Dict[str, Any]:
+        self.ranges.append(kwargs["Range"])
+        assert kwargs["IfMatch"] == '"etag"'
+        start, end = map(int, kwargs["Range"][len("bytes=") :].split("-"))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01 / len(self.ranges))
+        finally:
+            self.in_flight -= 1
+        return {"Body": Body(BODY[start : end + 1])}
+
+
+def test_content_span() -> None:
+    res = cast(GetObjectOutputTypeDef, {"ContentLength": 10})
+    assert download.content_span(res) == (0, 9)
+    res = cast(
+        GetObjectOutputTypeDef,
+        {"ContentLength": 10, "ContentRange": "bytes 5-14/100"},
+    )
+    assert download.content_span(res) == (5, 14)
+
+
+def test_chunk_ranges() -> None:
+    assert list(download.chunk_ranges(0, -1, 10)) == []
+    assert list(download.chunk_ranges(5, 29, 10)) == [
+        (5, 14),
+        (15, 24),
+        (25, 29),
+    ]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("max_workers", [1, 3])
+async def test_parallel_body(max_workers: int) -> None:
+    s3 = S3Mock()
+    body = Body(BODY[10:])
+    s3_res = cast(
+        GetObjectOutputTypeDef,
+        {
+            "Body": body,
+            "ContentLength": len(BODY) - 10,
+            "ContentRange": f"bytes 10-{len(BODY) - 1}/{len(BODY)}",
+            "ETag": '"etag"',
+        },
+    )
+    options = DownloadOptions(chunk_size=1000, max_workers=max_workers)
+    data = b"".join(
+        [
+            chunk
+            async for chunk in download.parallel_body(
+                cast(S3Client, s3), "bucket", "key", s3_res, options
+            )
+        ]
+    )
+    # The chunks are returned in order, and the first one is read from
+    # the given body.
+    assert data == BODY[10:]
+    assert body.closed
+    assert s3.ranges[0] == "bytes=1010-2009"
+    assert s3.ranges[-1] == f"bytes=10010-{len(BODY) - 1}"
+    assert s3.max_in_flight == max_workers
+
+
+@pytest.mark.anyio
+async def test_parallel_body_cancel() -> None:
+    s3 = S3Mock()
+    s3_res = cast(
+        GetObjectOutputTypeDef,
+        {"Body": Body(BODY), "ContentLength": len(BODY), "ETag": '"etag"'},
+    )
+    options = DownloadOptions(chunk_size=1000, max_workers=4)
+    body = download.parallel_body(
+        cast(S3Client, s3), "bucket", "key", s3_res, options
+    )
+    assert await body.__anext__() == BODY[:100]
+    await asyncio.sleep(0)
+    assert s3.in_flight == 3
+    await body.aclose()
+    # The pending requests are cancelled.
+    await asyncio.sleep(0)
+    assert s3.in_flight == 0
+    assert len(s3.ranges) == 3
+
+
+@pytest.mark.anyio
+async def test_download_object_parallel(s3_client: S3GWClient) -> None:
+    bucket = str(uuid.uuid4())
+    body = bytes(range(256)) * 100
+    async with s3_client.conn() as s3:
+        await s3.create_bucket(Bucket=bucket)
+        await s3.put_object(Bucket=bucket, Key="a.bin", Body=body)
+    conn = S3GWClient(
+        ConfigMock(
+            s3_client.endpoint,
+            s3_download_parallel_threshold=1000,
+            s3_download_chunk_size=1000,
+            s3_download_workers=4,
+        ),
+        s3_client.access_key,
+        s3_client.secret_key,
+    )
+
+    async def receive() -> Message:
+        await anyio.sleep_forever()
+        return {"type": "http.disconnect"}
+
+    for range_, expected in [(None, body), ("bytes=500-", body[500:])]:
+        messages: List[Message] = []
+
+        async def send(message: Message) -> None:
+            messages.append(message)
+
+        res = await objects.download_object(
+            conn, bucket, ObjectRequest(Key="a.bin"), range_=range_
+        )
+        scope: Scope = {"type": "http", "method": "POST", "headers": []}
+        await res(scope, receive, send)
+        headers = dict(messages[0]["headers"])
+        assert headers[b"content-length"] == str(len(expected)).encode()
+        data = b"".join(m.get("body", b"") for m in messages[1:])
+        assert data == expected
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("chunk_size", [1, 100, 1000, 20000])
+async def test_read_chunks(chunk_size: int) -> None:
+    body = Body(BODY)
+    chunks = [
+        chunk
+        async for chunk in download.read_chunks(
+            cast(StreamingBody, body), chunk_size
+        )
+    ]
+    assert b"".join(chunks) == BODY
+    assert all(len(chunk) == chunk_size for chunk in chunks[:-1])
+    assert 0 < len(chunks[-1]) <= chunk_size
+    assert body.closed
+
+
+@pytest.mark.anyio
+async def test_read_ahead() -> None:
+    read: List[int] = []
+
+    async def chunks() -> AsyncGenerator[bytes, None]:
+        for i in range(5):
+            read.append(i)
+            yield bytes([i])
+
+    body = download.read_ahead(chunks())
+    assert await body.__anext__() == b"\x00"
+    await asyncio.sleep(0)
+    # Only the next chunk is read while the first one is being sent.
+    assert read == [0, 1]
+    assert [chunk async for chunk in body] == [bytes([i]) for i in range(1, 5)]
+    assert read == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.anyio
+async def test_download_object_buffered(s3_client: S3GWClient) -> None:
+    bucket = str(uuid.uuid4())
+    body = bytes(range(256)) * 100
+    async with s3_client.conn() as s3:
+        await s3.create_bucket(Bucket=bucket)
+        await s3.put_object(Bucket=bucket, Key="a.bin", Body=body)
+    conn = S3GWClient(
+        ConfigMock(s3_client.endpoint, s3_download_buffer_size=4096),
+        s3_client.access_key,
+        s3_client.secret_key,
+    )
+    messages: List[Message] = []
+
+    async def receive() -> Message:
+        await anyio.sleep_forever()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    res = await objects.download_object(
+        conn, bucket, ObjectRequest(Key="a.bin")
+    )
+    scope: Scope = {"type": "http", "method": "POST", "headers": []}
+    await res(scope, receive, send)
+    chunks = [m["body"] for m in messages[1:] if m.get("body")]
+    assert b"".join(chunks) == body
+    assert [len(chunk) for chunk in chunks] == [4096] * 6 + [1024]
+    assert res.stats.bytes == len(body)
+    assert res.stats.bytes_per_second > 0
@@ -0,0 +1,228 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import os
+import tempfile
+from datetime import timedelta
+from typing import List
+
+import pytest
+from fastapi import HTTPException, status
+
+from backend.api.job_manager import (
+    MAX_JOB_ERRORS,
+    JobManager,
+    JobProgress,
+    job_owner,
+)
+
+
+def test_job_owner() -> None:
+    assert job_owner("http://foo", "bar") == job_owner("http://foo", "bar")
+    assert job_owner("http://foo", "bar") != job_owner("http://foo", "baz")
+
+
+@pytest.mark.anyio
+async def test_submit() -> None:
+    manager = JobManager()
+    started = asyncio.Event()
+    proceed = asyncio.Event()
+
+    async def run(progress: JobProgress) -> None:
+        progress.add(done=2)
+        started.set()
+        await proceed.wait()
+        progress.add(done=1)
+
+    job = await manager.submit("foo", "test", "Test job", run)
+    assert job.Status == "PENDING"
+    assert (job.Type, job.Description) == ("test", "Test job")
+    await started.wait()
+    res = await manager.get("foo", job.Id)
+    assert res is not None
+    assert res.Status == "RUNNING"
+    assert res.Done == 2
+    assert res.StartedAt is not None
+    proceed.set()
+    await manager.wait(job.Id)
+    res = await manager.get("foo", job.Id)
+    assert res is not None
+    assert res.Status == "SUCCEEDED"
+    assert res.Done == 3
+    assert res.FinishedAt is not None
+    # The jobs are only visible to their owner.
+    assert await manager.get("bar", job.Id) is None
+    assert await manager.list("bar") == []
+    assert [j.Id for j in await manager.list("foo")] == [job.Id]
+
+
+@pytest.mark.anyio
+async def test_failure() -> None:
+    manager = JobManager()
+
+    async def fail(progress: JobProgress) -> None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Access denied"
+        )
+
+    async def fail_items(progress: JobProgress) -> None:
+        progress.add(done=1)
+        progress.add(
+            failed=MAX_JOB_ERRORS + 1,
+            errors=[f"{i} (AccessDenied)" for i in range(MAX_JOB_ERRORS + 1)],
+        )
+
+    job1 = await manager.submit("foo", "test", "", fail)
+    job2 = await manager.submit("foo", "test", "", fail_items)
+    await manager.wait(job1.Id)
+    await manager.wait(job2.Id)
+    res = await manager.get("foo", job1.Id)
+    assert res is not None
+    assert (res.Status, res.Error) == ("FAILED", "Access denied")
+    res = await manager.get("foo", job2.Id)
+    assert res is not None
+    assert res.Status == "FAILED"
+    assert (res.Done, res.Failed) == (1, MAX_JOB_ERRORS + 1)
+    assert len(res.Errors) == MAX_JOB_ERRORS
+    assert res.Errors[0] == "0 (AccessDenied)"
+
+
+@pytest.mark.anyio
+async def test_cancel() -> None:
+    manager = JobManager()
+    started = asyncio.Event()
+
+    async def run(progress: JobProgress) -> None:
+        started.set()
+        await asyncio.sleep(10)
+
+    job = await manager.submit("foo", "test", "", run)
+    await started.wait()
+    assert await manager.cancel("bar", job.Id) is None
+    res = await manager.cancel("foo", job.Id)
+    assert res is not None
+    assert res.Status == "CANCELLED"
+    # Finished jobs can not be cancelled anymore.
+    res = await manager.cancel("foo", job.Id)
+    assert res is not None
+    assert res.Status == "CANCELLED"
+
+
+@pytest.mark.anyio
+async def test_cancel_pending() -> None:
+    manager = JobManager(max_running=1)
+
+    async def run(progress: JobProgress) -> None:
+        await asyncio.sleep(10)
+
+    job1 = await manager.submit("foo", "test", "", run)
+    job2 = await manager.submit("foo", "test", "", run)
+    job3 = await manager.submit("foo", "test", "", run)
+    # The job is cancelled before it has been started.
+    res = await manager.cancel("foo", job3.Id)
+    assert res is not None
+    assert (res.Status, res.StartedAt) == ("CANCELLED", None)
+    await asyncio.sleep(0.01)
+    res = await manager.cancel("foo", job2.Id)
+    assert res is not None
+    assert (res.Status, res.StartedAt) == ("CANCELLED", None)
+    await manager.close()
+    res = await manager.get("foo", job1.Id)
+    assert res is not None
+    assert res.Status == "FAILED"
+
+
+@pytest.mark.anyio
+async def test_max_running() -> None:
+    manager = JobManager(max_running=2)
+    running: List[int] = []
+    max_running: List[int] = [0]
+    proceed = asyncio.Event()
+
+    async def run(progress: JobProgress) -> None:
+        running.append(1)
+        max_running[0] = max(max_running[0], len(running))
+        await proceed.wait()
+        running.pop()
+
+    jobs = [await manager.submit("foo", "test", "", run) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    states = [(await manager.get("foo", job.Id)) for job in jobs]
+    assert [job.Status for job in states if job is not None] == [
+        "RUNNING",
+        "RUNNING",
+        "PENDING",
+        "PENDING",
+        "PENDING",
+    ]
+    proceed.set()
+    for job in jobs:
+        await manager.wait(job.Id)
+    assert max_running[0] == 2
+
+
+@pytest.mark.anyio
+async def test_persistence() -> None:
+    started = asyncio.Event()
+
+    async def run(progress: JobProgress) -> None:
+        progress.add(done=1)
+        started.set()
+        await asyncio.sleep(10)
+
+    async def succeed(progress: JobProgress) -> None:
+        progress.add(done=5)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "jobs.db")
+        manager = JobManager(path=path)
+        job1 = await manager.submit("foo", "test", "", succeed)
+        await manager.wait(job1.Id)
+        job2 = await manager.submit("foo", "test", "", run)
+        await started.wait()
+
+        # The jobs are loaded by a new instance, e.g. after a restart.
+        restarted = JobManager(path=path)
+        res = await restarted.get("foo", job1.Id)
+        assert res is not None
+        assert (res.Status, res.Done) == ("SUCCEEDED", 5)
+        res = await restarted.get("foo", job2.Id)
+        assert res is not None
+        assert res.Status == "FAILED"
+        assert res.Error == "Interrupted by a restart of the backend."
+        await restarted.close()
+
+        # Running jobs are interrupted on shutdown.
+        await manager.close()
+        res = await manager.get("foo", job2.Id)
+        assert res is not None
+        assert res.Status == "FAILED"
+        assert res.Error == "Interrupted by a shutdown of the backend."
+
+
+@pytest.mark.anyio
+async def test_ttl() -> None:
+    async def succeed(progress: JobProgress) -> None:
+        pass
+
+    manager = JobManager(ttl=60)
+    job = await manager.submit("foo", "test", "", succeed)
+    await manager.wait(job.Id)
+    assert await manager.get("foo", job.Id) is not None
+    # Let the job finish earlier.
+    owner, state = manager._jobs[job.Id]  # pyright: ignore
+    assert owner == "foo" and state.FinishedAt is not None
+    state.FinishedAt -= timedelta(seconds=61)
+    assert await manager.get("foo", job.Id) is None
@@ -0,0 +1,46 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException, status
+
+from backend.api import S3GWClient, jobs
+from backend.api.job_manager import JobManager, JobProgress
+from backend.tests.unit.helpers import ConfigMock
+
+
+@pytest.mark.anyio
+async def test_jobs() -> None:
+    conn = S3GWClient(ConfigMock("http://foo.bar"), "asd", "qwe")
+    other = S3GWClient(ConfigMock("http://foo.bar"), "foo", "bar")
+    manager = JobManager()
+
+    async def run(progress: JobProgress) -> None:
+        await asyncio.sleep(10)
+
+    job = await manager.submit(conn.job_owner, "test", "", run)
+    assert [j.Id for j in await jobs.list_jobs(conn, manager)] == [job.Id]
+    assert await jobs.list_jobs(other, manager) == []
+    res = await jobs.get_job(conn, manager, job.Id)
+    assert res.Id == job.Id
+    with pytest.raises(HTTPException) as e:
+        await jobs.get_job(other, manager, job.Id)
+    assert e.value.status_code == status.HTTP_404_NOT_FOUND
+    with pytest.raises(HTTPException) as e:
+        await jobs.cancel_job(other, manager, job.Id)
+    assert e.value.status_code == status.HTTP_404_NOT_FOUND
+    res = await jobs.cancel_job(conn, manager, job.Id)
+    assert res.Status == "CANCELLED"
@@ -0,0 +1,194 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import uuid
+from pathlib import Path
+from typing import AsyncGenerator, List, Optional
+
+import pytest
+from fastapi import UploadFile
+
+from backend.api import S3GWClient, objects
+from backend.api.key_index import KeyIndex, index_scope
+from backend.api.types import (
+    DeleteObjectByPrefixRequest,
+    DeleteObjectRequest,
+    ListObjectsRequest,
+    Object,
+)
+
+SCOPE = index_scope("http://foo.bar", "foo", "bucket")
+
+
+@pytest.fixture
+async def key_index(tmp_path: Path) -> AsyncGenerator[KeyIndex, None]:
+    index = KeyIndex(str(tmp_path / "index.db"))
+    yield index
+    index.close()
+
+
+def keys(entries: Optional[List[Object]]) -> List[str]:
+    assert entries is not None
+    return [f"{obj.Key}:{obj.Type}" for obj in entries]
+
+
+@pytest.mark.anyio
+async def test_key_index_folder(key_index: KeyIndex) -> None:
+    assert await key_index.get_folder(SCOPE, "/", "a/") is None
+    await key_index.put_folder(
+        SCOPE,
+        "/",
+        "a/",
+        [
+            Object(Key="a/c.txt", Name="c.txt", Size=3, ETag='"foo"'),
+            Object(Key="a/b", Name="b", Type="FOLDER"),
+            Object(Key="a/b.txt", Name="b.txt", Size=2),
+        ],
+    )
+    res = await key_index.get_folder(SCOPE, "/", "a/")
+    assert keys(res) == ["a/b:FOLDER", "a/b.txt:OBJECT", "a/c.txt:OBJECT"]
+    assert res is not None and res[2].Size == 3 and res[2].ETag == '"foo"'
+    # The folder is indexed per delimiter and per scope.
+    assert await key_index.get_folder(SCOPE, "-", "a/") is None
+    other = index_scope("http://foo.bar", "bar", "bucket")
+    assert await key_index.get_folder(other, "/", "a/") is None
+
+    # The folder is replaced by a new listing.
+    await key_index.put_folder(
+        SCOPE, "/", "a/", [Object(Key="a/d", Name="d", Type="FOLDER")]
+    )
+    assert keys(await key_index.get_folder(SCOPE, "/", "a/")) == ["a/d:FOLDER"]
+
+
+@pytest.mark.anyio
+async def test_key_index_max_age(tmp_path: Path) -> None:
+    key_index = KeyIndex(str(tmp_path / "index.db"), max_age=-1)
+    await key_index.put_folder(SCOPE, "/", "", [])
+    assert await key_index.get_folder(SCOPE, "/", "") is None
+    key_index.close()
+
+
+@pytest.mark.anyio
+async def test_key_index_persistent(tmp_path: Path) -> None:
+    key_index = KeyIndex(str(tmp_path / "index.db"))
+    await key_index.put_folder(SCOPE, "/", "", [Object(Key="a", Name="a")])
+    key_index.close()
+    key_index = KeyIndex(str(tmp_path / "index.db"))
+    assert keys(await key_index.get_folder(SCOPE, "/", "")) == ["a:OBJECT"]
+    key_index.close()
+
+
+@pytest.mark.anyio
+async def test_key_index_put_object(key_index: KeyIndex) -> None:
+    await key_index.put_folder(SCOPE, "/", "", [])
+    await key_index.put_folder(
+        SCOPE, "/", "a/b/", [Object(Key="a/b/x", Name="x", Size=1)]
+    )
+    await key_index.put_object(SCOPE, "a/b/c/d.txt", size=5)
+    await key_index.put_object(SCOPE, "a/b/x", size=2, etag='"bar"')
+    await key_index.put_object(SCOPE, "e.txt")
+
+    assert keys(await key_index.get_folder(SCOPE, "/", "")) == [
+        "a:FOLDER",
+        "e.txt:OBJECT",
+    ]
+    res = await key_index.get_folder(SCOPE, "/", "a/b/")
+    assert keys(res) == ["a/b/c:FOLDER", "a/b/x:OBJECT"]
+    assert res is not None and res[1].Size == 2 and res[1].ETag == '"bar"'
+    # Folders that are not indexed are not created.
+    assert await key_index.get_folder(SCOPE, "/", "a/") is None
+    assert await key_index.get_folder(SCOPE, "/", "a/b/c/") is None
+
+
+@pytest.mark.anyio
+async def test_key_index_invalidate(key_index: KeyIndex) -> None:
+    for prefix in ["", "a/", "a/b/", "a/b/c/", "a/bc/", "d/"]:
+        await key_index.put_folder(SCOPE, "/", prefix, [])
+    await key_index.invalidate(SCOPE, "a/b/")
+    for prefix in ["", "a/", "a/b/", "a/b/c/"]:
+        assert await key_index.get_folder(SCOPE, "/", prefix) is None
+    for prefix in ["a/bc/", "d/"]:
+        assert await key_index.get_folder(SCOPE, "/", prefix) == []
+
+
+@pytest.mark.anyio
+async def test_key_index_invalidate_keys(key_index: KeyIndex) -> None:
+    prefixes = ["", "a/", "a/b/", "a/b/c/", "a/bc/", "d/", "d/e/", "f/"]
+    for delimiter in ["/", ""]:
+        for prefix in prefixes:
+            await key_index.put_folder(
+                SCOPE,
+                delimiter,
+                prefix,
+                [Object(Key=f"{prefix}x", Name="x")],
+            )
+    await key_index.put_folder("other", "/", "a/b/", [])
+    await key_index.invalidate_keys(SCOPE, ["a/b/c/x", "d/"])
+    for delimiter in ["/", ""]:
+        for prefix in ["", "a/", "a/b/", "a/b/c/", "d/", "d/e/"]:
+            assert await key_index.get_folder(SCOPE, delimiter, prefix) is None
+        for prefix in ["a/bc/", "f/"]:
+            res = await key_index.get_folder(SCOPE, delimiter, prefix)
+            assert keys(res) == [f"{prefix}x:OBJECT"]
+    # Other scopes are kept.
+    assert await key_index.get_folder("other", "/", "a/b/") == []
+
+
+@pytest.mark.anyio
+async def test_list_objects_key_index(
+    s3_client: S3GWClient, key_index: KeyIndex
+) -> None:
+    conn = S3GWClient(
+        s3_client._config,  # pyright: ignore [reportPrivateUsage]
+        s3_client.access_key,
+        s3_client.secret_key,
+        key_index=key_index,
+    )
+    bucket = str(uuid.uuid4())
+    async with conn.conn() as s3:
+        await s3.create_bucket(Bucket=bucket)
+        await s3.put_object(Bucket=bucket, Key="a/b.txt", Body=b"foo")
+
+    async def list_keys(prefix: str) -> List[str]:
+        res = await objects.list_objects(
+            conn, bucket, ListObjectsRequest(Prefix=prefix)
+        )
+        return sorted(obj.Key for obj in res)
+
+    assert await list_keys("") == ["a"]
+    assert await list_keys("a/") == ["a/b.txt"]
+
+    # Objects that are not uploaded via the API show up once the folder
+    # is refreshed.
+    async with conn.conn() as s3:
+        await s3.put_object(Bucket=bucket, Key="a/c.txt", Body=b"foo")
+    assert await list_keys("a/") == ["a/b.txt"]
+
+    # Uploads and deletions are applied to the index.
+    await objects.upload_object(
+        conn,
+        bucket,
+        "a/d/e.txt",
+        UploadFile(file=io.BytesIO(b"foo"), filename="e.txt"),
+    )
+    assert await list_keys("a/") == ["a/b.txt", "a/d"]
+    await objects.delete_object(
+        conn, bucket, DeleteObjectRequest(Key="a/b.txt")
+    )
+    assert await list_keys("a/") == ["a/c.txt", "a/d"]
+    await objects.delete_object_by_prefix(
+        conn, bucket, DeleteObjectByPrefixRequest(Prefix="a/")
+    )
+    assert await list_keys("") == []
@@ -0,0 +1,353 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple, cast
+
+import pytest
+from types_aiobotocore_s3.client import S3Client
+
+from backend.api import listing
+
+KEYS: List[str] = sorted(
+    [f"{c}{i:03d}" for c in "0aBz~" for i in range(40)]
+    + [f"a/{i:03d}" for i in range(30)]
+    + [f"f/g/{i:03d}" for i in range(30)]
+)
+
+
+class S3Mock:
+    """
+    Lists the given keys in pages of `page_size` entries, similar to
+    the S3 API, and tracks the number of concurrent requests.
+    """
+
+    def __init__(self, keys: List[str], page_size: int = 10) -> None:
+        self.keys = sorted(keys)
+        self.page_size = page_size
+        self.requests: List[Dict[str, Any]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _list(
+        self, prefix: str, delimiter: str, after: str, skip_folder: bool
+    ) -> Tuple[List[str], List[str], Optional[str]]:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+        keys: List[str] = []
+        folders: List[str] = []
+        last: Optional[str] = None
+        for key in self.keys:
+            if not key.startswith(prefix) or key <= after:
+                continue
+            if skip_folder and key.startswith(after):
+                continue
+            rest = key[len(prefix) :]
+            if delimiter and delimiter in rest:
+                folder = prefix + rest[: rest.index(delimiter) + 1]
+                if folder == last:
+                    continue
+                if len(keys) + len(folders) == self.page_size:
+                    return keys, folders, last
+                folders.append(folder)
+                last = folder
+            else:
+                if len(keys) + len(folders) == self.page_size:
+                    return keys, folders, last
+                keys.append(key)
+                last = key
+        return keys, folders, None
+
+    async def list_objects_v2(
+        self,
+        Bucket: str,
+        Prefix: str,
+        Delimiter: str,
+        StartAfter: str = "",
+        ContinuationToken: str = "",
+    ) -> Dict[str, Any]:
+        self.requests.append(
+            {"StartAfter": StartAfter, "ContinuationToken": ContinuationToken}
+        )
+        after = ContinuationToken or StartAfter
+        keys, folders, next_token = await self._list(
+            Prefix, Delimiter, after, bool(ContinuationToken)
+        )
+        res: Dict[str, Any] = {
+            "Contents": [{"Key": key} for key in keys],
+            "CommonPrefixes": [{"Prefix": folder} for folder in folders],
+            "IsTruncated": next_token is not None,
+        }
+        if next_token is not None:
+            res["NextContinuationToken"] = next_token
+        return res
+
+    async def list_object_versions(
+        self,
+        Bucket: str,
+        Prefix: str,
+        Delimiter: str,
+        KeyMarker: str = "",
+    ) -> Dict[str, Any]:
+        self.requests.append({"KeyMarker": KeyMarker})
+        keys, folders, next_marker = await self._list(
+            Prefix, Delimiter, KeyMarker, False
+        )
+        res: Dict[str, Any] = {
+            "Versions": [{"Key": key, "VersionId": "1"} for key in keys],
+            "DeleteMarkers": [],
+            "CommonPrefixes": [{"Prefix": folder} for folder in folders],
+            "IsTruncated": next_marker is not None,
+        }
+        if next_marker is not None:
+            res["NextKeyMarker"] = next_marker
+        return res
+
+
+async def list_entries(
+    s3: S3Mock, versions: bool = False, **kwargs: Any
+) -> List[str]:
+    res: List[str] = []
+    if versions:
+        async for page in listing.list_object_versions_pages(
+            cast(S3Client, s3), "bucket", **kwargs
+        ):
+            res.extend(v.get("Key", "") for v in page.get("Versions", []))
+            res.extend(
+                cp.get("Prefix", "") for cp in page.get("CommonPrefixes", [])
+            )
+    else:
+        async for page in listing.list_objects_pages(
+            cast(S3Client, s3), "bucket", **kwargs
+        ):
+            res.extend(o.get("Key", "") for o in page.get("Contents", []))
+            res.extend(
+                cp.get("Prefix", "") for cp in page.get("CommonPrefixes", [])
+            )
+    return sorted(res) if kwargs.get("delimiter") else res
+
+
+@pytest.mark.anyio
+async def test_prefetch_pages() -> None:
+    requested: List[int] = []
+
+    async def fetch(kwargs: Dict[str, Any]) -> int:
+        page: int = kwargs.get("page", 0)
+        requested.append(page)
+        return page
+
+    def next_page(page: int) -> Optional[Dict[str, Any]]:
+        return {"page": page + 1} if page < 5 else None
+
+    pages: List[int] = []
+    async for page in listing.prefetch_pages(fetch, next_page):
+        # Let the prefetch task run.
+        await asyncio.sleep(0)
+        # The next page has already been requested.
+        assert requested[-1] == min(page + 1, 5)
+        pages.append(page)
+    assert pages == [0, 1, 2, 3, 4, 5]
+
+
+@pytest.mark.anyio
+async def test_prefetch_pages_cancel() -> None:
+    cancelled = asyncio.Event()
+
+    async def fetch(kwargs: Dict[str, Any]) -> int:
+        if not kwargs:
+            return 0
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return 1
+
+    pages = listing.prefetch_pages(fetch, lambda _: {"page": 1})
+    assert await pages.__anext__() == 0
+    # Let the prefetch task run.
+    await asyncio.sleep(0)
+    await pages.aclose()
+    assert cancelled.is_set()
+
+
+@pytest.mark.anyio
+async def test_list_objects_pages_sequential() -> None:
+    s3 = S3Mock(KEYS)
+    assert await list_entries(s3) == KEYS
+    assert len(s3.requests) == len(KEYS) // 10
+    assert all(not req["StartAfter"] for req in s3.requests)
+
+
+@pytest.mark.anyio
+async def test_list_objects_pages_single_page() -> None:
+    s3 = S3Mock(KEYS, page_size=1000)
+    assert await list_entries(s3, max_workers=8) == KEYS
+    assert len(s3.requests) == 1
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("max_workers", [2, 8, 100])
+async def test_list_objects_pages_parallel(max_workers: int) -> None:
+    s3 = S3Mock(KEYS)
+    assert await list_entries(s3, max_workers=max_workers) == KEYS
+    assert 1 < s3.max_in_flight <= max_workers
+    assert any(req["StartAfter"] for req in s3.requests)
+
+
+@pytest.mark.anyio
+async def test_list_objects_pages_parallel_prefix() -> None:
+    s3 = S3Mock(KEYS)
+    res = await list_entries(s3, prefix="a", max_workers=4)
+    assert res == [key for key in KEYS if key.startswith("a")]
+    assert all(
+        req["StartAfter"].startswith("a")
+        for req in s3.requests
+        if req["StartAfter"]
+    )
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("prefix", ["", "a", "f/"])
+async def test_list_objects_pages_parallel_delimiter(prefix: str) -> None:
+    expected = await list_entries(S3Mock(KEYS), prefix=prefix, delimiter="/")
+    s3 = S3Mock(KEYS, page_size=5)
+    res = await list_entries(s3, prefix=prefix, delimiter="/", max_workers=4)
+    # Folders are reported only once, even if they span multiple ranges.
+    assert res == expected
+
+
+@pytest.mark.anyio
+async def test_list_objects_pages_parallel_split_chars() -> None:
+    s3 = S3Mock(KEYS)
+    assert await list_entries(s3, max_workers=4, split_chars="a") == KEYS
+    assert [req["StartAfter"] for req in s3.requests if req["StartAfter"]] == [
+        "a"
+    ]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("versions", [False, True])
+async def test_list_pages_parallel_common_prefix(versions: bool) -> None:
+    keys = sorted(
+        f"logs/2023-{m:02d}-{d:02d}/{i}.gz"
+        for m in range(1, 4)
+        for d in range(1, 29)
+        for i in range(3)
+    )
+    s3 = S3Mock(keys)
+    assert await list_entries(s3, versions, max_workers=4) == keys
+    # The keyspace is split after the common prefix of the first page as
+    # well, not only after the first character.
+    markers = [
+        req.get("StartAfter") or req.get("KeyMarker") for req in s3.requests
+    ]
+    assert "logs/2023-01-1" in markers
+    assert "logs/2023-02" in markers
+
+
+@pytest.mark.parametrize(
+    "prefix,delimiter,keys,expected",
+    [
+        ("", "", ["a0", "a1"], ["aa", "b", "c"]),
+        ("", "", ["ab0", "ab1"], ["aba", "abb", "b", "c"]),
+        ("a", "", ["ab0", "ab1"], ["abb", "ac"]),
+        ("", "/", ["a/b0", "a/b1"], ["a0", "a1", "aa", "ab", "b", "c"]),
+        ("", "", [], ["!", "/", "0", "1", "2", "3", "a", "b", "c"]),
+    ],
+)
+def test_split_bounds(
+    prefix: str, delimiter: str, keys: List[str], expected: List[str]
+) -> None:
+    bounds = listing._split_bounds(  # pyright: ignore [reportPrivateUsage]
+        prefix, delimiter, keys, "!/0123abc"
+    )
+    assert bounds == expected
+
+
+@pytest.mark.anyio
+async def test_list_pages_parallel_backpressure() -> None:
+    keys = [f"{i:04d}" for i in range(2000)]
+    s3 = S3Mock(keys)
+    pages = listing.list_objects_pages(
+        cast(S3Client, s3), "bucket", max_workers=4
+    )
+    await pages.__anext__()
+    await pages.__anext__()
+    await asyncio.sleep(0.1)
+    # The workers pause once their pages are not consumed.
+    assert len(s3.requests) <= 1 + 8 * (listing.RANGE_BUFFER_PAGES + 1)
+    await pages.aclose()
+
+
+@pytest.mark.anyio
+async def test_list_pages_parallel_error() -> None:
+    class FailingS3Mock(S3Mock):
+        async def list_objects_v2(
+            self,
+            Bucket: str,
+            Prefix: str,
+            Delimiter: str,
+            StartAfter: str = "",
+            ContinuationToken: str = "",
+        ) -> Dict[str, Any]:
+            if StartAfter == "z":
+                raise RuntimeError("foo")
+            return await super().list_objects_v2(
+                Bucket, Prefix, Delimiter, StartAfter, ContinuationToken
+            )
+
+    s3 = FailingS3Mock(KEYS)
+    with pytest.raises(RuntimeError):
+        await list_entries(s3, max_workers=4)
+
+
+@pytest.mark.anyio
+async def test_list_object_versions_pages_parallel() -> None:
+    s3 = S3Mock(KEYS)
+    assert await list_entries(s3, versions=True, max_workers=4) == KEYS
+    assert 1 < s3.max_in_flight <= 4
+
+
+@pytest.mark.anyio
+async def test_list_pages_parallel_cancel() -> None:
+    s3 = S3Mock(KEYS)
+    pages = listing.list_objects_pages(
+        cast(S3Client, s3), "bucket", max_workers=4
+    )
+    await pages.__anext__()
+    await pages.__anext__()
+    await pages.aclose()
+    num_requests = len(s3.requests)
+    await asyncio.sleep(0.1)
+    assert len(s3.requests) == num_requests
+    assert num_requests < len(KEYS) // 10
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("key", ["a", "a/000", "f/g/", "0000", "b"])
+async def test_list_key_versions_pages(key: str) -> None:
+    keys = [*KEYS, "a", "f/g/", "f/g/h/000"]
+    s3 = S3Mock(keys, page_size=3)
+    res: List[str] = []
+    async for page in listing.list_key_versions_pages(
+        cast(S3Client, s3), "bucket", key
+    ):
+        res.extend(v.get("Key", "") for v in page.get("Versions", []))
+        assert not page.get("CommonPrefixes")
+    assert res == [k for k in keys if k == key]
+    # The listing stops at the first page that contains another key.
+    assert len(s3.requests) == 1
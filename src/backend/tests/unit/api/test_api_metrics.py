@@ -0,0 +1,40 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from fastapi import Request
+
+from backend.api import metrics as api_metrics
+
+
+@pytest.mark.anyio
+async def test_get_metrics() -> None:
+    class MockState:
+        metrics: api_metrics.Metrics
+
+    class MockApp:
+        state: MockState
+
+    req = Request({"type": "http", "app": MockApp()})
+    req.app.state = MockState()
+    req.app.state.metrics = api_metrics.Metrics()
+    req.app.state.metrics.count_cancelled("list_objects")
+    req.app.state.metrics.count_cancelled("list_objects")
+    req.app.state.metrics.count_cancelled("download_object")
+    res = await api_metrics.get_metrics(req)
+    assert res.CancelledRequests == 3
+    assert res.CancelledRequestsByOperation == {
+        "list_objects": 2,
+        "download_object": 1,
+    }
@@ -14,31 +14,49 @@
 
 import datetime
 import io
-from typing import Any, List
+import json
+import uuid
+from typing import Any, Dict, List, Tuple, cast
 
+import anyio
 import pytest
 from botocore.exceptions import ClientError
 from fastapi import HTTPException, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from pytest_mock import MockerFixture
-from types_aiobotocore_s3.type_defs import ObjectIdentifierTypeDef
+from starlette.types import Message, Receive, Scope, Send
+from types_aiobotocore_s3.type_defs import (
+    ListObjectVersionsOutputTypeDef,
+    ObjectIdentifierTypeDef,
+    OwnerTypeDef,
+)
 
 from backend.api import S3GWClient, objects
+from backend.api.compression import CompressionMiddleware
+from backend.api.job_manager import JobManager
 from backend.api.objects import ObjectBodyStreamingResponse
 from backend.api.types import (
     DeletedObject,
     DeleteObjectByPrefixRequest,
     DeleteObjectRequest,
+    ListObjectsPageRequest,
+    ListObjectsRequest,
+    ListObjectVersionsPageRequest,
+    ListObjectVersionsRequest,
     Object,
     ObjectAttributes,
+    ObjectFilter,
     ObjectLockLegalHold,
     ObjectRequest,
     ObjectVersion,
+    RestoreObjectByPrefixRequest,
     RestoreObjectRequest,
     SetObjectLockLegalHoldRequest,
     SetObjectTaggingRequest,
     Tag,
 )
-from backend.tests.unit.helpers import S3ApiMock, async_return
+from backend.tests.unit.helpers import S3ApiMock, async_return, body_request
 
 
 @pytest.fixture(autouse=True)
@@ -101,6 +119,75 @@ async def test_build_key_5() -> None:
     assert key == "foo"
 
 
+@pytest.mark.parametrize(
+    "key", ["foo", "/foo/bar/", "///baz///xyz///", "a//b", "a b/c.txt"]
+)
+@pytest.mark.anyio
+async def test_key_name(key: str) -> None:
+    assert objects.key_name(key) == objects.split_key(key).pop()
+
+
+@pytest.mark.anyio
+async def test_list_output_to_objects_trusted() -> None:
+    lm = datetime.datetime.now(datetime.timezone.utc)
+    owner: OwnerTypeDef = {"ID": "foo", "DisplayName": "bar"}
+    res = objects.list_object_versions_output_to_objects(
+        cast(
+            ListObjectVersionsOutputTypeDef,
+            {
+                "Versions": [
+                    {
+                        "Key": "a/b.txt",
+                        "VersionId": "1",
+                        "IsLatest": True,
+                        "LastModified": lm,
+                        "ETag": '"x"',
+                        "Size": 3,
+                        "StorageClass": "STANDARD",
+                        "Owner": owner,
+                    }
+                ],
+                "CommonPrefixes": [{"Prefix": "a//c/"}],
+                "DeleteMarkers": [
+                    {
+                        "Key": "a/d",
+                        "VersionId": "2",
+                        "IsLatest": False,
+                        "LastModified": lm,
+                        "Owner": owner,
+                    }
+                ],
+            },
+        )
+    )
+    assert res == [
+        ObjectVersion(
+            Key="a/b.txt",
+            Name="b.txt",
+            VersionId="1",
+            IsLatest=True,
+            IsDeleted=False,
+            LastModified=lm,
+            ETag='"x"',
+            Size=3,
+            Owner=owner,
+        ),
+        ObjectVersion(
+            Key="a/c", Name="c", Type="FOLDER", IsDeleted=False, IsLatest=True
+        ),
+        ObjectVersion(
+            Key="a/d",
+            Name="d",
+            VersionId="2",
+            IsLatest=False,
+            IsDeleted=True,
+            LastModified=lm,
+            Size=0,
+            Owner=owner,
+        ),
+    ]
+
+
 @pytest.mark.anyio
 async def test_get_object_list(
     s3_client: S3GWClient, mocker: MockerFixture
@@ -256,6 +343,412 @@ async def test_get_object_list_truncated(
     ] == res
 
 
+@pytest.mark.anyio
+async def test_get_object_list_page(
+    s3_client: S3GWClient, mocker: MockerFixture
+) -> None:
+    s3api_mock = S3ApiMock(s3_client, mocker)
+    s3api_mock.patch(
+        "list_objects_v2",
+        return_value=async_return(
+            {
+                "Contents": [
+                    {
+                        "Key": "a/file2.txt",
+                        "LastModified": datetime.datetime(
+                            2023, 8, 3, 7, 38, 32, 206000
+                        ),
+                        "ETag": '"d64d9778d4726d54386ed"',
+                        "Size": 514,
+                    },
+                ],
+                "Name": "test01",
+                "Prefix": "a/",
+                "Delimiter": "/",
+                "MaxKeys": 2,
+                "CommonPrefixes": [{"Prefix": "a/b/"}],
+                "KeyCount": 2,
+                "IsTruncated": True,
+                "StartAfter": "a/file1.txt",
+                "NextContinuationToken": "foo",
+            }
+        ),
+    )
+
+    res = await objects.list_objects_page(
+        s3_client,
+        "test01",
+        ListObjectsPageRequest(
+            Prefix="a/", MaxKeys=2, StartAfter="a/file1.txt"
+        ),
+    )
+    s3api_mock.mocked_fn["list_objects_v2"].assert_called_once_with(
+        Bucket="test01",
+        Prefix="a/",
+        Delimiter="/",
+        MaxKeys=2,
+        StartAfter="a/file1.txt",
+    )
+    assert res.IsTruncated is True
+    assert res.NextContinuationToken == "foo"
+    assert [
+        Object(
+            Name="file2.txt",
+            Type="OBJECT",
+            Key="a/file2.txt",
+            LastModified=datetime.datetime(2023, 8, 3, 7, 38, 32, 206000),
+            ETag='"d64d9778d4726d54386ed"',
+            Size=514,
+        ),
+        Object(Name="b", Type="FOLDER", Key="a/b"),
+    ] == res.Objects
+
+
+@pytest.mark.anyio
+async def test_get_object_list_page_last(
+    s3_client: S3GWClient, mocker: MockerFixture
+) -> None:
+    s3api_mock = S3ApiMock(s3_client, mocker)
+    s3api_mock.patch(
+        "list_objects_v2",
+        return_value=async_return(
+            {
+                "Name": "test01",
+                "Prefix": "",
+                "Delimiter": "/",
+                "MaxKeys": 1000,
+                "KeyCount": 0,
+                "IsTruncated": False,
+                "ContinuationToken": "foo",
+            }
+        ),
+    )
+
+    res = await objects.list_objects_page(
+        s3_client, "test01", ListObjectsPageRequest(ContinuationToken="foo")
+    )
+    s3api_mock.mocked_fn["list_objects_v2"].assert_called_once_with(
+        Bucket="test01",
+        Prefix="",
+        Delimiter="/",
+        MaxKeys=1000,
+        ContinuationToken="foo",
+    )
+    assert res.IsTruncated is False
+    assert res.NextContinuationToken is None
+    assert res.Objects == []
+
+
+def test_list_objects_page_request_max_keys() -> None:
+    with pytest.raises(ValidationError):
+        ListObjectsPageRequest(MaxKeys=0)
+    with pytest.raises(ValidationError):
+        ListObjectsPageRequest(MaxKeys=1001)
+
+
+@pytest.mark.anyio
+async def test_get_object_versions_list_page(
+    s3_client: S3GWClient, mocker: MockerFixture
+) -> None:
+    s3api_mock = S3ApiMock(s3_client, mocker)
+    s3api_mock.patch(
+        "list_object_versions",
+        return_value=async_return(
+            {
+                "Versions": [
+                    {"Key": "a/b", "VersionId": "2", "IsLatest": False},
+                ],
+                "DeleteMarkers": [
+                    {"Key": "a/b", "VersionId": "3", "IsLatest": True},
+                ],
+                "IsTruncated": True,
+                "NextKeyMarker": "a/b",
+                "NextVersionIdMarker": "2",
+            }
+        ),
+    )
+
+    res = await objects.list_object_versions_page(
+        s3_client,
+        "test01",
+        ListObjectVersionsPageRequest(
+            Prefix="a/b",
+            Strict=True,
+            MaxKeys=2,
+            KeyMarker="a/b",
+            VersionIdMarker="1",
+        ),
+    )
+    s3api_mock.mocked_fn["list_object_versions"].assert_called_once_with(
+        Bucket="test01",
+        Prefix="a/b",
+        Delimiter="/",
+        MaxKeys=2,
+        KeyMarker="a/b",
+        VersionIdMarker="1",
+    )
+    assert res.IsTruncated is True
+    assert res.NextKeyMarker == "a/b"
+    assert res.NextVersionIdMarker == "2"
+    assert [(obj.VersionId, obj.IsDeleted) for obj in res.Objects] == [
+        ("2", False),
+        ("3", True),
+    ]
+
+
+@pytest.mark.anyio
+async def test_get_object_versions_list_page_markers(
+    s3_client: S3GWClient,
+) -> None:
+    bucket: str = str(uuid.uuid4())
+    async with s3_client.conn() as s3:
+        await s3.create_bucket(Bucket=bucket)
+        await s3.put_bucket_versioning(
+            Bucket=bucket, VersioningConfiguration={"Status": "Enabled"}
+        )
+        expected: List[str] = []
+        for key, count in [("a", 5), ("b", 2)]:
+            for _ in range(count):
+                s3_res = await s3.put_object(Bucket=bucket, Key=key, Body=b"")
+                expected.append(f"{key}:{s3_res['VersionId']}")
+
+    # The versions of `a` are split across pages.
+    versions: List[str] = []
+    params = ListObjectVersionsPageRequest(MaxKeys=3)
+    while True:
+        page = await objects.list_object_versions_page(
+            s3_client, bucket, params
+        )
+        assert len(page.Objects) <= 3
+        versions.extend(f"{obj.Key}:{obj.VersionId}" for obj in page.Objects)
+        if not page.IsTruncated:
+            break
+        assert page.NextKeyMarker is not None
+        params.KeyMarker = page.NextKeyMarker
+        params.VersionIdMarker = page.NextVersionIdMarker or ""
+    assert sorted(versions) == sorted(expected)
+    assert len(versions) == len(set(versions))
+
+
+@pytest.mark.anyio
+async def test_get_object_versions_list_markers(
+    s3_client: S3GWClient, mocker: MockerFixture
+) -> None:
+    s3api_mock = S3ApiMock(s3_client, mocker)
+    s3api_mock.patch(
+        "list_object_versions",
+        side_effect=[
+            async_return(
+                {
+                    "Versions": [
+                        {"Key": "a", "VersionId": "2", "IsLatest": True},
+                    ],
+                    "IsTruncated": True,
+                    "NextKeyMarker": "a",
+                    "NextVersionIdMarker": "2",
+                }
+            ),
+            async_return(
+                {
+                    "Versions": [
+                        {"Key": "a", "VersionId": "1", "IsLatest": False},
+                    ],
+                    "IsTruncated": False,
+                }
+            ),
+        ],
+    )
+
+    res = await objects.list_object_versions(s3_client, "test01")
+    assert [obj.VersionId for obj in res] == ["2", "1"]
+    mocked_fn = s3api_mock.mocked_fn["list_object_versions"]
+    assert mocked_fn.call_args_list[1].kwargs["KeyMarker"] == "a"
+    assert mocked_fn.call_args_list[1].kwargs["VersionIdMarker"] == "2"
+
+
+def test_list_object_versions_page_request_max_keys() -> None:
+    with pytest.raises(ValidationError):
+        ListObjectVersionsPageRequest(MaxKeys=0)
+    with pytest.raises(ValidationError):
+        ListObjectVersionsPageRequest(MaxKeys=1001)
+
+
+async def read_ndjson(res: StreamingResponse) -> List[Dict[str, Any]]:
+    lines: List[Dict[str, Any]] = []
+    async for chunk in res.body_iterator:
+        assert isinstance(chunk, bytes)
+        lines.extend(json.loads(line) for line in chunk.splitlines())
+    return lines
+
+
+@pytest.mark.anyio
+async def test_get_object_list_stream(
+    s3_client: S3GWClient, mocker: MockerFixture
+) -> None:
+    s3api_mock = S3ApiMock(s3_client, mocker)
+    s3api_mock.patch(
+        "list_objects_v2",
+        side_effect=[
+            async_return(
+                {
+                    "Contents": [{"Key": "file1.txt", "Size": 1}],
+                    "CommonPrefixes": [{"Prefix": "a/"}],
+                    "IsTruncated": True,
+                    "NextContinuationToken": "foo",
+                }
+            ),
+            async_return(
+                {
+                    "Contents": [{"Key": "file2.txt", "Size": 2}],
+                    "IsTruncated": False,
+                }
+            ),
+        ],
+    )
+
+    res = await objects.list_objects_stream(s3_client, "test01")
+    assert res.media_type == "application/x-ndjson"
+    lines = await read_ndjson(res)
+    assert [(line["Key"], line["Type"]) for line in lines] == [
+        ("file1.txt", "OBJECT"),
+        ("a", "FOLDER"),
+        ("file2.txt", "OBJECT"),
+    ]
+    assert lines[2]["Size"] == 2
+    mocked_fn = s3api_mock.mocked_fn["list_objects_v2"]
+    assert mocked_fn.call_count == 2
+    assert mocked_fn.call_args_list[1].kwargs == {
+        "Bucket": "test01",
+        "Prefix": "",
+        "Delimiter": "/",
+        "ContinuationToken": "foo",
+    }
+
+
+@pytest.mark.anyio
+async def test_get_object_versions_list_stream(
+    s3_client: S3GWClient, mocker: MockerFixture
+) -> None:
+    s3api_mock = S3ApiMock(s3_client, mocker)
+    s3api_mock.patch(
+        "list_object_versions",
+        side_effect=[
+            async_return(
+                {
+                    "Versions": [
+                        {"Key": "a", "VersionId": "1", "IsLatest": False},
+                    ],
+                    "IsTruncated": True,
+                    "NextKeyMarker": "a",
+                    "NextVersionIdMarker": "1",
+                }
+            ),
+            async_return(
+                {
+                    "Versions": [
+                        {"Key": "ab", "VersionId": "2", "IsLatest": True},
+                    ],
+                    "DeleteMarkers": [
+                        {"Key": "a", "VersionId": "3", "IsLatest": True},
+                    ],
+                    "IsTruncated": True,
+                    "NextKeyMarker": "ab",
+                }
+            ),
+        ],
+    )
+
+    res = await objects.list_object_versions_stream(
+        s3_client, "test01", ListObjectVersionsRequest(Prefix="a", Strict=True)
+    )
+    lines = await read_ndjson(res)
+    assert [(line["VersionId"], line["IsDeleted"]) for line in lines] == [
+        ("1", False),
+        ("3", True),
+    ]
+    mocked_fn = s3api_mock.mocked_fn["list_object_versions"]
+    # The listing stops once it moves past the key `a`.
+    assert mocked_fn.call_count == 2
+    assert mocked_fn.call_args_list[1].kwargs["KeyMarker"] == "a"
+    assert mocked_fn.call_args_list[1].kwargs["VersionIdMarker"] == "1"
+
+
+@pytest.mark.anyio
+async def test_get_object_list_query(
+    s3_client: S3GWClient, mocker: MockerFixture
+) -> None:
+    s3api_mock = S3ApiMock(s3_client, mocker)
+    s3api_mock.patch(
+        "list_objects_v2",
+        side_effect=[
+            async_return(
+                {
+                    "Contents": [
+                        {"Key": "a.txt", "Size": 1},
+                        {"Key": "b.png", "Size": 2},
+                    ],
+                    "CommonPrefixes": [{"Prefix": "c/"}],
+                    "IsTruncated": True,
+                    "NextContinuationToken": "foo",
+                }
+            ),
+            async_return(
+                {
+                    "Contents": [{"Key": "d.txt", "Size": 3}],
+                    "IsTruncated": False,
+                }
+            ),
+        ],
+    )
+
+    res = await objects.list_objects(
+        s3_client,
+        "test01",
+        ListObjectsRequest(
+            Filter=ObjectFilter(Name="*.txt"), SortBy="Size", SortOrder="desc"
+        ),
+    )
+    assert [obj.Key for obj in res] == ["d.txt", "a.txt"]
+
+
+@pytest.mark.anyio
+async def test_get_object_list_query_limit(
+    s3_client: S3GWClient, mocker: MockerFixture
+) -> None:
+    s3api_mock = S3ApiMock(s3_client, mocker)
+    s3api_mock.patch(
+        "list_objects_v2",
+        side_effect=[
+            async_return(
+                {
+                    "Contents": [
+                        {"Key": "a.txt", "Size": 1},
+                        {"Key": "b.png", "Size": 2},
+                    ],
+                    "IsTruncated": True,
+                    "NextContinuationToken": "foo",
+                }
+            ),
+            async_return(
+                {
+                    "Contents": [{"Key": "c.txt", "Size": 3}],
+                    "IsTruncated": True,
+                    "NextContinuationToken": "bar",
+                }
+            ),
+            async_return({"IsTruncated": False}),
+        ],
+    )
+
+    res = await objects.list_objects_stream(
+        s3_client, "test01", ListObjectsRequest(Limit=1)
+    )
+    lines = await read_ndjson(res)
+    assert [line["Key"] for line in lines] == ["a.txt"]
+    # The listing is not continued once the limit has been reached.
+    assert s3api_mock.mocked_fn["list_objects_v2"].call_count < 3
+
+
 @pytest.mark.anyio
 async def test_get_object_list_failure(
     s3_client: S3GWClient,
@@ -1143,6 +1636,9 @@ async def test_restore_object(
             }
         ),
     )
+    s3api_mock.patch(
+        "head_object", return_value=async_return({"ContentLength": 3})
+    )
     s3api_mock.patch(
         "copy_object",
         return_value=async_return(
@@ -1183,6 +1679,9 @@ async def test_restore_object_failure(
         return_value=async_return({}),
     )
     s3api_mock.patch("delete_objects", return_value=async_return(None))
+    s3api_mock.patch(
+        "head_object", return_value=async_return({"ContentLength": 3})
+    )
     s3api_mock.patch(
         "copy_object",
         side_effect=ClientError(
@@ -1203,6 +1702,105 @@ async def test_restore_object_failure(
     s3api_mock.mocked_fn["delete_objects"].assert_not_called()
 
 
+@pytest.mark.anyio
+async def test_restore_object_by_prefix(s3_client: S3GWClient) -> None:
+    bucket: str = str(uuid.uuid4())
+    async with s3_client.conn() as s3:
+        await s3.create_bucket(Bucket=bucket)
+        await s3.put_bucket_versioning(
+            Bucket=bucket, VersioningConfiguration={"Status": "Enabled"}
+        )
+        # Unlike S3, moto refuses to copy a version onto its own key
+        # unless the bucket is encrypted.
+        await s3.put_bucket_encryption(
+            Bucket=bucket,
+            ServerSideEncryptionConfiguration={
+                "Rules": [
+                    {
+                        "ApplyServerSideEncryptionByDefault": {
+                            "SSEAlgorithm": "AES256"
+                        }
+                    }
+                ]
+            },
+        )
+        for key in ["a/1", "a/b/2", "a/3", "a/4", "b"]:
+            await s3.put_object(Bucket=bucket, Key=key, Body=b"old")
+    # The modification times are listed with a resolution of seconds.
+    await anyio.sleep(1.1)
+    timestamp = datetime.datetime.now(datetime.timezone.utc)
+    await anyio.sleep(1.1)
+    async with s3_client.conn() as s3:
+        for key in ["a/1", "a/b/2", "a/b/2", "b"]:
+            await s3.delete_object(Bucket=bucket, Key=key)
+        await s3.put_object(Bucket=bucket, Key="a/3", Body=b"new")
+
+    # The deleted objects are restored by removing their delete markers.
+    res = await objects.restore_object_by_prefix(
+        s3_client, bucket, RestoreObjectByPrefixRequest(Prefix="a/")
+    )
+    assert (res.Restored, res.Copied, res.DeleteMarkers) == (2, 0, 3)
+    assert res.Errors == []
+    assert res.Seconds > 0 and res.ObjectsPerSecond > 0
+    async with s3_client.conn() as s3:
+        s3_res = await s3.list_object_versions(Bucket=bucket)
+        assert [m.get("Key") for m in s3_res.get("DeleteMarkers", [])] == ["b"]
+
+    # An older version is promoted by copying it.
+    res = await objects.restore_object_by_prefix(
+        s3_client,
+        bucket,
+        RestoreObjectByPrefixRequest(Prefix="a/", Timestamp=timestamp),
+    )
+    assert (res.Restored, res.Copied, res.DeleteMarkers) == (1, 1, 0)
+    async with s3_client.conn() as s3:
+        s3_obj = await s3.get_object(Bucket=bucket, Key="a/3")
+        assert await s3_obj["Body"].read() == b"old"
+
+
+@pytest.mark.anyio
+async def test_restore_object_by_prefix_job(
+    s3_client: S3GWClient, mocker: MockerFixture
+) -> None:
+    s3api_mock = S3ApiMock(s3_client, mocker)
+    s3api_mock.patch(
+        "list_object_versions",
+        return_value=async_return(
+            {
+                "Versions": [
+                    {"Key": "a", "VersionId": "1"},
+                    {"Key": "b", "VersionId": "1"},
+                ],
+                "DeleteMarkers": [
+                    {"Key": "a", "VersionId": "2", "IsLatest": True},
+                    {"Key": "b", "VersionId": "2", "IsLatest": True},
+                ],
+            }
+        ),
+    )
+    s3api_mock.patch(
+        "delete_objects",
+        return_value=async_return(
+            {
+                "Deleted": [{"Key": "a", "VersionId": "2"}],
+                "Errors": [
+                    {"Key": "b", "VersionId": "2", "Code": "AccessDenied"}
+                ],
+            }
+        ),
+    )
+    manager = JobManager()
+    job = await objects.restore_object_by_prefix_job(
+        s3_client, manager, "bucket", RestoreObjectByPrefixRequest(Prefix="")
+    )
+    assert job.Type == "restore-by-prefix"
+    await manager.wait(job.Id)
+    res = await manager.get(s3_client.job_owner, job.Id)
+    assert res is not None
+    assert (res.Status, res.Done, res.Failed) == ("FAILED", 1, 1)
+    assert res.Errors == ["b (AccessDenied)"]
+
+
 @pytest.mark.anyio
 async def test_delete_object_1(
     s3_client: S3GWClient, mocker: MockerFixture
@@ -1629,6 +2227,226 @@ async def test_delete_object_by_prefix_3(
     )
 
 
+@pytest.mark.anyio
+async def test_delete_object_by_prefix_batches(s3_client: S3GWClient) -> None:
+    bucket: str = str(uuid.uuid4())
+    keys: List[str] = [f"a/{i % 7}/{i:04d}" for i in range(1100)]
+    async with s3_client.conn() as s3:
+        await s3.create_bucket(Bucket=bucket)
+        await s3.put_bucket_versioning(
+            Bucket=bucket, VersioningConfiguration={"Status": "Enabled"}
+        )
+        for key in [*keys, "a.txt", "b/a"]:
+            await s3.put_object(Bucket=bucket, Key=key, Body=b"")
+
+    # More than 1000 objects are deleted in batches, and the objects
+    # in sub-folders are deleted as well.
+    res: List[DeletedObject] = await objects.delete_object_by_prefix(
+        s3_client,
+        bucket,
+        DeleteObjectByPrefixRequest(Prefix="a/", AllVersions=True),
+    )
+    assert sorted(obj.Key for obj in res) == sorted(keys)
+    async with s3_client.conn() as s3:
+        s3_res = await s3.list_object_versions(Bucket=bucket)
+    assert sorted(v.get("Key", "") for v in s3_res.get("Versions", [])) == [
+        "a.txt",
+        "b/a",
+    ]
+    assert "DeleteMarkers" not in s3_res
+
+
+@pytest.mark.anyio
+async def test_delete_objects_bulk(s3_client: S3GWClient) -> None:
+    bucket: str = str(uuid.uuid4())
+    keys: List[str] = [f"a/{i:04d}" for i in range(2500)]
+    async with s3_client.conn() as s3:
+        await s3.create_bucket(Bucket=bucket)
+        for key in [*keys, "b"]:
+            await s3.put_object(Bucket=bucket, Key=key, Body=b"")
+
+    # The identifiers are sent as newline-delimited JSON, including some
+    # invalid ones, which do not fail the request.
+    lines = [json.dumps({"Key": key}) for key in keys]
+    lines.insert(10, json.dumps({"VersionId": "1"}))
+    lines.insert(20, json.dumps({"Key": ["a"]}))
+    res = await objects.delete_objects_bulk(
+        s3_client, bucket, body_request("\n".join(lines).encode())
+    )
+    assert sorted(obj.Key for obj in res.Deleted) == keys
+    assert [(e.Key, e.Code) for e in res.Errors] == [
+        ("", "InvalidArgument"),
+        ("['a']", "InvalidArgument"),
+    ]
+    async with s3_client.conn() as s3:
+        s3_res = await s3.list_objects_v2(Bucket=bucket)
+    assert [obj.get("Key") for obj in s3_res.get("Contents", [])] == ["b"]
+
+    # A JSON array is accepted as well.
+    res = await objects.delete_objects_bulk(
+        s3_client, bucket, body_request(b'[{"Key": "b"}]', size=3)
+    )
+    assert [obj.Key for obj in res.Deleted] == ["b"]
+    assert res.Errors == []
+
+
+@pytest.mark.anyio
+async def test_delete_objects_bulk_errors(
+    s3_client: S3GWClient, mocker: MockerFixture
+) -> None:
+    s3api_mock = S3ApiMock(s3_client, mocker)
+    s3api_mock.patch(
+        "delete_objects",
+        return_value=async_return(
+            {
+                "Deleted": [{"Key": "a"}],
+                "Errors": [{"Key": "b", "Code": "AccessDenied"}],
+            }
+        ),
+    )
+    res = await objects.delete_objects_bulk(
+        s3_client, "bucket", body_request(b'[{"Key": "a"}, {"Key": "b"}]')
+    )
+    assert [obj.Key for obj in res.Deleted] == ["a"]
+    assert [(e.Key, e.Code) for e in res.Errors] == [("b", "AccessDenied")]
+
+    with pytest.raises(HTTPException) as e:
+        await objects.delete_objects_bulk(
+            s3_client, "bucket", body_request(b'[{"Key": "a"')
+        )
+    assert e.value.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.anyio
+async def test_delete_object_by_prefix_job(s3_client: S3GWClient) -> None:
+    bucket: str = str(uuid.uuid4())
+    async with s3_client.conn() as s3:
+        await s3.create_bucket(Bucket=bucket)
+        for key in ["a/b/1", "a/2", "b"]:
+            await s3.put_object(Bucket=bucket, Key=key, Body=b"")
+
+    manager = JobManager()
+    job = await objects.delete_object_by_prefix_job(
+        s3_client, manager, bucket, DeleteObjectByPrefixRequest(Prefix="a/")
+    )
+    assert (job.Type, job.Status) == ("delete-by-prefix", "PENDING")
+    await manager.wait(job.Id)
+    res = await manager.get(s3_client.job_owner, job.Id)
+    assert res is not None
+    assert (res.Status, res.Done, res.Failed) == ("SUCCEEDED", 2, 0)
+    async with s3_client.conn() as s3:
+        s3_res = await s3.list_objects_v2(Bucket=bucket)
+    assert [obj.get("Key") for obj in s3_res.get("Contents", [])] == ["b"]
+
+
+@pytest.mark.anyio
+async def test_delete_object_job(
+    s3_client: S3GWClient, mocker: MockerFixture
+) -> None:
+    s3api_mock = S3ApiMock(s3_client, mocker)
+    s3api_mock.patch(
+        "delete_objects",
+        return_value=async_return(
+            {"Errors": [{"Key": "file1.txt", "Code": "AccessDenied"}]}
+        ),
+    )
+
+    manager = JobManager()
+    job = await objects.delete_object_job(
+        s3_client, manager, "test01", DeleteObjectRequest(Key="file1.txt")
+    )
+    await manager.wait(job.Id)
+    res = await manager.get(s3_client.job_owner, job.Id)
+    assert res is not None
+    assert (res.Status, res.Failed) == ("FAILED", 1)
+    assert res.Errors == ["file1.txt (AccessDenied)"]
+
+
+@pytest.mark.anyio
+async def test_delete_object_by_prefix_stream(
+    s3_client: S3GWClient, mocker: MockerFixture
+) -> None:
+    s3api_mock = S3ApiMock(s3_client, mocker)
+    s3api_mock.patch(
+        "list_object_versions",
+        side_effect=[
+            async_return(
+                {
+                    "Versions": [
+                        {"Key": "a/1", "VersionId": "2", "IsLatest": True},
+                        {"Key": "a/1", "VersionId": "1", "IsLatest": False},
+                    ],
+                    "IsTruncated": True,
+                    "NextKeyMarker": "a/1",
+                }
+            ),
+            async_return(
+                {
+                    "Versions": [
+                        {"Key": "a/b/2", "VersionId": "1", "IsLatest": True},
+                    ],
+                    "DeleteMarkers": [
+                        {"Key": "a/3", "VersionId": "2", "IsLatest": True},
+                    ],
+                    "IsTruncated": False,
+                }
+            ),
+        ],
+    )
+    s3api_mock.patch(
+        "delete_objects",
+        return_value=async_return(
+            {
+                "Deleted": [{"Key": "a/1", "VersionId": ""}],
+                "Errors": [{"Key": "a/b/2", "Code": "AccessDenied"}],
+            }
+        ),
+    )
+
+    res = await objects.delete_object_by_prefix_stream(
+        s3_client, "test01", DeleteObjectByPrefixRequest(Prefix="a/")
+    )
+    assert res.media_type == "application/x-ndjson"
+    lines = await read_ndjson(res)
+    assert lines == [
+        {
+            "Batch": 0,
+            "Deleted": [
+                {
+                    "Key": "a/1",
+                    "VersionId": "",
+                    "DeleteMarker": None,
+                    "DeleteMarkerVersionId": None,
+                }
+            ],
+            "Errors": [
+                {
+                    "Key": "a/b/2",
+                    "VersionId": None,
+                    "Code": "AccessDenied",
+                    "Message": None,
+                }
+            ],
+        }
+    ]
+    # The listing is flat, and only the latest versions are deleted.
+    mocked_fn = s3api_mock.mocked_fn["list_object_versions"]
+    assert mocked_fn.call_args_list[0].kwargs == {
+        "Bucket": "test01",
+        "Prefix": "a/",
+        "Delimiter": "",
+    }
+    s3api_mock.mocked_fn["delete_objects"].assert_called_once_with(
+        Bucket="test01",
+        Delete={
+            "Objects": [
+                {"Key": "a/1", "VersionId": ""},
+                {"Key": "a/b/2", "VersionId": ""},
+            ]
+        },
+    )
+
+
 @pytest.mark.anyio
 async def test_download_object(
     s3_client: S3GWClient, mocker: MockerFixture
@@ -1640,7 +2458,9 @@ async def test_download_object(
             {
                 "Key": "file2.txt",
                 "VersionId": "kOTpzRH08N4TWDlXUz5U9BjZJm85sGV",
-                "LastModified": "2023-08-07T09:01:14+00:00",
+                "LastModified": datetime.datetime(
+                    2023, 8, 7, 9, 1, 14, tzinfo=datetime.timezone.utc
+                ),
                 "ETag": '"75ec5355d8c2c299d9ff530edbb248fc"',
                 "ContentLength": 14,
                 "Body": "This is a test",
@@ -1667,6 +2487,138 @@ async def test_download_object(
     assert s3sr.media_type == "text/plain"
     assert s3sr.headers.get("content-length") == "14"
     assert s3sr.headers.get("etag") == '"75ec5355d8c2c299d9ff530edbb248fc"'
+    assert s3sr.headers.get("accept-ranges") == "bytes"
+    assert s3sr.headers.get("last-modified") == "Mon, 07 Aug 2023 09:01:14 GMT"
+
+
+@pytest.mark.anyio
+async def test_download_object_not_compressed(s3_client: S3GWClient) -> None:
+    bucket = str(uuid.uuid4())
+    body = b"foo" * 1000
+    async with s3_client.conn() as s3:
+        await s3.create_bucket(Bucket=bucket)
+        await s3.put_bucket_versioning(
+            Bucket=bucket, VersioningConfiguration={"Status": "Enabled"}
+        )
+        s3_res = await s3.put_object(
+            Bucket=bucket, Key="a.json", Body=body, ContentType="text/plain"
+        )
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        res = await objects.download_object(
+            s3_client,
+            bucket,
+            ObjectRequest(Key="a.json", VersionId=s3_res["VersionId"]),
+        )
+        await res(scope, receive, send)
+
+    async def receive() -> Message:
+        # The client does not disconnect.
+        await anyio.sleep_forever()
+        return {"type": "http.disconnect"}
+
+    messages: List[Message] = []
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    scope: Scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"accept-encoding", b"gzip, br")],
+    }
+    await CompressionMiddleware(app, minimum_size=0)(scope, receive, send)
+    headers = dict(messages[0]["headers"])
+    assert b"content-encoding" not in headers
+    assert headers[b"content-length"] == str(len(body)).encode()
+    assert b"".join(m.get("body", b"") for m in messages[1:]) == body
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        (None, None),
+        ("bytes=0-99", "bytes=0-99"),
+        ("bytes=100-", "bytes=100-"),
+        ("bytes=-100", "bytes=-100"),
+        (" Bytes = 1 - 2 ", "bytes=1-2"),
+        ("bytes=0-9,20-29", None),
+        ("bytes=9-0", None),
+        ("bytes=-", None),
+        ("bytes=a-b", None),
+        ("items=0-9", None),
+    ],
+)
+async def test_parse_range(value: str | None, expected: str | None) -> None:
+    assert objects.parse_range(value) == expected
+
+
+@pytest.mark.anyio
+async def test_download_object_range(s3_client: S3GWClient) -> None:
+    bucket = str(uuid.uuid4())
+    body = bytes(range(256)) * 10
+    async with s3_client.conn() as s3:
+        await s3.create_bucket(Bucket=bucket)
+        s3_res = await s3.put_object(Bucket=bucket, Key="a.bin", Body=body)
+    etag = s3_res["ETag"]
+
+    async def download(
+        **kwargs: str,
+    ) -> Tuple[int, Dict[bytes, bytes], bytes]:
+        async def receive() -> Message:
+            await anyio.sleep_forever()
+            return {"type": "http.disconnect"}
+
+        messages: List[Message] = []
+
+        async def send(message: Message) -> None:
+            messages.append(message)
+
+        res = await objects.download_object(
+            s3_client, bucket, ObjectRequest(Key="a.bin"), **kwargs
+        )
+        scope: Scope = {"type": "http", "method": "POST", "headers": []}
+        await res(scope, receive, send)
+        return (
+            messages[0]["status"],
+            dict(messages[0]["headers"]),
+            b"".join(m.get("body", b"") for m in messages[1:]),
+        )
+
+    code, headers, data = await download(range_="bytes=10-19")
+    assert (code, data) == (206, body[10:20])
+    assert headers[b"content-range"] == f"bytes 10-19/{len(body)}".encode()
+    assert headers[b"content-length"] == b"10"
+    assert headers[b"accept-ranges"] == b"bytes"
+
+    code, headers, data = await download(range_="bytes=-5")
+    assert (code, data) == (206, body[-5:])
+
+    # Multiple ranges are not supported, the whole object is returned.
+    code, headers, data = await download(range_="bytes=0-1,5-6")
+    assert (code, data) == (200, body)
+    assert b"content-range" not in headers
+
+    # The range is only returned if the object has not changed.
+    code, headers, data = await download(range_="bytes=10-", if_range=etag)
+    assert (code, data) == (206, body[10:])
+    code, headers, data = await download(
+        range_="bytes=10-", if_range='"0123456789"'
+    )
+    assert (code, data) == (200, body)
+
+    # Unchanged objects are not sent again.
+    code, headers, data = await download(if_none_match=etag)
+    assert (code, data) == (304, b"")
+    assert headers[b"etag"] == etag.encode()
+    code, headers, data = await download(if_none_match='"0123456789"')
+    assert (code, data) == (200, body)
+    code, headers, data = await download(
+        if_modified_since="Fri, 01 Jan 2100 00:00:00 GMT"
+    )
+    assert (code, data) == (304, b"")
 
 
 @pytest.mark.anyio
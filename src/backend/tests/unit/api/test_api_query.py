@@ -0,0 +1,143 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+from typing import Any, List
+
+import pytest
+
+from backend.api.query import ObjectMatcher, ObjectQuery
+from backend.api.types import ListObjectsRequest, Object, ObjectFilter
+
+UTC = datetime.timezone.utc
+
+
+def make_object(name: str, size: int = 0, day: int = 1) -> Object:
+    return Object(
+        Key=f"a/{name}",
+        Name=name,
+        Size=size,
+        LastModified=datetime.datetime(2023, 8, day, tzinfo=UTC),
+    )
+
+
+def make_folder(name: str) -> Object:
+    return Object(Key=f"a/{name}", Name=name, Type="FOLDER")
+
+
+OBJECTS: List[Object] = [
+    make_object("foo.txt", 10, 1),
+    make_folder("photos"),
+    make_object("Bar.TXT", 300, 3),
+    make_object("image.png", 2000, 2),
+    make_folder("foo"),
+    make_object("data.bin", 50, 4),
+]
+
+
+def names(objects: List[Object]) -> List[str]:
+    return [obj.Name for obj in objects]
+
+
+@pytest.mark.parametrize(
+    "flt,expected",
+    [
+        ({"Name": "foo"}, ["foo.txt", "foo"]),
+        ({"Name": "*.txt"}, ["foo.txt", "Bar.TXT"]),
+        ({"Name": "?oo*"}, ["foo.txt", "foo"]),
+        ({"MinSize": 50}, ["Bar.TXT", "image.png", "data.bin"]),
+        ({"MaxSize": 50}, ["foo.txt", "data.bin"]),
+        ({"MinSize": 50, "MaxSize": 300}, ["Bar.TXT", "data.bin"]),
+        (
+            {"ModifiedAfter": "2023-08-02T00:00:00Z"},
+            ["Bar.TXT", "image.png", "data.bin"],
+        ),
+        ({"ModifiedBefore": "2023-08-03T00:00:00"}, ["foo.txt", "image.png"]),
+        ({"ContentType": "image/*"}, ["image.png"]),
+        ({"ContentType": "text/plain"}, ["foo.txt", "Bar.TXT"]),
+        ({"Name": "o", "ContentType": "image/*"}, []),
+        ({}, names(OBJECTS)),
+    ],
+)
+def test_object_matcher(flt: Any, expected: List[str]) -> None:
+    matcher = ObjectMatcher(ObjectFilter.parse_obj(flt))
+    assert names([obj for obj in OBJECTS if matcher(obj)]) == expected
+
+
+@pytest.mark.parametrize(
+    "params,expected",
+    [
+        ({}, names(OBJECTS)),
+        ({"Limit": 2}, ["foo.txt", "photos"]),
+        (
+            {"SortBy": "Name"},
+            ["foo", "photos", "Bar.TXT", "data.bin", "foo.txt", "image.png"],
+        ),
+        (
+            {"SortBy": "Name", "SortOrder": "desc"},
+            ["photos", "foo", "image.png", "foo.txt", "data.bin", "Bar.TXT"],
+        ),
+        (
+            {"SortBy": "Size"},
+            ["foo", "photos", "foo.txt", "data.bin", "Bar.TXT", "image.png"],
+        ),
+        (
+            {"SortBy": "Size", "SortOrder": "desc", "Limit": 3},
+            ["photos", "foo", "image.png"],
+        ),
+        (
+            {"SortBy": "LastModified", "Filter": {"MinSize": 1}, "Limit": 2},
+            ["foo.txt", "image.png"],
+        ),
+        (
+            {
+                "SortBy": "LastModified",
+                "SortOrder": "desc",
+                "Filter": {"MinSize": 1},
+            },
+            ["data.bin", "Bar.TXT", "image.png", "foo.txt"],
+        ),
+    ],
+)
+def test_object_query(params: Any, expected: List[str]) -> None:
+    # Feed the objects in pages of two objects.
+    query: ObjectQuery[Object] = ObjectQuery(
+        ListObjectsRequest.parse_obj(params)
+    )
+    res: List[Object] = []
+    for i in range(0, len(OBJECTS), 2):
+        res.extend(query.add(OBJECTS[i : i + 2]))
+    res.extend(query.flush())
+    assert names(res) == expected
+
+
+def test_object_query_done() -> None:
+    query: ObjectQuery[Object] = ObjectQuery(
+        ListObjectsRequest(Limit=3, Filter=ObjectFilter(MinSize=1))
+    )
+    assert names(query.add(OBJECTS[:2])) == ["foo.txt"]
+    assert not query.done
+    assert names(query.add(OBJECTS[2:])) == ["Bar.TXT", "image.png"]
+    assert query.done
+    assert query.add(OBJECTS) == []
+
+
+def test_object_query_sorted_done() -> None:
+    query: ObjectQuery[Object] = ObjectQuery(
+        ListObjectsRequest(Limit=1, SortBy="Size")
+    )
+    assert query.add(OBJECTS) == []
+    # Sorting requires the whole listing.
+    assert not query.done
+    assert names(query.flush()) == ["foo"]
@@ -0,0 +1,355 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import json
+from typing import List, Optional
+
+import pytest
+from fastapi import FastAPI, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRouter
+from fastapi.testclient import TestClient
+from types_aiobotocore_s3.type_defs import OwnerTypeDef
+
+from backend.api.responses import (
+    COLUMNS_MEDIA_TYPE,
+    FieldsQuery,
+    accepts,
+    columns_responses,
+    dumps,
+    etag,
+    etag_matches,
+    model_response,
+    parse_fields,
+    project,
+    to_columns,
+)
+from backend.api.types import ListObjectsPage, Object, ObjectVersion
+
+
+def test_dumps() -> None:
+    objects = [
+        Object(
+            Key="a/b.txt",
+            Name="b.txt",
+            Size=1,
+            LastModified=datetime.datetime(
+                2023, 8, 7, 12, 49, 30, 123, tzinfo=datetime.timezone.utc
+            ),
+            Owner={"ID": "foo", "DisplayName": "bar"},
+        ),
+        ObjectVersion(Key="a/c", Name="c", IsDeleted=True, IsLatest=False),
+        Object(Key="a/d", Name="d", Type="FOLDER"),
+    ]
+    page = ListObjectsPage(Objects=objects, IsTruncated=True)
+    for content in [objects, page, ["foo", "bar"], {"foo": {"bar"}}]:
+        assert json.loads(dumps(content)) == jsonable_encoder(content)
+    with pytest.raises(TypeError):
+        dumps(object())
+
+
+def test_model_response() -> None:
+    router = APIRouter()
+
+    @model_response(router.get("/objects", response_model=List[Object]))
+    async def list_objects(prefix: str = "") -> List[Object]:
+        return [Object.construct(Key=f"{prefix}a", Name="a")]
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+    resp = client.get("/objects", params={"prefix": "b/"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/json"
+    assert resp.json() == [
+        jsonable_encoder(Object(Key="b/a", Name="a", Type="OBJECT"))
+    ]
+    # The documentation still refers to the response model.
+    schema = app.openapi()["paths"]["/objects"]["get"]
+    assert "prefix" in [p["name"] for p in schema["parameters"]]
+    assert schema["responses"]["200"]["content"]["application/json"]["schema"][
+        "items"
+    ] == {"$ref": "#/components/schemas/Object"}
+
+
+def test_to_columns() -> None:
+    lm = datetime.datetime(2023, 8, 7, 12, 49, 30, tzinfo=datetime.timezone.utc)
+    owner: OwnerTypeDef = {"ID": "foo", "DisplayName": "bar"}
+    res = to_columns(
+        [
+            Object(Key="a/b", Name="b", ETag='"x"', Size=1, LastModified=lm),
+            Object(Key="a/c", Name="c", ETag='"y"', Size=2, Owner=owner),
+            Object(Key="a/d", Name="d", ETag='"x"', Owner=owner),
+            Object(Key="a/e", Name="e", Type="FOLDER"),
+        ]
+    )
+    assert res == {
+        "Count": 4,
+        "Columns": {
+            "Key": ["a/b", "a/c", "a/d", "a/e"],
+            "LastModified": [1691412570000, None, None, None],
+            "ETag": [0, 1, 0, None],
+            "Owner": [None, 0, 0, None],
+            "Size": [1, 2, None, None],
+            "Type": [0, 0, 0, 1],
+        },
+        "Dictionaries": {
+            "ETag": ['"x"', '"y"'],
+            "Owner": [owner],
+            "Type": ["OBJECT", "FOLDER"],
+        },
+    }
+    assert to_columns([]) == {"Count": 0, "Columns": {}, "Dictionaries": {}}
+    # Dates without time zone are considered to be UTC.
+    res = to_columns(
+        [Object(Key="a", Name="a", LastModified=lm.replace(tzinfo=None))]
+    )
+    assert res["Columns"]["LastModified"] == [1691412570000]
+
+
+@pytest.mark.parametrize(
+    "accept,expected",
+    [
+        (None, False),
+        ("", False),
+        ("*/*", False),
+        ("application/json", False),
+        (COLUMNS_MEDIA_TYPE, True),
+        (f"application/json;q=0.5, {COLUMNS_MEDIA_TYPE.upper()}", True),
+        (f"{COLUMNS_MEDIA_TYPE}; q=0.1", True),
+        (f"{COLUMNS_MEDIA_TYPE}; q=0", False),
+        (f"{COLUMNS_MEDIA_TYPE};q=foo", False),
+    ],
+)
+def test_accepts(accept: Optional[str], expected: bool) -> None:
+    assert accepts(accept, COLUMNS_MEDIA_TYPE) == expected
+
+
+def test_model_response_columns() -> None:
+    router = APIRouter()
+
+    @model_response(
+        router.get(
+            "/objects",
+            response_model=ListObjectsPage,
+            responses=columns_responses(),
+        ),
+        columns=True,
+    )
+    async def list_objects(prefix: str = "") -> ListObjectsPage:
+        return ListObjectsPage(
+            Objects=[Object(Key=f"{prefix}a", Name="a")], IsTruncated=True
+        )
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+    resp = client.get("/objects", params={"prefix": "b/"})
+    assert resp.headers["content-type"] == "application/json"
+    assert resp.headers["vary"] == "Accept"
+    assert resp.json()["Objects"][0]["Key"] == "b/a"
+    resp = client.get(
+        "/objects",
+        params={"prefix": "b/"},
+        headers={"Accept": f"{COLUMNS_MEDIA_TYPE}, application/json"},
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == COLUMNS_MEDIA_TYPE
+    assert resp.headers["vary"] == "Accept"
+    assert resp.json() == {
+        "Objects": {
+            "Count": 1,
+            "Columns": {"Key": ["b/a"], "Type": [0]},
+            "Dictionaries": {"Type": ["OBJECT"]},
+        },
+        "IsTruncated": True,
+        "NextContinuationToken": None,
+    }
+    # The header is not exposed as parameter of the endpoint.
+    schema = app.openapi()["paths"]["/objects"]["get"]
+    assert [p["name"] for p in schema["parameters"]] == ["prefix"]
+    assert COLUMNS_MEDIA_TYPE in schema["responses"]["200"]["content"]
+    assert "application/json" in schema["responses"]["200"]["content"]
+
+
+def test_parse_fields() -> None:
+    assert parse_fields(None, Object) is None
+    assert parse_fields("", Object) == frozenset()
+    assert parse_fields(" Key, Size,,Key ", Object) == {"Key", "Size"}
+    with pytest.raises(HTTPException) as e:
+        parse_fields("Key,foo,bar", Object)
+    assert e.value.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert e.value.detail == "Unknown fields: bar, foo"
+
+
+def test_project() -> None:
+    objects = [
+        Object(Key="a/b", Name="b", Size=1),
+        Object(Key="a/c", Name="c", Type="FOLDER"),
+    ]
+    assert project(objects, {"Type", "Key", "Size"}) == [
+        {"Key": "a/b", "Size": 1, "Type": "OBJECT"},
+        {"Key": "a/c", "Size": None, "Type": "FOLDER"},
+    ]
+    assert project([], {"Key"}) == []
+    res = to_columns(objects, {"Key", "Size", "Name"})
+    assert res["Columns"] == {"Key": ["a/b", "a/c"], "Size": [1, None]}
+
+
+def test_model_response_fields() -> None:
+    router = APIRouter()
+    requested: List[Optional[str]] = []
+
+    @model_response(
+        router.get("/objects", response_model=ListObjectsPage),
+        columns=True,
+        fields=Object,
+    )
+    async def list_objects() -> ListObjectsPage:
+        return ListObjectsPage(
+            Objects=[Object(Key="a", Name="a", Size=1)], IsTruncated=True
+        )
+
+    @model_response(
+        router.get("/names", response_model=List[Object]),
+        fields=Object,
+    )
+    async def list_names(fields: FieldsQuery = None) -> List[Object]:
+        requested.append(fields)
+        return [Object.construct(Key="a", Name="a")]
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+    resp = client.get("/objects", params={"fields": "Key,Size"})
+    assert resp.json() == {
+        "Objects": [{"Key": "a", "Size": 1}],
+        "IsTruncated": True,
+        "NextContinuationToken": None,
+    }
+    resp = client.get(
+        "/objects",
+        params={"fields": "Size"},
+        headers={"Accept": COLUMNS_MEDIA_TYPE},
+    )
+    assert resp.json()["Objects"]["Columns"] == {"Size": [1]}
+    resp = client.get("/objects", params={"fields": "Key,Foo"})
+    assert resp.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert len(client.get("/objects").json()["Objects"][0]) == 12
+
+    # The parameter is passed on to the endpoint if declared.
+    resp = client.get("/names", params={"fields": "Name"})
+    assert resp.json() == [{"Name": "a"}]
+    assert requested == ["Name"]
+    for path in ["/objects", "/names"]:
+        schema = app.openapi()["paths"][path]["get"]
+        assert [p["name"] for p in schema["parameters"]] == ["fields"]
+
+
+@pytest.mark.parametrize(
+    "if_none_match,expected",
+    [
+        (None, False),
+        ("", False),
+        ('"foo"', True),
+        ('W/"foo"', True),
+        ('"bar", W/"foo"', True),
+        ("*", True),
+        ('"bar"', False),
+        ("foo", False),
+    ],
+)
+def test_etag_matches(if_none_match: Optional[str], expected: bool) -> None:
+    assert etag_matches(if_none_match, 'W/"foo"') == expected
+
+
+def test_model_response_conditional() -> None:
+    router = APIRouter()
+    objects: List[Object] = [Object(Key="a", Name="a")]
+
+    @model_response(
+        router.get("/objects", response_model=List[Object]),
+        columns=True,
+        conditional=True,
+    )
+    async def list_objects() -> List[Object]:
+        return objects
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+    resp = client.get("/objects")
+    assert resp.status_code == status.HTTP_200_OK
+    tag = resp.headers["etag"]
+    assert tag == etag(resp.content)
+    assert tag.startswith('W/"')
+    assert resp.headers["cache-control"] == "private, no-cache"
+
+    resp = client.get("/objects", headers={"If-None-Match": tag})
+    assert resp.status_code == status.HTTP_304_NOT_MODIFIED
+    assert resp.content == b""
+    assert resp.headers["etag"] == tag
+    assert resp.headers["cache-control"] == "private, no-cache"
+    assert resp.headers["vary"] == "Accept"
+
+    # Other representations have other entity tags.
+    resp = client.get(
+        "/objects",
+        headers={"If-None-Match": tag, "Accept": COLUMNS_MEDIA_TYPE},
+    )
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.headers["etag"] != tag
+
+    # The entity tag changes with the content.
+    objects.append(Object(Key="b", Name="b"))
+    resp = client.get("/objects", headers={"If-None-Match": tag})
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.headers["etag"] != tag
+    assert len(resp.json()) == 2
+
+    # The header is not exposed as parameter of the endpoint.
+    schema = app.openapi()["paths"]["/objects"]["get"]
+    assert "parameters" not in schema
+
+
+def test_model_response_conditional_post() -> None:
+    router = APIRouter()
+
+    @model_response(
+        router.post("/objects", response_model=List[Object]),
+        conditional=True,
+    )
+    async def list_objects() -> List[Object]:
+        return [Object(Key="a", Name="a")]
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+    resp = client.post("/objects")
+    assert resp.status_code == status.HTTP_200_OK
+    tag = resp.headers["etag"]
+    # Responses to POST requests are not cached.
+    assert "cache-control" not in resp.headers
+
+    # Other methods than GET and HEAD must fail instead of answering
+    # with `304 Not Modified`.
+    resp = client.post("/objects", headers={"If-None-Match": tag})
+    assert resp.status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert resp.content == b""
+    assert resp.headers["etag"] == tag
+    assert "cache-control" not in resp.headers
+
+    resp = client.post("/objects", headers={"If-None-Match": '"foo"'})
+    assert resp.status_code == status.HTTP_200_OK
@@ -0,0 +1,176 @@
+# Copyright 2023 SUSE LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, cast
+
+import pytest
+from pytest_mock import MockerFixture
+from types_aiobotocore_s3.client import S3Client
+from types_aiobotocore_s3.type_defs import ListObjectVersionsOutputTypeDef
+
+from backend.api import restore
+from backend.api.restore import KeyVersion
+from backend.api.types import RestoreResult
+
+
+def at(minute: int) -> datetime:
+    return datetime(2023, 1, 1, 0, minute, tzinfo=timezone.utc)
+
+
+def entry(
+    key: str, version_id: str, minute: int, is_latest: bool = False
+) -> Dict[str, Any]:
+    return {
+        "Key": key,
+        "VersionId": version_id,
+        "LastModified": at(minute),
+        "IsLatest": is_latest,
+    }
+
+
+def versions(*entries: str) -> List[KeyVersion]:
+    """
+    Builds the versions of the key `k` from entries like `v1@3`, i.e.
+    the version `v1` created at minute 3, or `d2@5` for a delete
+    marker, the latest first.
+    """
+    res: List[KeyVersion] = []
+    for i, spec in enumerate(entries):
+        version_id, minute = spec.split("@")
+        res.append(
+            KeyVersion(
+                cast(Any, entry("k", version_id, int(minute), i == 0)),
+                version_id.startswith("d"),
+            )
+        )
+    return res
+
+
+@pytest.mark.anyio
+async def test_group_versions() -> None:
+    pages: List[Dict[str, Any]] = [
+        {
+            "Versions": [
+                entry("a", "v1", 1),
+                entry("b", "v2", 2, True),
+                entry("b", "v1", 1),
+            ],
+            "DeleteMarkers": [
+                entry("a", "d1", 2, True),
+                entry("b", "d1", 2),
+            ],
+        },
+        {"Versions": [entry("b", "v0", 0), entry("c", "v1", 1, True)]},
+    ]
+
+    async def to_pages() -> AsyncIterator[ListObjectVersionsOutputTypeDef]:
+        for page in pages:
+            yield cast(ListObjectVersionsOutputTypeDef, page)
+
+    res = [
+        [v.version_id for v in key_versions]
+        async for key_versions in restore.group_versions(to_pages())
+    ]
+    # The versions of `b` span both pages, and the delete marker is taken
+    # to be newer than the version of the same time that is not the
+    # latest.
+    assert res == [["d1", "v1"], ["v2", "d1", "v1", "v0"], ["v1"]]
+
+
+@pytest.mark.parametrize(
+    "entries,timestamp,markers,copy",
+    [
+        # Nothing to restore.
+        (["v2@2", "v1@1"], None, [], None),
+        (["d1@2"], None, [], None),
+        # All delete markers are removed.
+        (
+            ["d3@4", "d2@3", "v2@2", "d1@1", "v1@0"],
+            None,
+            ["d3", "d2", "d1"],
+            None,
+        ),
+        # Restore the version that was the latest at minute 3.
+        (["d2@4", "v2@2", "v1@1"], at(3), ["d2"], None),
+        (["v3@4", "d2@3", "v2@2", "v1@1"], at(2), [], "v2"),
+        (["v3@4", "v2@2"], at(2), [], "v2"),
+        (["v3@4", "v2@2"], at(3), [], "v2"),
+        (["v3@4", "v2@2"], at(4), [], None),
+        # The object did not exist at that time.
+        (["v3@4", "d2@3", "v2@2"], at(3), [], None),
+        (["v3@4"], at(3), [], None),
+    ],
+)
+def test_plan_restore(
+    entries: List[str],
+    timestamp: Optional[datetime],
+    markers: List[str],
+    copy: Optional[str],
+) -> None:
+    res_markers, res_copy = restore.plan_restore(versions(*entries), timestamp)
+    assert [m.get("VersionId") for m in res_markers] == markers
+    assert (res_copy.version_id if res_copy else None) == copy
+
+
+def test_plan_restore_naive_timestamp() -> None:
+    res_markers, res_copy = restore.plan_restore(
+        versions("v3@4", "v2@2"), datetime(2023, 1, 1, 0, 3)
+    )
+    assert res_markers == []
+    assert res_copy is not None and res_copy.version_id == "v2"
+
+
+@pytest.mark.anyio
+async def test_restore_versions_batches(mocker: MockerFixture) -> None:
+    mocker.patch.object(restore, "MAX_DELETE_KEYS", 2)
+    page: Dict[str, Any] = {
+        "Versions": [entry(k, "v1", 1) for k in ["a", "b", "c"]],
+        "DeleteMarkers": [
+            entry("a", "d3", 3, True),
+            entry("b", "d3", 3, True),
+            entry("b", "d2", 2),
+            entry("c", "d2", 2, True),
+        ],
+    }
+    batches: List[List[str]] = []
+
+    class S3Mock:
+        async def delete_objects(
+            self, Bucket: str, Delete: Dict[str, Any]
+        ) -> Dict[str, Any]:
+            objs: List[Dict[str, str]] = Delete["Objects"]
+            batches.append([f"{o['Key']}@{o['VersionId']}" for o in objs])
+            deleted = [o for o in objs if o["Key"] != "c"]
+            errors = [
+                {"Key": o["Key"], "Code": "AccessDenied"}
+                for o in objs
+                if o["Key"] == "c"
+            ]
+            return {"Deleted": deleted, "Errors": errors}
+
+    async def pages() -> AsyncIterator[ListObjectVersionsOutputTypeDef]:
+        yield cast(ListObjectVersionsOutputTypeDef, page)
+
+    total = RestoreResult()
+    async for result in restore.restore_versions(
+        cast(S3Client, S3Mock()), "bucket", pages()
+    ):
+        restore.add_restore_result(total, result)
+    assert batches == [["a@d3", "b@d3"], ["b@d2", "c@d2"]]
+    # The key whose markers span both batches is counted once, and keys
+    # with errors are not counted.
+    assert total.Restored == 2
+    assert total.DeleteMarkers == 3
+    assert [e.Key for e in total.Errors] == ["c"]
@@ -16,8 +16,10 @@ import asyncio
 import contextlib
 from typing import Any, Dict, List
 
+from fastapi import Request
 from pytest_mock import MockerFixture
 from pytest_mock.plugin import MockType
+from starlette.types import Message
 
 from backend.api import S3GWClient
 from backend.config import Config, S3AddressingStyle
@@ -29,6 +31,23 @@ def async_return(result: Any):
     return f
 
 
+def body_request(data: bytes, size: int = 1000) -> Request:
+    """
+    Returns a request whose body is received in chunks of `size` bytes.
+    """
+    chunks = [data[i : i + size] for i in range(0, len(data), size)]
+
+    async def receive() -> Message:
+        chunk = chunks.pop(0) if chunks else b""
+        return {
+            "type": "http.request",
+            "body": chunk,
+            "more_body": bool(chunks),
+        }
+
+    return Request({"type": "http", "method": "DELETE"}, receive)
+
+
 class S3ApiMock:
     def __init__(self, client: S3GWClient, mocker: MockerFixture):
         self.mocked_fn: Dict[str, MockType] = {}
@@ -59,6 +78,28 @@ class ConfigMock(Config):
         self,
         s3gw_addr: str,
         s3_addressing_style: S3AddressingStyle = S3AddressingStyle.AUTO,
+        s3_max_pool_connections: int = 50,
+        s3_list_workers: int = 1,
+        s3_delete_workers: int = 4,
+        s3_copy_multipart_threshold: int = 128 * 1024 * 1024,
+        s3_copy_part_size: int = 64 * 1024 * 1024,
+        s3_copy_workers: int = 4,
+        s3_download_parallel_threshold: int = 64 * 1024 * 1024,
+        s3_download_chunk_size: int = 8 * 1024 * 1024,
+        s3_download_workers: int = 1,
+        s3_download_buffer_size: int = 1024 * 1024,
+        s3_archive_workers: int = 4,
     ) -> None:  # noqa
         self._s3gw_addr = s3gw_addr
         self._s3_addressing_style = s3_addressing_style
+        self._s3_max_pool_connections = s3_max_pool_connections
+        self._s3_list_workers = s3_list_workers
+        self._s3_delete_workers = s3_delete_workers
+        self._s3_copy_multipart_threshold = s3_copy_multipart_threshold
+        self._s3_copy_part_size = s3_copy_part_size
+        self._s3_copy_workers = s3_copy_workers
+        self._s3_download_parallel_threshold = s3_download_parallel_threshold
+        self._s3_download_chunk_size = s3_download_chunk_size
+        self._s3_download_workers = s3_download_workers
+        self._s3_download_buffer_size = s3_download_buffer_size
+        self._s3_archive_workers = s3_archive_workers
@@ -21,6 +21,10 @@ from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from pytest_mock import MockerFixture
 
+import backend.admin_ops as admin_ops
+from backend.admin_ops import AdminOpsTransport
+from backend.api.client_pool import S3ClientPool
+from backend.api.job_manager import JobManager
 from s3gw_ui_backend import (
     NoCacheStaticFiles,
     app_factory,
@@ -88,6 +92,20 @@ def test_config_init() -> None:
         assert api_resp.status_code == 404
 
 
+def test_api_compression() -> None:
+    os.environ["S3GW_SERVICE_URL"] = "http://s3gw.example.com"
+    os.environ["S3GW_UI_PATH"] = "/"
+    os.environ["S3GW_API_COMPRESSION_MIN_SIZE"] = "0"
+    app = app_factory()
+    os.environ.pop("S3GW_API_COMPRESSION_MIN_SIZE")
+    with TestClient(app) as client:
+        resp = client.get("/api/config/", headers={"Accept-Encoding": "gzip"})
+        assert resp.headers["content-encoding"] == "gzip"
+        # The static files are not compressed.
+        resp = client.get("/", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in resp.headers
+
+
 def test_config_init_failure(caplog: pytest.LogCaptureFixture) -> None:
     caplog.set_level(logging.ERROR)
     os.environ.pop("S3GW_SERVICE_URL", None)
@@ -112,3 +130,32 @@ async def test_lifespan(
         pass
     assert "Starting s3gw-ui backend" in caplog.messages[0]
     assert "Shutting down s3gw-ui backend" in caplog.messages[-1]
+
+
+@pytest.mark.anyio
+async def test_lifespan_transport() -> None:
+    app = FastAPI()
+    app.state.admin_ops_transport = AdminOpsTransport()
+    app.state.s3_client_pool = S3ClientPool()
+    async with lifespan(app):
+        assert admin_ops.get_transport() is app.state.admin_ops_transport
+    assert admin_ops.get_transport() is None
+
+
+def test_lifespan_factory(test_data: PosixPath, mocker: MockerFixture) -> None:
+    os.environ["S3GW_SERVICE_URL"] = "http://s3gw.example.com"
+    os.environ["S3GW_UI_PATH"] = "/"
+    app = s3gw_factory(str(test_data))
+    transport_close = mocker.spy(AdminOpsTransport, "close")
+    pool_close = mocker.spy(S3ClientPool, "close")
+    job_manager_close = mocker.spy(JobManager, "close")
+    assert admin_ops.get_transport() is None
+    with TestClient(app):
+        # The lifespan of the mounted API is run by the top-level app.
+        assert isinstance(admin_ops.get_transport(), AdminOpsTransport)
+        transport_close.assert_not_called()
+    assert admin_ops.get_transport() is None
+    transport_close.assert_called_once()
+    # The pooled S3 clients and the running jobs are closed as well.
+    pool_close.assert_called_once()
+    job_manager_close.assert_called_once()
@@ -24,7 +24,9 @@ from backend.config import (
     EnvironMalformedError,
     S3AddressingStyle,
     get_api_path,
+    get_environ_bool,
     get_environ_enum,
+    get_environ_int,
     get_environ_str,
     get_s3gw_address,
     get_ui_path,
@@ -194,6 +196,36 @@ def test_get_environ_str_3() -> None:
     assert "" == get_environ_str("S3GW_INSTANCE_ID")
 
 
+def test_get_environ_int_1() -> None:
+    os.environ["S3GW_S3_CLIENT_POOL_SIZE"] = "8"
+    assert 8 == get_environ_int("S3GW_S3_CLIENT_POOL_SIZE", 32)
+
+
+def test_get_environ_int_2() -> None:
+    os.environ.pop("S3GW_S3_CLIENT_POOL_SIZE", None)
+    assert 32 == get_environ_int("S3GW_S3_CLIENT_POOL_SIZE", 32)
+
+
+def test_get_environ_int_3() -> None:
+    os.environ["S3GW_S3_CLIENT_POOL_SIZE"] = "foo"
+    with pytest.raises(EnvironMalformedError):
+        get_environ_int("S3GW_S3_CLIENT_POOL_SIZE", 32)
+    os.environ.pop("S3GW_S3_CLIENT_POOL_SIZE")
+
+
+def test_get_environ_bool_1() -> None:
+    os.environ["S3GW_ADMIN_OPS_HTTP2"] = "True"
+    assert get_environ_bool("S3GW_ADMIN_OPS_HTTP2") is True
+    os.environ["S3GW_ADMIN_OPS_HTTP2"] = "0"
+    assert get_environ_bool("S3GW_ADMIN_OPS_HTTP2", True) is False
+
+
+def test_get_environ_bool_2() -> None:
+    os.environ.pop("S3GW_ADMIN_OPS_HTTP2", None)
+    assert get_environ_bool("S3GW_ADMIN_OPS_HTTP2") is False
+    assert get_environ_bool("S3GW_ADMIN_OPS_HTTP2", True) is True
+
+
 def test_api_path_1() -> None:
     os.environ["S3GW_API_PATH"] = "/bar"
     assert "/bar" == get_api_path()
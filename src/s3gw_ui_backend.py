@@ -26,7 +26,14 @@ from fastapi.logger import logger
 from fastapi.staticfiles import StaticFiles
 from starlette.types import Scope
 
-from backend.api import admin, auth, buckets, config, objects
+import backend.admin_ops as admin_ops
+from backend.admin_ops import AdminOpsTransport
+from backend.api import admin, auth, buckets, config, jobs, metrics, objects
+from backend.api.client_pool import S3ClientPool
+from backend.api.compression import CompressionMiddleware
+from backend.api.disconnect import DisconnectMiddleware
+from backend.api.job_manager import JobManager
+from backend.api.key_index import KeyIndex
 from backend.config import Config
 from backend.logging import get_uvicorn_logging_config, setup_logging
 
@@ -59,8 +66,27 @@ class NoCacheStaticFiles(StaticFiles):
 @asynccontextmanager
 async def lifespan(api: FastAPI) -> AsyncGenerator[None, Any]:
     logger.info("Starting s3gw-ui backend")
+    admin_ops_transport: AdminOpsTransport | None = getattr(
+        api.state, "admin_ops_transport", None
+    )
+    if admin_ops_transport is not None:
+        admin_ops.set_transport(admin_ops_transport)
     yield
     logger.info("Shutting down s3gw-ui backend")
+    job_manager: JobManager | None = getattr(api.state, "job_manager", None)
+    if job_manager is not None:
+        await job_manager.close()
+    if admin_ops_transport is not None:
+        admin_ops.set_transport(None)
+        await admin_ops_transport.close()
+    s3_client_pool: S3ClientPool | None = getattr(
+        api.state, "s3_client_pool", None
+    )
+    if s3_client_pool is not None:
+        await s3_client_pool.close()
+    key_index: KeyIndex | None = getattr(api.state, "key_index", None)
+    if key_index is not None:
+        key_index.close()
 
 
 def get_angular_app_data_path() -> str:
@@ -91,14 +117,15 @@ def s3gw_factory(static_dir: str | None = None) -> FastAPI:
         },
     ]
 
-    s3gw_app = FastAPI(docs_url=None)
     s3gw_api = FastAPI(
         title="s3gw-ui API",
         description="<s3gw description>",
         version="1.0.0",
         openapi_tags=api_tags_meta,
-        lifespan=lifespan,
     )
+    # Note, Starlette does not run the lifespan of a mounted application,
+    # thus the lifespan of the API is run by the top-level application.
+    s3gw_app = FastAPI(docs_url=None, lifespan=lambda _: lifespan(s3gw_api))
 
     try:
         s3gw_api.state.config = Config()
@@ -107,6 +134,38 @@ def s3gw_factory(static_dir: str | None = None) -> FastAPI:
         logger.error("Unable to init config -- exit!")
         sys.exit(1)
 
+    # Keep the S3 clients open across requests so that the connections
+    # to the s3gw server can be reused.
+    s3gw_api.state.s3_client_pool = S3ClientPool(
+        max_size=s3gw_api.state.config.s3_client_pool_size,
+        idle_ttl=s3gw_api.state.config.s3_client_idle_ttl,
+    )
+    # Likewise, keep the connections to the Admin Ops API alive.
+    s3gw_api.state.admin_ops_transport = AdminOpsTransport(
+        max_connections=s3gw_api.state.config.admin_ops_max_connections,
+        max_keepalive_connections=(
+            s3gw_api.state.config.admin_ops_max_keepalive_connections
+        ),
+        keepalive_expiry=s3gw_api.state.config.admin_ops_keepalive_expiry,
+        http2=s3gw_api.state.config.admin_ops_http2,
+    )
+    # Optionally serve the folders of the buckets from a local index.
+    if s3gw_api.state.config.key_index_path:
+        s3gw_api.state.key_index = KeyIndex(
+            s3gw_api.state.config.key_index_path,
+            max_age=s3gw_api.state.config.key_index_max_age,
+        )
+
+    # Run long-running operations, e.g. bulk deletions, in the background.
+    s3gw_api.state.job_manager = JobManager(
+        max_running=s3gw_api.state.config.jobs_max_running,
+        path=s3gw_api.state.config.jobs_db_path,
+        ttl=s3gw_api.state.config.jobs_ttl,
+    )
+
+    # Count the events of the API, e.g. cancelled requests.
+    s3gw_api.state.metrics = metrics.Metrics()
+
     # Write the configuration so that it can be loaded by the
     # Angular application during bootstrapping.
     main_config_path: str = os.path.join(
@@ -115,11 +174,26 @@ def s3gw_factory(static_dir: str | None = None) -> FastAPI:
     with open(main_config_path, "w") as fh:
         fh.write(s3gw_api.state.config.to_json())
 
+    # Compress the API responses, e.g. large listings. Note, object
+    # downloads are excluded, see `ObjectBodyStreamingResponse`.
+    s3gw_api.add_middleware(
+        CompressionMiddleware,
+        level=s3gw_api.state.config.api_compression_level,
+        minimum_size=s3gw_api.state.config.api_compression_min_size,
+    )
+    # Stop the requests to s3gw as soon as the client disconnects, e.g.
+    # while downloading an object or listing a large bucket.
+    s3gw_api.add_middleware(
+        DisconnectMiddleware, metrics=s3gw_api.state.metrics
+    )
+
     s3gw_api.include_router(admin.router)
     s3gw_api.include_router(auth.router)
     s3gw_api.include_router(buckets.router)
     s3gw_api.include_router(objects.router)
     s3gw_api.include_router(config.router)
+    s3gw_api.include_router(jobs.router)
+    s3gw_api.include_router(metrics.router)
 
     s3gw_app.mount(
         urljoin(s3gw_api.state.config.ui_path, s3gw_api.state.config.api_path),